@@ -0,0 +1,175 @@
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+
+from database import connect
+from http_client import fetch_text
+
+# Контейнеры основного текста на известных сайтах (по порядку приоритета)
+BODY_SELECTORS = [
+    '[itemprop="articleBody"]',
+    '.article-content',
+    '.js-mediator-article',
+    '.b-article__text',
+    '.news-item__content',
+    'article',
+]
+
+# Мусорные элементы, которые не относятся к тексту статьи
+NOISE_TAGS = ['script', 'style', 'noscript', 'aside', 'nav', 'footer', 'header', 'form', 'figure', 'iframe']
+
+# Уровень сжатия zlib: 6 - компромисс между скоростью и размером
+COMPRESS_LEVEL = 6
+
+
+def decompress_body(blob: bytes) -> str:
+    """Распаковывает текст статьи"""
+    return zlib.decompress(blob).decode('utf-8')
+
+
+def build_fts_query(text: str) -> str:
+    """Строит выражение MATCH: каждое слово как префикс (Холанд* найдет Холанда, Холандом)"""
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class ArticleBodyFetcher:
+    def __init__(self, db_path: str, max_workers: int = 4, timeout: int = 30):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def extract_main_text(self, html_content: str) -> str:
+        """Извлекает основной текст статьи из HTML"""
+        soup = BeautifulSoup(html_content, 'html.parser')
+        for tag in soup(NOISE_TAGS):
+            tag.decompose()
+
+        container = None
+        for selector in BODY_SELECTORS:
+            container = soup.select_one(selector)
+            if container:
+                break
+
+        if container is None:
+            # Запасной вариант: блок с наибольшим объемом текста в абзацах
+            best_length = 0
+            for candidate in soup.find_all(['div', 'section']):
+                length = sum(len(p.get_text(strip=True)) for p in candidate.find_all('p', recursive=False))
+                if length > best_length:
+                    container, best_length = candidate, length
+
+        if container is None:
+            return ""
+
+        paragraphs = [p.get_text(' ', strip=True) for p in container.find_all('p')]
+        paragraphs = [p for p in paragraphs if p]
+        if not paragraphs:
+            return container.get_text(' ', strip=True)
+        return '\n'.join(paragraphs)
+
+    def _download(self, news_id: int, link: str):
+        """Загружает и разбирает одну статью (выполняется в пуле потоков)"""
+        try:
+            html = fetch_text(link, timeout=self.timeout)
+            return news_id, self.extract_main_text(html)
+        except Exception as e:
+            print(f"Ошибка загрузки статьи {link}: {e}")
+            return news_id, None
+
+    def fetch_bodies(self, links: List[str]) -> Dict:
+        """Загружает тексты для указанных ссылок, пропуская уже загруженные"""
+        if not links:
+            return self._empty_stats()
+
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        placeholders = ', '.join('?' for _ in links)
+        cursor.execute(f'''
+            SELECT n.id, n.link, n.title FROM news n
+            LEFT JOIN news_bodies b ON b.news_id = n.id
+            WHERE n.link IN ({placeholders}) AND b.news_id IS NULL
+        ''', list(links))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return self._fetch_rows(rows)
+
+    def fetch_missing(self, limit: int = 200) -> Dict:
+        """Загружает тексты для последних новостей, у которых их еще нет"""
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT n.id, n.link, n.title FROM news n
+            LEFT JOIN news_bodies b ON b.news_id = n.id
+            WHERE b.news_id IS NULL AND n.link LIKE 'http%'
+            ORDER BY n.id DESC LIMIT ?
+        ''', (limit,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return self._fetch_rows(rows)
+
+    def _fetch_rows(self, rows) -> Dict:
+        """Параллельно загружает статьи и сохраняет их одной транзакцией"""
+        stats = self._empty_stats()
+        if not rows:
+            return stats
+
+        titles = {news_id: title for news_id, _, title in rows}
+        started = time.perf_counter()
+        results = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._download, news_id, link) for news_id, link, _ in rows]
+            for future in as_completed(futures):
+                news_id, text = future.result()
+                if text:
+                    results.append((news_id, text))
+                else:
+                    stats['failed'] += 1
+
+        # Запись в БД из одного потока
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for news_id, text in results:
+            raw = text.encode('utf-8')
+            blob = zlib.compress(raw, COMPRESS_LEVEL)
+            cursor.execute(
+                'INSERT OR IGNORE INTO news_bodies (news_id, body, raw_size, fetched_at) VALUES (?, ?, ?, ?)',
+                (news_id, blob, len(raw), fetched_at)
+            )
+            if cursor.rowcount > 0:
+                cursor.execute(
+                    'INSERT INTO news_fts (rowid, title, body) VALUES (?, ?, ?)',
+                    (news_id, titles[news_id], text)
+                )
+                stats['stored'] += 1
+                stats['raw_bytes'] += len(raw)
+                stats['stored_bytes'] += len(blob)
+        conn.commit()
+        conn.close()
+
+        stats['seconds'] = time.perf_counter() - started
+        self.print_report(stats)
+        return stats
+
+    def _empty_stats(self) -> Dict:
+        return {'stored': 0, 'failed': 0, 'raw_bytes': 0, 'stored_bytes': 0, 'seconds': 0.0}
+
+    def print_report(self, stats: Dict):
+        """Печатает пропускную способность и накладные расходы на хранение"""
+        stored = stats['stored']
+        seconds = stats['seconds'] or 1e-9
+        print(f"Загружено текстов статей: {stored}, ошибок: {stats['failed']}, "
+              f"за {stats['seconds']:.1f} с ({(stored + stats['failed']) / seconds:.1f} статей/с)")
+        if stored:
+            ratio = stats['stored_bytes'] / stats['raw_bytes'] if stats['raw_bytes'] else 0
+            print(f"Хранение: {stats['stored_bytes'] / stored:.0f} байт на статью "
+                  f"(исходно {stats['raw_bytes'] / stored:.0f}, сжатие {ratio:.0%})")
@@ -0,0 +1,271 @@
+"""Нагрузочный прогон бота: заглушка Bot API + повтор пользовательских сессий.
+
+Запуск из каталога bot:
+    python benchmarks/bot_load.py [football_news.db] [--users=50] [--rate=5] [--think=0.2]
+        [--pages=3] [--sessions=сессии.jsonl] [--output=файл.json]
+
+Бот запускается в этом же процессе на копии базы и ходит в локальную заглушку
+(benchmarks/fake_bot_api.py) вместо api.telegram.org. Пользователи приходят с частотой rate
+в секунду; каждый проходит сессию: /start, выбор лиги, листание, поиск текстом, избранное.
+
+Сессия - список шагов JSON, по строке на сессию в файле --sessions:
+    {"text": "/start"}               - сообщение или команда
+    {"press": "show_leagues"}        - кнопка с таким callback_data из последнего сообщения бота
+    {"press_prefix": "o:"}           - случайная кнопка, callback_data которой начинается так
+    {"search": true}                 - поиск текстом по случайному клубу или игроку
+
+Отчет: задержка обработчика (process_update) и сквозная задержка (от постановки обновления
+в очередь getUpdates до конца обработки) - p50/p95/p99 по типам шагов, пропускная способность,
+доля ошибок (исключения в обработчиках и шаги без ответа за STEP_TIMEOUT).
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bot1 import FootballNewsBot  # noqa: E402
+from callbacks import ADD_FAVORITE, OPEN_ENTITY, REMOVE_FAVORITE  # noqa: E402
+import entities  # noqa: E402
+from fake_bot_api import FakeBotApi, start_in_background  # noqa: E402
+from scraper_bench import percentile  # noqa: E402
+
+FAKE_TOKEN = '123456:LOAD-TEST'
+
+# Сколько ждем обработки одного шага, прежде чем считать его ошибкой
+STEP_TIMEOUT = 30
+
+# Первый id синтетического пользователя (чтобы не путать с настоящими в копии базы)
+FIRST_USER_ID = 10 ** 9
+
+
+def synthetic_session(pages: int):
+    """Типичная сессия: старт, лига, листание, поиск текстом, избранное (кнопки есть в ленте клуба или игрока)"""
+    steps = [{'text': '/start'}, {'press': 'show_leagues'}, {'press_prefix': f'{OPEN_ENTITY}:'}]
+    steps += [{'press': 'news_next'}] * pages
+    steps += [{'search': True}, {'press_prefix': (f'{ADD_FAVORITE}:', f'{REMOVE_FAVORITE}:')}, {'press': 'news_next'}]
+    return steps
+
+
+def load_sessions(path: str):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class LoadRun:
+    """Связывает заглушку API с ботом: время постановки и обработки каждого обновления"""
+
+    def __init__(self, api: FakeBotApi):
+        self.api = api
+        self.done = {}
+        self.handler_seconds = {}
+        self.finished_at = {}
+        self.failed = set()
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(lambda: {'handler': [], 'end_to_end': []})
+        self.steps = 0
+        self.errors = defaultdict(int)
+
+    def instrument(self, application):
+        """Оборачивает process_update и добавляет обработчик ошибок"""
+        original = application.process_update
+
+        async def timed(update):
+            started = time.perf_counter()
+            try:
+                await original(update)
+            finally:
+                update_id = getattr(update, 'update_id', None)
+                with self.lock:
+                    self.handler_seconds[update_id] = time.perf_counter() - started
+                    self.finished_at[update_id] = time.perf_counter()
+                    event = self.done.get(update_id)
+                if event:
+                    event.set()
+
+        async def on_error(update, context):
+            with self.lock:
+                self.failed.add(getattr(update, 'update_id', None))
+
+        application.process_update = timed
+        application.add_error_handler(on_error)
+
+    def expect(self, update_id: int) -> threading.Event:
+        with self.lock:
+            event = self.done.setdefault(update_id, threading.Event())
+            if update_id in self.finished_at:
+                event.set()
+        return event
+
+    def step(self, user_id: int, step: dict, rnd: random.Random):
+        """Выполняет шаг сессии и ждет, пока бот его обработает"""
+        if 'text' in step:
+            kind, update_id = 'text', self.api.push_text(user_id, step['text'])
+        elif step.get('search'):
+            dictionary = entities.current()
+            name = rnd.choice(sorted(dictionary.clubs) + sorted(dictionary.players))
+            kind, update_id = 'search', self.api.push_text(user_id, name)
+        else:
+            message = self.api.last_keyboard_message(user_id)
+            buttons = [button['callback_data'] for row in (message or {}).get('reply_markup', {}).get(
+                'inline_keyboard', []) for button in row if button.get('callback_data')]
+            if 'press' in step:
+                candidates = [data for data in buttons if data == step['press']]
+            else:
+                prefixes = step['press_prefix']
+                if isinstance(prefixes, list):
+                    prefixes = tuple(prefixes)
+                candidates = [data for data in buttons if data.startswith(prefixes)]
+            if not candidates:
+                # Такой кнопки на экране нет (например, пустая лига) - шаг пропускаем
+                return
+            data = rnd.choice(candidates)
+            kind, update_id = data.split(':')[0], self.api.push_callback(user_id, message, data)
+
+        event = self.expect(update_id)
+        with self.lock:
+            self.steps += 1
+        if not event.wait(STEP_TIMEOUT):
+            with self.lock:
+                self.errors['timeout'] += 1
+            return
+        with self.lock:
+            if update_id in self.failed:
+                self.errors['exception'] += 1
+            self.latencies[kind]['handler'].append(self.handler_seconds[update_id])
+            self.latencies[kind]['end_to_end'].append(self.finished_at[update_id] - self.api.pushed_at[update_id])
+
+    def run_session(self, user_id: int, steps, think: float):
+        rnd = random.Random(user_id)
+        for step in steps:
+            self.step(user_id, step, rnd)
+            if think:
+                time.sleep(rnd.uniform(0, 2 * think))
+
+
+def summarize(values) -> dict:
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+    }
+
+
+def drive(run: LoadRun, sessions, users: int, rate: float, think: float):
+    """Запускает users сессий с частотой rate в секунду (в потоках) и ждет их завершения"""
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        futures = []
+        for number in range(users):
+            steps = sessions[number % len(sessions)]
+            futures.append(executor.submit(run.run_session, FIRST_USER_ID + number, steps, think))
+            if rate > 0:
+                time.sleep(1 / rate)
+        for future in futures:
+            future.result()
+
+
+async def run_load(db_path: str, sessions, users: int, rate: float, think: float) -> dict:
+    api = FakeBotApi()
+    server, base_url = start_in_background(api)
+    bot = FootballNewsBot(FAKE_TOKEN, db_path, base_url=base_url)
+    application = bot.application
+    run = LoadRun(api)
+    run.instrument(application)
+
+    try:
+        async with application:
+            await bot.post_init(application)
+            await application.start()
+            await application.updater.start_polling(poll_interval=0, timeout=1)
+
+            started = time.perf_counter()
+            await asyncio.to_thread(drive, run, sessions, users, rate, think)
+            wall = time.perf_counter() - started
+
+            await application.updater.stop()
+            await application.stop()
+            await bot.post_stop(application)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    handled = sum(len(values['handler']) for values in run.latencies.values())
+    all_handler = [value for values in run.latencies.values() for value in values['handler']]
+    all_end_to_end = [value for values in run.latencies.values() for value in values['end_to_end']]
+    return {
+        'users': users,
+        'rate': rate,
+        'think': think,
+        'wall_s': round(wall, 3),
+        'steps': run.steps,
+        'handled': handled,
+        'throughput_per_s': round(handled / wall, 1) if wall else None,
+        'error_rate': round(sum(run.errors.values()) / run.steps, 4) if run.steps else 0.0,
+        'errors': dict(run.errors),
+        'handler': summarize(all_handler),
+        'end_to_end': summarize(all_end_to_end),
+        'by_step': {kind: {'handler': summarize(values['handler']), 'end_to_end': summarize(values['end_to_end'])}
+                    for kind, values in sorted(run.latencies.items())},
+        'api_calls': dict(api.calls),
+    }
+
+
+def print_report(results: dict):
+    print(f"\n=== {results['users']} пользователей, {results['rate']}/с, пауза {results['think']} с ===")
+    print(f"Шагов: {results['steps']}, обработано: {results['handled']} за {results['wall_s']:.1f} с "
+          f"({results['throughput_per_s']} обновлений/с), ошибок: {results['error_rate'] * 100:.2f}% {results['errors']}")
+    print(f"{'шаг':24} {'кол-во':>6}   {'обработчик p50/p95/p99, мс':>28}   {'сквозная p50/p95/p99, мс':>28}")
+    rows = list(results['by_step'].items()) + [('ВСЕГО', results)]
+    for kind, metrics in rows:
+        handler, end_to_end = metrics['handler'], metrics['end_to_end']
+        print(f"{kind:24} {handler['count']:>6}   "
+              f"{handler['p50_ms']:>8.1f} {handler['p95_ms']:>8.1f} {handler['p99_ms']:>8.1f}   "
+              f"{end_to_end['p50_ms']:>10.1f} {end_to_end['p95_ms']:>8.1f} {end_to_end['p99_ms']:>8.1f}")
+    print(f"Вызовы API: {results['api_calls']}")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    source_db = args[0] if args else 'football_news.db'
+    users = int(options.get('users', 50))
+    rate = float(options.get('rate', 5))
+    think = float(options.get('think', 0.2))
+    if 'sessions' in options:
+        sessions = load_sessions(options['sessions'])
+    else:
+        sessions = [synthetic_session(int(options.get('pages', 3)))]
+
+    # Журнал каждого HTTP-запроса к заглушке только мешает читать отчет
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('bot1').setLevel(logging.WARNING)
+    logging.getLogger('telegram').setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Бот пишет в базу (избранное, кэши) - работаем на копии
+        db_path = os.path.join(tmp, 'bot_load.db')
+        if os.path.exists(source_db):
+            shutil.copy(source_db, db_path)
+        results = asyncio.run(run_load(db_path, sessions, users, rate, think))
+
+    print_report(results)
+    if 'output' in options:
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты: {options['output']}")
+
+
+if __name__ == "__main__":
+    main()
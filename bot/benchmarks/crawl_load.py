@@ -0,0 +1,122 @@
+"""Сквозной прогон парсеров против локальных копий сайтов (benchmarks/fake_news_site.py).
+
+Запуск из каталога bot:
+    python benchmarks/crawl_load.py [страниц] [--rounds=3] [--fresh=10] [--latency=0.05] [--jitter=0.02]
+        [--error-rate=0.0] [--page-delay=0] [--output=файл.json]
+
+Каждый раунд - полное обновление всех источников параллельно, как в crawler.run_all_sources,
+но во временную базу и с base_url локального сервера. Между раундами на сайтах появляются
+fresh свежих новостей на раздел. Отчет: время раунда и каждого источника, число запросов
+и ответов по кодам на стороне сервера, новых новостей в базе.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from crawler import run_source  # noqa: E402
+from database import ensure_schema  # noqa: E402
+from fake_news_site import FakeNewsSite, start_in_background  # noqa: E402
+from news_source import SOURCES  # noqa: E402
+
+
+def start_sites(latency: float, jitter: float, error_rate: float):
+    """Локальный сервер на каждый зарегистрированный источник: {имя: (сайт, сервер, base_url)}"""
+    sites = {}
+    for source_class in SOURCES:
+        site = FakeNewsSite(source_class.name, latency=latency, jitter=jitter, error_rate=error_rate)
+        server, base_url = start_in_background(site)
+        sites[source_class.name] = (site, server, base_url)
+    return sites
+
+
+def crawl_round(sources, pages: int, sites) -> dict:
+    """Одно полное обновление: все источники параллельно, статистика сервера за раунд"""
+    for site, _, _ in sites.values():
+        site.reset_stats()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            futures = {source.name: executor.submit(run_source, source, pages) for source in sources}
+            results = {name: future.result() for name, future in futures.items()}
+    total = time.perf_counter() - started
+
+    report = {'seconds': round(total, 3), 'sources': {}}
+    for source in sources:
+        news, seconds = results[source.name]
+        report['sources'][source.name] = {
+            'seconds': round(seconds, 3),
+            'parsed': len(news),
+            'new_in_db': len(source.new_links),
+            'server': sites[source.name][0].snapshot(),
+        }
+    return report
+
+
+def print_round(number: int, report: dict):
+    print(f"\nРаунд {number}: {report['seconds']:.2f} с")
+    for name, source in report['sources'].items():
+        server = source['server']
+        statuses = ', '.join(f"{key[len('status_'):]}: {value}"
+                             for key, value in sorted(server.items()) if key.startswith('status_'))
+        print(f"  {name:12} {source['seconds']:>7.2f} с   запросов {server.get('requests', 0):>4} ({statuses})   "
+              f"разобрано {source['parsed']:>5}, новых в БД {source['new_in_db']:>4}")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    pages = int(args[0]) if args else 2
+    rounds = int(options.get('rounds', 3))
+    fresh = int(options.get('fresh', 10))
+    page_delay = float(options.get('page-delay', 0))
+
+    sites = start_sites(
+        latency=float(options.get('latency', 0.05)),
+        jitter=float(options.get('jitter', 0.02)),
+        error_rate=float(options.get('error-rate', 0.0)),
+    )
+    reports = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'crawl_load.db')
+            ensure_schema(db_path)
+            # Архив выгрузок - во временном каталоге: синтетические новости не должны попасть
+            # в настоящие sportbox_news/ и championat_news/ (их по умолчанию читает snapshot_import)
+            with contextlib.redirect_stdout(io.StringIO()):
+                sources = [source_class(db_path, base_url=sites[source_class.name][2],
+                                        output_dir=os.path.join(tmp, f'{source_class.name}_news'))
+                           for source_class in SOURCES]
+            for source in sources:
+                # Вежливые паузы между страницами настоящих сайтов здесь только удлиняют прогон
+                source.page_delay = (page_delay, page_delay)
+
+            for number in range(1, rounds + 1):
+                if number > 1 and fresh:
+                    for site, _, _ in sites.values():
+                        site.inject(fresh)
+                report = crawl_round(sources, pages, sites)
+                print_round(number, report)
+                reports.append(report)
+    finally:
+        for _, server, _ in sites.values():
+            server.shutdown()
+            server.server_close()
+
+    if 'output' in options:
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump({'pages': pages, 'fresh': fresh, 'rounds': reports}, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты: {options['output']}")
+
+
+if __name__ == "__main__":
+    main()
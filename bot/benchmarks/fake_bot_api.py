@@ -0,0 +1,263 @@
+"""Локальная заглушка Telegram Bot API для нагрузочных тестов бота.
+
+Поддерживает методы, которыми пользуется FootballNewsBot: getMe, getUpdates (long polling),
+sendMessage, sendPhoto, editMessageText, editMessageMedia, deleteMessage, answerCallbackQuery,
+answerInlineQuery; прочие методы отвечают успехом. Сообщения бота хранятся по чатам, поэтому
+генератор нагрузки может "нажимать" кнопки из последнего сообщения, как живой пользователь.
+Повторное редактирование тем же содержимым отвечает ошибкой "message is not modified", как Telegram.
+
+Бот подключается через FootballNewsBot(token, db_path, base_url=адрес заглушки).
+Генератор нагрузки - benchmarks/bot_load.py.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_football_news_bot'}
+
+# Параметры, которые приходят строкой JSON (остальные - обычные строки)
+JSON_PARAMETERS = {'reply_markup', 'media', 'results', 'allowed_updates', 'commands'}
+INT_PARAMETERS = {'chat_id', 'message_id', 'offset', 'limit', 'timeout'}
+
+# Дольше этого getUpdates не ждет, даже если бот просит больше
+MAX_POLL_TIMEOUT = 10
+
+
+class ApiError(Exception):
+    """Ошибка метода в формате Bot API"""
+
+    def __init__(self, description: str, code: int = 400):
+        super().__init__(description)
+        self.description = description
+        self.code = code
+
+
+class FakeBotApi:
+    """Состояние заглушки: очередь обновлений, сообщения по чатам и счетчики вызовов"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.updates = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self.messages: Dict[int, Dict[int, dict]] = {}
+        self.calls = Counter()
+        self.pushed_at: Dict[int, float] = {}
+        self.methods = {
+            'getMe': lambda params: BOT_USER,
+            'getUpdates': self.get_updates,
+            'sendMessage': self.send_message,
+            'sendPhoto': self.send_photo,
+            'editMessageText': self.edit_message_text,
+            'editMessageMedia': self.edit_message_media,
+            'editMessageReplyMarkup': self.edit_message_reply_markup,
+            'deleteMessage': self.delete_message,
+            'answerCallbackQuery': lambda params: True,
+            'answerInlineQuery': lambda params: True,
+        }
+
+    # --- Входящие обновления (от имени пользователей) ---
+
+    @staticmethod
+    def user(user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'language_code': 'ru'}
+
+    @staticmethod
+    def chat(chat_id: int) -> dict:
+        return {'id': chat_id, 'type': 'private', 'first_name': f'User{chat_id}'}
+
+    def push(self, update: dict) -> int:
+        """Ставит обновление в очередь getUpdates и возвращает его update_id"""
+        with self.condition:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+            update['update_id'] = update_id
+            self.updates.append(update)
+            self.pushed_at[update_id] = time.perf_counter()
+            self.condition.notify_all()
+        return update_id
+
+    def push_text(self, user_id: int, text: str) -> int:
+        with self.condition:
+            message_id = self.new_message_id()
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': self.chat(user_id),
+            'from': self.user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            command = text.split()[0]
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        return self.push({'message': message})
+
+    def push_callback(self, user_id: int, message: dict, data: str) -> int:
+        return self.push({'callback_query': {
+            'id': f'{user_id}-{time.monotonic_ns()}',
+            'from': self.user(user_id),
+            'chat_instance': str(user_id),
+            'message': message,
+            'data': data,
+        }})
+
+    def last_keyboard_message(self, chat_id: int) -> Optional[dict]:
+        """Самое новое сообщение бота в чате, у которого есть кнопки"""
+        with self.condition:
+            for message_id in sorted(self.messages.get(chat_id, {}), reverse=True):
+                message = self.messages[chat_id][message_id]
+                if message.get('reply_markup'):
+                    return dict(message)
+        return None
+
+    # --- Методы Bot API ---
+
+    def new_message_id(self) -> int:
+        message_id = self.next_message_id
+        self.next_message_id += 1
+        return message_id
+
+    def get_updates(self, params: dict):
+        offset = params.get('offset') or 0
+        timeout = min(params.get('timeout') or 0, MAX_POLL_TIMEOUT)
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            # Подтвержденные ботом обновления больше не отдаем
+            self.updates = [update for update in self.updates if update['update_id'] >= offset]
+            while not self.updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return self.updates[:params.get('limit') or 100]
+
+    def store(self, chat_id: int, message: dict) -> dict:
+        with self.condition:
+            if 'message_id' not in message:
+                message['message_id'] = self.new_message_id()
+            self.messages.setdefault(chat_id, {})[message['message_id']] = message
+        return message
+
+    def new_message(self, params: dict, **content) -> dict:
+        message = {'date': int(time.time()), 'chat': self.chat(params['chat_id']), 'from': BOT_USER, **content}
+        if params.get('reply_markup'):
+            message['reply_markup'] = params['reply_markup']
+        return self.store(params['chat_id'], message)
+
+    @staticmethod
+    def photo(media: str) -> list:
+        file_id = f'fake-photo-{abs(hash(media)) % 10 ** 12}'
+        return [{'file_id': file_id, 'file_unique_id': file_id, 'width': 640, 'height': 360}]
+
+    def send_message(self, params: dict):
+        return self.new_message(params, text=params.get('text', ''))
+
+    def send_photo(self, params: dict):
+        return self.new_message(params, photo=self.photo(params.get('photo', '')), caption=params.get('caption', ''))
+
+    def find(self, params: dict) -> dict:
+        with self.condition:
+            message = self.messages.get(params.get('chat_id'), {}).get(params.get('message_id'))
+        if message is None:
+            raise ApiError('Bad Request: message to edit not found')
+        return message
+
+    def replace(self, params: dict, old: dict, content: dict) -> dict:
+        new = {key: value for key, value in old.items() if key not in ('text', 'caption', 'photo', 'reply_markup')}
+        new.update(content)
+        if params.get('reply_markup'):
+            new['reply_markup'] = params['reply_markup']
+        comparable = ('text', 'caption', 'photo', 'reply_markup')
+        if all(old.get(key) == new.get(key) for key in comparable):
+            raise ApiError('Bad Request: message is not modified: specified new message content and reply '
+                           'markup are exactly the same as a current content and reply markup of the message')
+        new['edit_date'] = int(time.time())
+        return self.store(params['chat_id'], new)
+
+    def edit_message_text(self, params: dict):
+        return self.replace(params, self.find(params), {'text': params.get('text', '')})
+
+    def edit_message_media(self, params: dict):
+        media = params.get('media') or {}
+        return self.replace(params, self.find(params), {
+            'photo': self.photo(media.get('media', '')), 'caption': media.get('caption', '')
+        })
+
+    def edit_message_reply_markup(self, params: dict):
+        old = self.find(params)
+        return self.replace(params, old, {key: old[key] for key in ('text', 'caption', 'photo') if key in old})
+
+    def delete_message(self, params: dict):
+        self.find(params)
+        with self.condition:
+            del self.messages[params['chat_id']][params['message_id']]
+        return True
+
+    def call(self, method: str, params: dict):
+        with self.condition:
+            self.calls[method] += 1
+        handler = self.methods.get(method)
+        return handler(params) if handler else True
+
+
+def parse_parameters(body: bytes, content_type: str) -> dict:
+    """Параметры запроса бота: JSON или form-urlencoded (значения-объекты закодированы в JSON)"""
+    if not body:
+        return {}
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+    params = {key: values[0] for key, values in parse_qs(body.decode('utf-8'), keep_blank_values=True).items()}
+    for key, value in params.items():
+        if key in JSON_PARAMETERS:
+            params[key] = json.loads(value)
+        elif key in INT_PARAMETERS:
+            params[key] = int(value)
+    return params
+
+
+class FakeBotApiHandler(BaseHTTPRequestHandler):
+    """Адреса вида /bot<token>/<метод>; api задается в подклассе, который создает make_server"""
+
+    api: FakeBotApi = None
+    protocol_version = 'HTTP/1.1'
+    # Без этого заголовки и тело уходят разными пакетами и каждый ответ ждет задержанного ACK (~40 мс)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, payload: dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        method = self.path.rstrip('/').rsplit('/', 1)[-1]
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            params = parse_parameters(body, self.headers.get('Content-Type', ''))
+            self.reply({'ok': True, 'result': self.api.call(method, params)})
+        except ApiError as e:
+            self.reply({'ok': False, 'error_code': e.code, 'description': e.description}, e.code)
+        except (BrokenPipeError, ConnectionResetError):
+            # Бот остановился, не дождавшись ответа на long polling
+            pass
+
+    do_GET = do_POST
+
+
+def start_in_background(api: FakeBotApi, port: int = 0, host: str = '127.0.0.1'):
+    """Запускает заглушку в фоновом потоке и возвращает (сервер, base_url для бота)"""
+    handler = type('BoundFakeBotApiHandler', (FakeBotApiHandler,), {'api': api})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}'
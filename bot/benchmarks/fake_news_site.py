@@ -0,0 +1,299 @@
+"""Локальная копия сайтов новостей для нагрузочных тестов парсеров без сети.
+
+Страницы списков генерируются в той же разметке, что у настоящих сайтов:
+sportbox - '#teazers ul.list li' с пагинацией ?page=N, championat - 'div.news-items'
+с пагинацией /news/football/N.html. Задержка ответа, доля ошибок 503, ETag/304
+и появление свежих новостей настраиваются.
+
+Запуск из каталога bot (сервер работает, пока не прерван):
+    python benchmarks/fake_news_site.py [sportbox|championat] [--port=8001] [--latency=0.05]
+        [--jitter=0.02] [--error-rate=0.0] [--per-page=30] [--fresh-every=0]
+
+Служебные адреса: /_stats (счетчики запросов, JSON), /_inject?count=N (добавить свежие новости).
+"""
+import hashlib
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import entities  # noqa: E402
+
+SPORTBOX = 'sportbox'
+CHAMPIONAT = 'championat'
+
+# Разделы sportbox, как в SimpleSportboxScraper.leagues
+SPORTBOX_SECTIONS = (
+    '/Vidy_sporta/Futbol/Liga_Chempionov',
+    '/Vidy_sporta/Futbol/Evropejskie_chempionaty/Angliya',
+    '/Vidy_sporta/Futbol/Evropejskie_chempionaty/Ispaniya',
+    '/Vidy_sporta/Futbol/Evropejskie_chempionaty/Italiya',
+    '/Vidy_sporta/Futbol/Evropejskie_chempionaty/Germaniya',
+    '/Vidy_sporta/Futbol/Evropejskie_chempionaty/Franciya',
+    '/Vidy_sporta/Futbol/europa_league',
+    '/Vidy_sporta/Futbol/Russia/premier_league',
+)
+CHAMPIONAT_FEED = '/news/football'
+
+# Рубрики championat, по которым определяется лига (раздел leagues в entities.json)
+CHAMPIONAT_RUBRICS = ('РПЛ', 'АПЛ', 'Ла Лига', 'Серия А', 'Бундеслига', 'Лига 1', 'ЛЧ', 'Лига Европы')
+
+TITLE_TEMPLATES = (
+    '{club} обыграл {other} в матче тура',
+    '{player} забил за {club}',
+    '{club} и {other} сыграли вничью',
+    'Тренер {club} высказался о матче с {other}',
+    '{player} пропустит игру с {other} из-за травмы',
+    'Источник: {club} интересуется {player}',
+)
+
+# Сколько новостей на странице списка и сколько страниц вообще существует
+DEFAULT_PER_PAGE = 30
+MAX_PAGES = 50
+
+
+class FakeNewsSite:
+    """Состояние одного сайта: ленты разделов, счетчики запросов и настройки поведения"""
+
+    def __init__(self, kind: str, per_page: int = DEFAULT_PER_PAGE, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0, today: str = None):
+        self.kind = kind
+        self.per_page = per_page
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.seed = seed
+        # Дата в шапке ленты championat (ДД.ММ.ГГГГ); по умолчанию сегодняшняя, фикстурам нужна постоянная
+        self.today = today
+        self.sections = SPORTBOX_SECTIONS if kind == SPORTBOX else (CHAMPIONAT_FEED,)
+        # Номер самой свежей новости в каждом разделе; свежие новости сдвигают старые на следующие страницы
+        self.heads = {section: per_page * MAX_PAGES for section in self.sections}
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        dictionary = entities.current()
+        self.clubs = sorted(dictionary.clubs)
+        self.players = sorted(dictionary.players)
+
+    # --- Содержимое ---
+
+    def inject(self, count: int):
+        """Добавляет count свежих новостей в начало каждого раздела"""
+        with self.lock:
+            for section in self.sections:
+                self.heads[section] += count
+            self.stats['injected'] += count * len(self.sections)
+
+    def item(self, section: str, number: int) -> dict:
+        """Новость с номером number в разделе; одна и та же при каждом запросе"""
+        rnd = random.Random(f'{self.seed}:{section}:{number}')
+        club, other = rnd.sample(self.clubs, 2)
+        title = rnd.choice(TITLE_TEMPLATES).format(club=club, other=other, player=rnd.choice(self.players))
+        minutes = number % (24 * 60)
+        return {
+            'number': number,
+            'title': title,
+            'time': f'{minutes // 60:02d}:{minutes % 60:02d}',
+            'rubric': CHAMPIONAT_RUBRICS[number % len(CHAMPIONAT_RUBRICS)],
+            'image': f'//img.local/{self.kind}/{number % 997}.jpg',
+        }
+
+    def page_items(self, section: str, page: int):
+        with self.lock:
+            head = self.heads[section]
+        first = head - (page - 1) * self.per_page
+        return [self.item(section, number) for number in range(first, max(0, first - self.per_page), -1)]
+
+    def render_sportbox(self, section: str, page: int) -> str:
+        rows = []
+        for item in self.page_items(section, page):
+            rows.append(
+                f'<li><a href="{section}/spbnews_NI{item["number"]}">'
+                f'<img src="{item["image"]}">'
+                f'<span class="title"><span class="text">{html.escape(item["title"])}</span></span></a>'
+                f'<span class="rubric">Футбол</span><span class="date">{item["time"]}</span></li>'
+            )
+        return ('<html><body><div id="teazers"><ul class="list">'
+                + ''.join(rows) + '</ul></div></body></html>')
+
+    def render_championat(self, page: int) -> str:
+        rows = []
+        for item in self.page_items(CHAMPIONAT_FEED, page):
+            rows.append(
+                f'<div class="news-item"><div class="news-item__time">{item["time"]}</div>'
+                f'<div class="news-item__content">'
+                f'<a class="news-item__title" href="/football/news-{item["number"]}.html">'
+                f'{html.escape(item["title"])}</a>'
+                f'<a class="news-item__tag" href="/football/">{item["rubric"]}</a></div></div>'
+            )
+        today = self.today or datetime.now().strftime('%d.%m.%Y')
+        return (f'<html><body><div class="news-items"><div class="news-items__head">{today}</div>'
+                + ''.join(rows) + '</div></body></html>')
+
+    def render(self, path: str, query: dict):
+        """HTML страницы или None, если такого адреса у сайта нет"""
+        if self.kind == SPORTBOX:
+            if path not in self.sections:
+                return None
+            page = int(query.get('page', ['1'])[0] or 1)
+            if not 1 <= page <= MAX_PAGES:
+                return None
+            return self.render_sportbox(path, page)
+
+        if path.startswith(CHAMPIONAT_FEED + '/') and path.endswith('.html'):
+            number = path[len(CHAMPIONAT_FEED) + 1:-len('.html')]
+            if number.isdigit() and 1 <= int(number) <= MAX_PAGES:
+                return self.render_championat(int(number))
+        return None
+
+    # --- Поведение сервера ---
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return dict(self.stats)
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats.clear()
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов: site задается в подклассе, который создает make_server"""
+
+    site: FakeNewsSite = None
+    protocol_version = 'HTTP/1.1'
+    # Без этого заголовки и тело уходят разными пакетами и каждый ответ ждет задержанного ACK (~40 мс)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Тысячи строк журнала на прогон только мешают
+        pass
+
+    def send_body(self, status: int, body: bytes, content_type: str = 'text/html; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        # Служебные адреса не считаются в статистике и отвечают без задержки
+        if url.path == '/_stats':
+            self.send_body(200, json.dumps(self.site.snapshot()).encode(), 'application/json')
+            return
+        if url.path == '/_inject':
+            self.site.inject(int(query.get('count', ['10'])[0]))
+            self.send_body(200, b'{}', 'application/json')
+            return
+
+        site = self.site
+        site.count('requests')
+        site.delay()
+
+        if site.should_fail():
+            site.count('status_503')
+            self.send_body(503, b'Service Unavailable', 'text/plain', {'Retry-After': '0'})
+            return
+
+        page = site.render(url.path, query)
+        if page is None:
+            site.count('status_404')
+            self.send_body(404, b'Not Found', 'text/plain')
+            return
+
+        body = page.encode('utf-8')
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            site.count('status_304')
+            self.send_body(304, b'', headers={'ETag': etag})
+            return
+
+        site.count('status_200')
+        site.count('bytes_sent', len(body))
+        self.send_body(200, body, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+
+def make_server(site: FakeNewsSite, port: int = 0, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """HTTP-сервер сайта; port=0 - любой свободный порт (см. server.server_address)"""
+    handler = type('BoundFakeSiteHandler', (FakeSiteHandler,), {'site': site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(site: FakeNewsSite, port: int = 0):
+    """Запускает сервер в фоновом потоке и возвращает (сервер, базовый URL)"""
+    server = make_server(site, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}'
+
+
+def injector(site: FakeNewsSite, every: float, count: int, stop: threading.Event):
+    """Периодически публикует свежие новости, пока не выставлен stop"""
+    while not stop.wait(every):
+        site.inject(count)
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    kind = args[0] if args else SPORTBOX
+    if kind not in (SPORTBOX, CHAMPIONAT):
+        print(f"Неизвестный сайт: {kind} (доступны {SPORTBOX}, {CHAMPIONAT})")
+        return
+
+    site = FakeNewsSite(
+        kind,
+        per_page=int(options.get('per-page', DEFAULT_PER_PAGE)),
+        latency=float(options.get('latency', 0.05)),
+        jitter=float(options.get('jitter', 0.02)),
+        error_rate=float(options.get('error-rate', 0.0)),
+    )
+    server = make_server(site, int(options.get('port', 8001)))
+    fresh_every = float(options.get('fresh-every', 0))
+    stop = threading.Event()
+    if fresh_every > 0:
+        threading.Thread(target=injector, args=(site, fresh_every, 5, stop), daemon=True).start()
+
+    host, port = server.server_address[:2]
+    print(f"Локальный {kind}: http://{host}:{port} (статистика: /_stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        print(f"Запросов: {site.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""Офлайн-бенчмарк парсеров на сохраненных страницах сайтов.
+
+Запуск из каталога bot:
+    python benchmarks/scraper_bench.py capture [страниц]    - сохранить страницы списков новостей в fixtures
+    python benchmarks/scraper_bench.py render [страниц]     - пересобрать закрепленные фикстуры без сети
+    python benchmarks/scraper_bench.py [повторов] [--output=файл.json] [--compare=прошлый.json]
+
+Замеряются отдельно parse_news (на страницу), extract_news_data, clean_title, extract_club_tags
+и save_to_database (на страницу, во временную базу). Результат пишется в JSON в benchmarks/results,
+чтобы сравнивать прогоны между коммитами.
+
+В репозитории лежат закрепленные фикстуры (benchmarks/fixtures, см. README.md там же):
+страницы benchmarks/fake_news_site.py с seed=0 и постоянной датой, по 2 страницы на раздел.
+Они в разметке настоящих сайтов, так что бенчмарк работает сразу и без сети. Фикстуры
+с настоящих сайтов (capture) заменяют их - хеш фикстур в результате покажет, что сравнивать
+такие прогоны с прежними нельзя.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from database import ensure_schema  # noqa: E402
+from http_client import fetch_text  # noqa: E402
+from news_source import SOURCES  # noqa: E402
+from fake_news_site import FakeNewsSite  # noqa: E402
+
+# Импорт модулей регистрирует источники в news_source.SOURCES
+import scrap  # noqa: E402,F401
+import scrap_champ  # noqa: E402,F401
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+MANIFEST = 'manifest.json'
+
+# Параметры закрепленных фикстур (render): при их смене меняется и хеш фикстур
+FIXTURE_SEED = 0
+FIXTURE_DATE = '06.10.2025'
+FIXTURE_BASE_URL = 'http://fixtures.local'
+
+# Сколько раз прогоняем каждую страницу (первый прогон не считаем - прогрев)
+DEFAULT_REPEAT = 5
+
+
+def make_source(source_class, db_path: str, base_url: str = None):
+    """Экземпляр источника с временной базой и без архива выгрузок; вывод конструктора не нужен"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return source_class(db_path, base_url=base_url, archive=False)
+
+
+def write_fixtures(name: str, pages):
+    """Записывает страницы источника [(html, url, лига)] и manifest.json, заменяя прежние фикстуры"""
+    target = os.path.join(FIXTURES_DIR, name)
+    os.makedirs(target, exist_ok=True)
+    for filename in os.listdir(target):
+        if filename.endswith('.html'):
+            os.remove(os.path.join(target, filename))
+    manifest = []
+    for i, (html, url, league) in enumerate(pages, 1):
+        filename = f'{i:03d}.html'
+        with open(os.path.join(target, filename), 'w', encoding='utf-8') as f:
+            f.write(html)
+        manifest.append({'file': filename, 'url': url, 'league': league})
+        print(f"[{name}] {url} -> {filename} ({len(html)} байт)")
+    with open(os.path.join(target, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+
+
+def capture(pages: int):
+    """Сохраняет текущие страницы списков новостей каждого источника как фикстуры"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for source_class in SOURCES:
+            source = make_source(source_class, os.path.join(tmp, 'capture.db'))
+            captured = []
+            for url, league in source.listing_pages(pages):
+                try:
+                    html = fetch_text(url, headers=source.request_headers)
+                except Exception as e:
+                    print(f"[{source.name}] Не удалось загрузить {url}: {e}")
+                    continue
+                captured.append((html, url, league))
+            write_fixtures(source.name, captured)
+
+
+def render(pages: int):
+    """Собирает закрепленные фикстуры со страниц локальной копии сайтов (без сети, всегда одинаковые)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for source_class in SOURCES:
+            source = make_source(source_class, os.path.join(tmp, 'render.db'), base_url=FIXTURE_BASE_URL)
+            site = FakeNewsSite(source.name, seed=FIXTURE_SEED, today=FIXTURE_DATE)
+            rendered = []
+            for url, league in source.listing_pages(pages):
+                parts = urlsplit(url)
+                rendered.append((site.render(parts.path, parse_qs(parts.query)), url, league))
+            write_fixtures(source.name, rendered)
+
+
+def load_fixtures():
+    """{источник: [(html, лига)]} и общий хеш фикстур (прогоны на разных фикстурах не сравниваются)"""
+    fixtures = {}
+    digest = hashlib.sha256()
+    for source_class in SOURCES:
+        path = os.path.join(FIXTURES_DIR, source_class.name, MANIFEST)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        pages = []
+        for entry in manifest:
+            with open(os.path.join(FIXTURES_DIR, source_class.name, entry['file']), encoding='utf-8') as f:
+                html = f.read()
+            digest.update(html.encode('utf-8'))
+            pages.append((html, entry.get('league', '')))
+        if pages:
+            fixtures[source_class.name] = pages
+    return fixtures, digest.hexdigest()[:16]
+
+
+class CallTimer:
+    """Подменяет метод экземпляра и копит время каждого вызова (и аргументы, если нужно)"""
+
+    def __init__(self, obj, name: str, keep_args: bool = False):
+        self.durations = []
+        self.args = []
+        self.keep_args = keep_args
+        original = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.durations.append(time.perf_counter() - started)
+                if self.keep_args:
+                    self.args.append(args)
+
+        setattr(obj, name, timed)
+        self.restore = lambda: delattr(obj, name)
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(durations, items: int) -> dict:
+    """items/sec по суммарному времени и p50/p99 одного вызова (мс)"""
+    total = sum(durations)
+    return {
+        'calls': len(durations),
+        'items': items,
+        'total_s': round(total, 6),
+        'items_per_sec': round(items / total, 1) if total else None,
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 4),
+    }
+
+
+def run_parse(source, pages, repeat: int):
+    """parse_news по страницам; внутри - время extract_news_data, clean_title и extract_club_tags"""
+    page_times = []
+    items = 0
+    extract = CallTimer(source, 'extract_news_data')
+    titles = CallTimer(source, 'clean_title', keep_args=True)
+    tags = CallTimer(source, 'extract_club_tags', keep_args=True)
+    parsed = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for attempt in range(repeat + 1):
+                for timer in (extract, titles, tags):
+                    timer.durations.clear()
+                    timer.args.clear()
+                parsed = []
+                page_times_attempt = []
+                for html, league in pages:
+                    started = time.perf_counter()
+                    news = source.parse_news(html, league)
+                    page_times_attempt.append(time.perf_counter() - started)
+                    parsed.append(news)
+                if attempt:
+                    page_times.extend(page_times_attempt)
+                    items += sum(len(news) for news in parsed)
+    finally:
+        for timer in (extract, titles, tags):
+            timer.restore()
+    # Замеры вложенных вызовов - по последнему прогону
+    return page_times, items, parsed, extract, titles, tags
+
+
+def run_isolated(func, inputs, repeat: int):
+    """Функция отдельно на собранных при разборе входных данных"""
+    durations = []
+    for _ in range(repeat):
+        for args in inputs:
+            started = time.perf_counter()
+            func(*args)
+            durations.append(time.perf_counter() - started)
+    return durations
+
+
+def run_save(source_class, parsed, repeat: int, tmp: str):
+    """save_to_database по странице за раз, каждый прогон - в новую базу"""
+    page_times = []
+    items = 0
+    for attempt in range(repeat):
+        db_path = os.path.join(tmp, f'save_{attempt}.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            ensure_schema(db_path)
+            source = source_class(db_path)
+            for news in parsed:
+                # Копия: save_to_database правит заголовки на месте
+                batch = [dict(item) for item in news]
+                started = time.perf_counter()
+                items += source.save_to_database(batch)
+                page_times.append(time.perf_counter() - started)
+    return page_times, items
+
+
+def peak_memory(func) -> int:
+    """Пиковый объем памяти Python-объектов во время вызова (байты)"""
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_source(source_class, pages, repeat: int, tmp: str) -> dict:
+    source = make_source(source_class, os.path.join(tmp, 'parse.db'))
+    page_times, items, parsed, extract, titles, tags = run_parse(source, pages, repeat)
+    parsed_items = sum(len(news) for news in parsed)
+
+    title_inputs = titles.args
+    tag_inputs = tags.args
+    save_times, saved = run_save(source_class, parsed, repeat, tmp)
+
+    def parse_all():
+        for html, league in pages:
+            source.parse_news(html, league)
+
+    def save_all():
+        db_path = os.path.join(tmp, 'memory.db')
+        ensure_schema(db_path)
+        saver = source_class(db_path)
+        for news in parsed:
+            saver.save_to_database([dict(item) for item in news])
+
+    return {
+        'pages': len(pages),
+        'items_per_pass': parsed_items,
+        'stages': {
+            'parse_news': summarize(page_times, items),
+            'extract_news_data': summarize(extract.durations, len(extract.durations)),
+            'clean_title': summarize(run_isolated(source.clean_title, title_inputs, repeat),
+                                     len(title_inputs) * repeat),
+            'extract_club_tags': summarize(run_isolated(source.extract_club_tags, tag_inputs, repeat),
+                                           len(tag_inputs) * repeat),
+            'save_to_database': summarize(save_times, saved),
+        },
+        'peak_memory_bytes': {
+            'parse_news': peak_memory(parse_all),
+            'save_to_database': peak_memory(save_all),
+        },
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def print_report(results: dict, previous: dict = None):
+    for name, source in results['sources'].items():
+        print(f"\n=== {name}: {source['pages']} страниц, {source['items_per_pass']} новостей ===")
+        for stage, metrics in source['stages'].items():
+            line = (f"{stage:18} {metrics['items_per_sec'] or 0:>12.1f} ед/с   "
+                    f"p50 {metrics['p50_ms']:>9.3f} мс   p99 {metrics['p99_ms']:>9.3f} мс")
+            old = (previous or {}).get('sources', {}).get(name, {}).get('stages', {}).get(stage)
+            if old and old.get('items_per_sec') and metrics['items_per_sec']:
+                change = (metrics['items_per_sec'] / old['items_per_sec'] - 1) * 100
+                line += f"   {change:+.1f}% к {previous.get('revision') or 'прошлому прогону'}"
+            print(line)
+        memory = source['peak_memory_bytes']
+        print(f"Пик памяти: parse_news {memory['parse_news'] / 1024:.0f} КБ, "
+              f"save_to_database {memory['save_to_database'] / 1024:.0f} КБ")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+
+    if args and args[0] in ('capture', 'render'):
+        command = capture if args[0] == 'capture' else render
+        command(int(args[1]) if len(args) > 1 else 2)
+        return
+
+    repeat = int(args[0]) if args else DEFAULT_REPEAT
+    fixtures, fixtures_hash = load_fixtures()
+    if not fixtures:
+        print(f"Нет фикстур в {FIXTURES_DIR}. Соберите их: python benchmarks/scraper_bench.py render "
+              f"(или capture - с настоящих сайтов)")
+        return
+
+    results = {
+        'revision': git_revision(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'fixtures': fixtures_hash,
+        'repeat': repeat,
+        'sources': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for source_class in SOURCES:
+            if source_class.name in fixtures:
+                results['sources'][source_class.name] = bench_source(
+                    source_class, fixtures[source_class.name], repeat, tmp
+                )
+
+    previous = None
+    if 'compare' in options:
+        with open(options['compare'], encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('fixtures') != fixtures_hash:
+            print("Внимание: прошлый прогон сделан на других фикстурах, сравнение неточное")
+    print_report(results, previous)
+
+    output = options.get('output') or os.path.join(
+        RESULTS_DIR, f"scraper_{results['revision'] or 'local'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты: {output}")
+
+
+if __name__ == "__main__":
+    main()
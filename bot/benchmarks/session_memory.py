@@ -0,0 +1,84 @@
+"""Память на сессии пользователя: список словарей новостей против массива id и общего кэша строк.
+
+Запуск из каталога bot: python benchmarks/session_memory.py [football_news.db] [число сессий]
+"""
+import gc
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_rows import NewsRowCache  # noqa: E402
+from retention import NEWS_COLUMNS  # noqa: E402
+
+# Столько новостей бот кладет в одну сессию
+SESSION_ITEMS = 50
+
+
+def rss_bytes() -> int:
+    """Текущий RSS процесса (Linux)"""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def fetch_feed(cursor, offset: int):
+    """Лента одного пользователя, как ее возвращает запрос бота: список словарей"""
+    cursor.execute(f'SELECT {NEWS_COLUMNS} FROM news ORDER BY id DESC LIMIT ? OFFSET ?', (SESSION_ITEMS, offset))
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def measure(label: str, build):
+    gc.collect()
+    before = rss_bytes()
+    sessions = build()
+    gc.collect()
+    used = rss_bytes() - before
+    print(f"{label}: {used / 2 ** 20:.1f} МБ на {len(sessions)} сессий, {used / len(sessions):.0f} байт на сессию")
+    return sessions, used
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "football_news.db"
+    session_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    total = cursor.execute('SELECT COUNT(*) FROM news').fetchone()[0]
+    if not total:
+        print("В базе нет новостей")
+        return
+    random.seed(1)
+    # Пользователи листают разные ленты: случайное окно из 50 новостей
+    offsets = [random.randrange(max(1, total - SESSION_ITEMS)) for _ in range(session_count)]
+    print(f"Новостей в базе: {total}, сессий: {session_count}, новостей в сессии: до {SESSION_ITEMS}")
+
+    # Как раньше: в каждой сессии свои словари, полученные из базы
+    def build_dicts():
+        return [{'news_items': fetch_feed(cursor, offset), 'current_news_index': 0} for offset in offsets]
+
+    # Сейчас: массив id в сессии, строки в общем кэше
+    cache = NewsRowCache(db_path, capacity=total)
+
+    def build_ids():
+        return [
+            {'news_ids': cache.store(fetch_feed(cursor, offset)), 'current_news_index': 0}
+            for offset in offsets
+        ]
+
+    # Каждый вариант - на чистой памяти: результат первого освобождаем перед вторым
+    sessions, compact = measure("id + общий кэш строк", build_ids)
+    del sessions
+    cache.rows.clear()
+    sessions, full = measure("словари в сессии", build_dicts)
+    del sessions
+
+    conn.close()
+    if compact > 0:
+        print(f"Экономия: в {full / compact:.1f} раза")
+
+
+if __name__ == "__main__":
+    main()
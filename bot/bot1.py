@@ -1,10 +1,62 @@
+import asyncio
+import contextlib
+import html
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
-import sqlite3
+from telegram import (Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, Message,
+                      InlineQueryResultArticle, InputTextMessageContent)
+from telegram.error import BadRequest
+from telegram.ext import (Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters,
+                          InlineQueryHandler)
 from typing import List, Dict
 import os
 import re
+import time
+from article_bodies import build_fts_query
+from database import connect, ensure_schema
+from media_cache import TelegramMediaCache, UNUSABLE, is_media_error
+from retention import NEWS_COLUMNS, attach_archive, default_archive_path
+import entities
+from entities import resolve_player
+from fuzzy_search import CLUB, PLAYER, get_entity_index, resolve_entity, suggest_entities
+from inline_search import InlineCatalog, LEAGUE
+from singleflight import SingleFlight
+from live_feeds import FEED_POLL_INTERVAL, LatestFeeds
+from inbox import rebuild_inbox
+from news_rows import NewsRowCache
+from render import RenderCache, is_not_modified_error
+from callbacks import ADD_FAVORITE, OPEN_ENTITY, REMOVE_FAVORITE, EntityRegistry, decode_callback
+from metrics import DEFAULT_PORT, REGISTRY, histogram, register_callback, serve, track
+from query_log import QUERY_LOG
+from profiler import DEFAULT_SECONDS as PROFILE_SECONDS, install_signal_handler, profile_in_background
+
+# Как часто пересчитывать список популярных игроков (секунды)
+POPULAR_PLAYERS_TTL = 300
+
+# Ограничение Telegram на длину подписи к фото
+CAPTION_LIMIT = 1024
+
+# Inline-режим: максимум результатов в ответе (ограничение Telegram) и время кэширования ответа на стороне Telegram
+INLINE_RESULTS_LIMIT = 50
+INLINE_CACHE_TIME = 60
+
+# Кнопки, которые сами отвечают на нажатие всплывающим текстом (ответить можно только один раз)
+SELF_ANSWERING_ACTIONS = {ADD_FAVORITE, REMOVE_FAVORITE, "page_info"}
+
+# Сколько секунд одинаковые запросы ленты получают уже готовый результат
+FEED_CACHE_TTL = 5
+
+# Администраторы (команда /metrics) и порт локального эндпоинта метрик (0 - не запускать)
+ADMIN_USER_IDS = {int(user_id) for user_id in os.environ.get('BOT_ADMIN_IDS', '').split(',') if user_id.strip()}
+METRICS_PORT = int(os.environ.get('BOT_METRICS_PORT', DEFAULT_PORT))
+# В контейнере для сбора Prometheus снаружи - BOT_METRICS_HOST=0.0.0.0; BOT_METRICS_PORT=0 выключает эндпоинт
+METRICS_HOST = os.environ.get('BOT_METRICS_HOST', '127.0.0.1')
+
+# Самое долгое профилирование по команде /profile (секунды)
+MAX_PROFILE_SECONDS = 120
+
+# Время обработки команд, кнопок и текста и время запросов к базе по имени запроса
+HANDLER_SECONDS = histogram('bot_handler_seconds', 'Время обработки обновления', ('kind', 'name'))
+DB_QUERY_SECONDS = histogram('bot_db_query_seconds', 'Время запроса бота к базе', ('query',))
 
 # Настройка логирования
 logging.basicConfig(
@@ -14,50 +66,139 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class FootballNewsBot:
-    def __init__(self, token: str, db_path: str = "football_news.db"):
+    def __init__(self, token: str, db_path: str = "football_news.db", base_url: str = None):
         self.token = token
         self.db_path = db_path
-        self.application = Application.builder().token(token).build()
-        
-        # 10 самых популярных футболистов для быстрого поиска
-        self.popular_players = [
-            "Месси", "Роналду", "Мбаппе", "Холанд", "Неймар", 
-            "Бензема", "Салах", "Де Брейне", "Кейн", "Модрич"
-        ]
+        # Фоновый опрос лент (post_init / post_stop)
+        self.feed_poller = None
+        builder = Application.builder().token(token).post_init(self.post_init).post_stop(self.post_stop)
+        if base_url:
+            # Например, локальная заглушка Bot API для нагрузочных тестов
+            builder = builder.base_url(base_url.rstrip('/') + '/bot').base_file_url(base_url.rstrip('/') + '/file/bot')
+        self.application = builder.build()
+        
+        # 10 самых популярных футболистов считаются по тегам в базе (с кэшированием)
+        self._popular_players = []
+        self._popular_players_at = 0.0
         
         # Инициализация базы данных для избранного
         self.init_favorites_db()
         
-        # Добавляем обработчики
-        self.application.add_handler(CommandHandler("start", self.start))
-        self.application.add_handler(CommandHandler("news", self.show_news_categories))
-        self.application.add_handler(CommandHandler("leagues", self.show_leagues))
-        self.application.add_handler(CommandHandler("clubs", self.show_clubs))
-        self.application.add_handler(CommandHandler("players", self.show_players_search))
-        self.application.add_handler(CommandHandler("stats", self.show_stats))
-        self.application.add_handler(CommandHandler("favorites", self.show_favorites))
+        # Кэш image_url -> file_id, чтобы Telegram не скачивал одну картинку повторно
+        self.media_cache = TelegramMediaCache(db_path)
+
+        # Индекс для поиска клубов и игроков с опечатками строим заранее, а не на первом запросе
+        get_entity_index()
+
+        # Подсказки и свежие заголовки для inline-режима (@bot текст) держим в памяти
+        self.inline_catalog = InlineCatalog(db_path)
+        self.inline_catalog.refresh()
+
+        # Одинаковые запросы ленты от разных пользователей выполняются одним запросом к базе
+        self.feed_flight = SingleFlight(ttl=FEED_CACHE_TTL)
+
+        # Общая лента и ленты лиг в памяти: самые частые экраны не ходят в базу
+        self.latest_feeds = LatestFeeds(db_path)
+        self.latest_feeds.prewarm()
+
+        # Строки новостей, общие для всех сессий (в сессии - только массив id)
+        self.row_cache = NewsRowCache(db_path)
+
+        # Реестр сущностей для кнопок (в callback_data - короткий id вместо имени) и таблица обработчиков
+        self.entity_registry = EntityRegistry(db_path)
+        self.callback_routes = self.build_callback_routes()
+
+        # Готовые клавиатуры и отпечатки отправленных сообщений
+        self.render = RenderCache()
+
+        # Попадания в кэши считают сами объекты - метрики читают их только при выгрузке
+        self.register_metrics()
+
+        # Добавляем обработчики (время каждой команды пишется в гистограмму)
+        commands = {
+            "start": self.start,
+            "news": self.show_news_categories,
+            "leagues": self.show_leagues,
+            "clubs": self.show_clubs,
+            "players": self.show_players_search,
+            "stats": self.show_stats,
+            "favorites": self.show_favorites,
+            "metrics": self.show_metrics,
+            "queries": self.show_slow_queries,
+            "profile": self.start_profiling,
+        }
+        for command, callback in commands.items():
+            self.application.add_handler(CommandHandler(command, track(HANDLER_SECONDS, 'command', command)(callback)))
+        # Кнопки замеряются в button_handler по действию
         self.application.add_handler(CallbackQueryHandler(self.button_handler))
+        self.application.add_handler(InlineQueryHandler(track(HANDLER_SECONDS, 'inline', 'query')(self.inline_query)))
         
         # Обработчики для текстового ввода - и для игроков, и для клубов
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text_search))
-        
+        self.application.add_handler(MessageHandler(
+            filters.TEXT & ~filters.COMMAND, track(HANDLER_SECONDS, 'text', 'search')(self.handle_text_search)
+        ))
+        
+    def register_metrics(self):
+        """Счетчики кэшей бота: hit - ответ из памяти, miss - пришлось строить или читать базу"""
+        register_callback('bot_cache_requests_total', 'Обращения к кэшам бота', lambda: {
+            ('render', 'hit'): self.render.memo_hits,
+            ('render', 'miss'): self.render.memo_misses,
+            ('feed_flight', 'hit'): self.feed_flight.shared,
+            ('feed_flight', 'miss'): self.feed_flight.executed,
+            ('news_rows', 'hit'): self.row_cache.hits,
+            ('news_rows', 'miss'): self.row_cache.misses,
+            ('media', 'hit'): self.media_cache.hits,
+            ('media', 'miss'): self.media_cache.misses,
+        }, ('cache', 'result'), kind='counter')
+        register_callback('bot_skipped_edits_total', 'Редактирования, пропущенные из-за неизменного содержимого',
+                          lambda: self.render.skipped_edits, kind='counter')
+        register_callback('bot_news_rows_cached', 'Строк новостей в общем кэше', lambda: len(self.row_cache))
+    
+    async def post_init(self, application: Application):
+        """Запускает фоновые задачи при старте приложения"""
+        # post_init вызывается до application.start(), а application.create_task в этот момент
+        # предупреждает PTBUserWarning и задачу потом не отменяет - заводим ее в цикле сами
+        # и останавливаем в post_stop
+        self.feed_poller = asyncio.get_running_loop().create_task(self.poll_latest_feeds())
+        # kill -USR2 <pid> - профилирование работающего бота без перезапуска
+        install_signal_handler('bot', asyncio.get_running_loop())
+    
+    async def post_stop(self, application: Application):
+        """Останавливает фоновые задачи после остановки приложения"""
+        poller, self.feed_poller = self.feed_poller, None
+        if poller is not None:
+            poller.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await poller
+    
+    async def poll_latest_feeds(self):
+        """Дочитывает новые новости в ленты в памяти"""
+        while True:
+            await asyncio.sleep(FEED_POLL_INTERVAL)
+            try:
+                # Читаем базу в потоке, а ленты меняем в цикле событий - там же, где их читают обработчики
+                rows = await asyncio.to_thread(self.latest_feeds.fetch_new)
+                self.latest_feeds.apply(rows)
+            except Exception as e:
+                logger.error(f"Ошибка обновления лент: {e}")
+    
+    @property
+    def data_generation(self) -> int:
+        """Меняется, когда в базе появляются новые новости: по нему устаревают готовые списки и клавиатуры"""
+        return self.latest_feeds.last_seen_id
+    
     def init_favorites_db(self):
-        """Инициализирует таблицу для хранения избранного"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS favorites (
-                user_id INTEGER,
-                type TEXT, -- 'club' или 'player'
-                name TEXT,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (user_id, type, name)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Приводит схему БД (включая таблицу избранного) к актуальной версии"""
+        version = ensure_schema(self.db_path)
+        logger.info(f"Версия схемы БД: {version}")
+    
+    @property
+    def popular_players(self) -> List[str]:
+        """10 самых упоминаемых игроков по тегам новостей"""
+        if time.monotonic() - self._popular_players_at > POPULAR_PLAYERS_TTL:
+            self._popular_players = self.get_popular_players() or entities.current().popular_players
+            self._popular_players_at = time.monotonic()
+        return self._popular_players
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -78,40 +219,39 @@ class FootballNewsBot:
             "Нажми кнопку ниже, чтобы начать просмотр новостей!"
         )
         
-        keyboard = [
+        reply_markup = self.render.cached('start_keyboard', lambda: InlineKeyboardMarkup([
             [InlineKeyboardButton("📰 Смотреть новости", callback_data="show_news_categories")],
             [InlineKeyboardButton("🏆 Выбрать лигу", callback_data="show_leagues")],
             [InlineKeyboardButton("⚽ Поиск по клубам", callback_data="show_clubs")],
             [InlineKeyboardButton("👤 Поиск по игрокам", callback_data="search_players")],
             [InlineKeyboardButton("⭐ Избранное", callback_data="show_favorites")],
             [InlineKeyboardButton("📊 Статистика", callback_data="stats")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        ]))
         
         await update.message.reply_text(welcome_text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def show_news_categories(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает категории новостей"""
-        keyboard = [
+        reply_markup = self.render.cached('categories_keyboard', lambda: InlineKeyboardMarkup([
             [InlineKeyboardButton("🔥 Все новости", callback_data="news_latest_all")],
             [InlineKeyboardButton("🏆 По лигам", callback_data="show_leagues")],
             [InlineKeyboardButton("⚽ По клубам", callback_data="show_clubs")],
             [InlineKeyboardButton("👤 По игрокам", callback_data="search_players")],
             [InlineKeyboardButton("⭐ Избранное", callback_data="show_favorites")],
             [InlineKeyboardButton("📊 Статистика", callback_data="stats")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        ]))
         
         text = "📰 <b>Категории новостей</b>\n\nВыберите как хотите просматривать новости:"
         
         if update.message:
             await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
         else:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def show_leagues(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает список лиг"""
-        leagues = self.get_all_leagues()
+        generation = self.data_generation
+        leagues = self.render.cached(('leagues', generation), self.get_all_leagues)
         
         if not leagues:
             text = "❌ Пока нет новостей по лигам. Попробуйте позже."
@@ -121,9 +261,18 @@ class FootballNewsBot:
             if update.message:
                 await update.message.reply_text(text, reply_markup=reply_markup)
             else:
-                await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
+                await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup)
             return
         
+        reply_markup = self.render.cached(('leagues_keyboard', generation), lambda: self.build_leagues_keyboard(leagues))
+        text = "🏆 <b>Выберите лигу</b>\n\nПросмотр новостей по выбранной лиге:"
+        
+        if update.message:
+            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        else:
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
+    
+    def build_leagues_keyboard(self, leagues: List[str]) -> InlineKeyboardMarkup:
         # Эмодзи для лиг
         league_emojis = {
             'Английская Премьер-лига': '🏴󠁧󠁢󠁥󠁮󠁧󠁿',
@@ -140,22 +289,17 @@ class FootballNewsBot:
         keyboard = []
         for league in leagues:
             emoji = league_emojis.get(league, '⚽')
-            keyboard.append([InlineKeyboardButton(f"{emoji} {league}", callback_data=f"league_{league}")])
+            keyboard.append([InlineKeyboardButton(f"{emoji} {league}", callback_data=self.entity_registry.callback(OPEN_ENTITY, 'league', league))])
         
         # Добавляем кнопку назад
         keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="show_news_categories")])
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        text = "🏆 <b>Выберите лигу</b>\n\nПросмотр новостей по выбранной лиге:"
-        
-        if update.message:
-            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        return InlineKeyboardMarkup(keyboard)
     
     async def show_clubs(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает список клубов для фильтрации"""
-        clubs = self.get_all_clubs()
+        generation = self.data_generation
+        clubs = self.render.cached(('clubs', generation), self.get_all_clubs)
         
         if not clubs:
             text = "❌ Пока нет новостей с тегами клубов. Попробуйте позже."
@@ -165,17 +309,30 @@ class FootballNewsBot:
             if update.message:
                 await update.message.reply_text(text, reply_markup=reply_markup)
             else:
-                await update.callback_query.edit_message_text(text, reply_markup=reply_markup)
+                await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup)
             return
         
+        clubs = clubs[:20]  # Ограничиваем до 20 клубов
+        # Клавиатура зависит только от списка клубов и того, какие из них в избранном
+        favorites = frozenset(self.get_favorites(update.effective_user.id, 'club')).intersection(clubs)
+        reply_markup = self.render.cached(
+            ('clubs_keyboard', generation, favorites), lambda: self.build_clubs_keyboard(clubs, favorites)
+        )
+        text = "⚽ <b>Выберите клуб</b>\n\nПросмотр новостей по выбранному клубу:\n⭐ - добавлено в избранное"
+        
+        if update.message:
+            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        else:
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
+    
+    def build_clubs_keyboard(self, clubs: List[str], favorites) -> InlineKeyboardMarkup:
         # Создаем кнопки для клубов (по 2 в ряд)
         keyboard = []
         row = []
-        for club in clubs[:20]:  # Ограничиваем до 20 клубов
+        for club in clubs:
             # Проверяем, добавлен ли клуб в избранное
-            is_favorite = self.is_favorite(update.effective_user.id, 'club', club)
-            star = "⭐ " if is_favorite else ""
-            row.append(InlineKeyboardButton(f"{star}{club}", callback_data=f"club_{club}"))
+            star = "⭐ " if club in favorites else ""
+            row.append(InlineKeyboardButton(f"{star}{club}", callback_data=self.entity_registry.callback(OPEN_ENTITY, 'club', club)))
             if len(row) == 2:
                 keyboard.append(row)
                 row = []
@@ -187,32 +344,37 @@ class FootballNewsBot:
         keyboard.append([InlineKeyboardButton("✏️ Ввести клуб вручную", callback_data="manual_club_search")])
         keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="show_news_categories")])
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        text = "⚽ <b>Выберите клуб</b>\n\nПросмотр новостей по выбранному клубу:\n⭐ - добавлено в избранное"
-        
-        if update.message:
-            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        return InlineKeyboardMarkup(keyboard)
     
     async def show_players_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает интерфейс поиска по игрокам"""
         text = (
             "👤 <b>Поиск новостей по игрокам</b>\n\n"
             "Выберите одного из популярных игроков или введите имя игрока вручную:\n"
-            "• Поиск работает по заголовкам новостей\n"
+            "• Поиск работает по заголовкам и текстам новостей\n"
             "• Можно вводить фамилию или полное имя\n"
             "⭐ - добавлено в избранное"
         )
         
+        players = tuple(self.popular_players)
+        favorites = frozenset(self.get_favorites(update.effective_user.id, 'player')).intersection(players)
+        reply_markup = self.render.cached(
+            ('players_keyboard', players, favorites), lambda: self.build_players_keyboard(players, favorites)
+        )
+        
+        if update.message:
+            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        else:
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
+    
+    def build_players_keyboard(self, players, favorites) -> InlineKeyboardMarkup:
         # Создаем кнопки для популярных игроков (по 2 в ряд)
         keyboard = []
         row = []
-        for player in self.popular_players:
+        for player in players:
             # Проверяем, добавлен ли игрок в избранное
-            is_favorite = self.is_favorite(update.effective_user.id, 'player', player)
-            star = "⭐ " if is_favorite else ""
-            row.append(InlineKeyboardButton(f"{star}{player}", callback_data=f"player_{player}"))
+            star = "⭐ " if player in favorites else ""
+            row.append(InlineKeyboardButton(f"{star}{player}", callback_data=self.entity_registry.callback(OPEN_ENTITY, 'player', player)))
             if len(row) == 2:
                 keyboard.append(row)
                 row = []
@@ -224,12 +386,7 @@ class FootballNewsBot:
         keyboard.append([InlineKeyboardButton("✏️ Ввести имя вручную", callback_data="manual_player_search")])
         keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="show_news_categories")])
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        if update.message:
-            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
-        else:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        return InlineKeyboardMarkup(keyboard)
     
     async def show_manual_player_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает интерфейс ручного ввода имени игрока"""
@@ -238,7 +395,7 @@ class FootballNewsBot:
             "Введите имя игрока для поиска:\n"
             "• Можно вводить фамилию или полное имя\n"
             "• Например: <i>Месси</i>, <i>Роналду</i>, <i>Мбаппе</i>\n"
-            "• Поиск работает по заголовкам новостей\n\n"
+            "• Поиск работает по заголовкам и текстам новостей\n\n"
             "💡 <i>Совет:</i> Используйте фамилию для более точного поиска"
         )
         
@@ -248,7 +405,7 @@ class FootballNewsBot:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def show_manual_club_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает интерфейс ручного ввода названия клуба"""
@@ -267,7 +424,7 @@ class FootballNewsBot:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def handle_text_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обрабатывает текстовый поиск - как по игрокам, так и по клубам"""
@@ -283,32 +440,102 @@ class FootballNewsBot:
             )
             return
         
-        # Определяем тип поиска: проверяем, есть ли такой клуб в базе
-        all_clubs = self.get_all_clubs()
-        is_club_search = any(search_text.lower() in club.lower() for club in all_clubs)
-        
-        if is_club_search:
-            await self.handle_club_search(update, context, search_text)
+        # Определяем тип поиска по справочнику сущностей (с учетом опечаток), не обращаясь к базе
+        match = resolve_entity(search_text)
+
+        if match and match.kind == CLUB:
+            await self.handle_club_search(update, context, match.name)
+        elif match:
+            await self.handle_player_search(update, context, match.name)
+        elif suggest_entities(search_text):
+            # Похоже на известную сущность, но не наверняка ("Кейнс" - не обязательно Кейн): спрашиваем
+            await self.show_search_suggestions(update, context, search_text)
         else:
+            # Игрока нет в справочнике - ищем по заголовкам и текстам как есть
             await self.handle_player_search(update, context, search_text)
     
+    async def show_search_suggestions(self, update: Update, context: ContextTypes.DEFAULT_TYPE, search_text: str):
+        """Кнопки "возможно, вы имели в виду" и поиск введенного текста как есть"""
+        context.user_data['raw_search'] = search_text
+        kind_emojis = {CLUB: '🏟', PLAYER: '👤'}
+        keyboard = [
+            [InlineKeyboardButton(f"{kind_emojis[match.kind]} {match.name}",
+                                  callback_data=self.entity_registry.callback(OPEN_ENTITY, match.kind, match.name))]
+            for match in suggest_entities(search_text)
+        ]
+        keyboard.append([InlineKeyboardButton(f"🔍 Искать «{search_text[:30]}» как есть", callback_data="search_raw")])
+        await update.message.reply_text(
+            f"🤔 Точного совпадения для «{search_text}» нет. Возможно, вы имели в виду:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+    
+    async def search_raw_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Поиск по заголовкам и текстам ровно того, что ввел пользователь"""
+        search_text = context.user_data.get('raw_search')
+        if not search_text:
+            await update.effective_message.reply_text("Запрос устарел - введите его заново")
+            return
+        await self.handle_player_search(update, context, search_text)
+    
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Inline-режим: ответ собирается из каталога в памяти, без запросов к базе"""
+        catalog = self.inline_catalog
+        if catalog.is_stale():
+            # Запросы приходят на каждое нажатие клавиши - обновляем каталог в фоне, отвечая текущим
+            context.application.create_task(asyncio.to_thread(catalog.refresh))
+        
+        search_text = update.inline_query.query.strip()
+        if search_text:
+            matched = catalog.suggest(search_text)
+            if not matched:
+                # Префикс не совпал - возможно, опечатка: в выдаче видно, чья это лента, поэтому можно и похожих
+                matched = [(match.name, match.kind) for match in suggest_entities(search_text)]
+            groups = [(name, kind, catalog.news_for(kind, name)) for name, kind in matched]
+        else:
+            groups = [(None, None, catalog.latest)]
+        
+        kind_emojis = {CLUB: '⚽', PLAYER: '👤', LEAGUE: '🏆'}
+        results = []
+        seen = set()
+        for name, kind, news_items in groups:
+            for news_item in news_items:
+                if news_item['id'] in seen or len(results) >= INLINE_RESULTS_LIMIT:
+                    continue
+                seen.add(news_item['id'])
+                
+                description = f"{kind_emojis[kind]} {name}" if name else (news_item.get('league') or '')
+                text = f"<b>{html.escape(news_item['title'])}</b>"
+                if news_item.get('link'):
+                    text += f"\n\n🔗 <a href='{news_item['link']}'>Читать на сайте</a>"
+                results.append(InlineQueryResultArticle(
+                    id=str(news_item['id']),
+                    title=news_item['title'],
+                    description=description,
+                    url=news_item.get('link') or None,
+                    input_message_content=InputTextMessageContent(text, parse_mode='HTML')
+                ))
+        
+        await update.inline_query.answer(results, cache_time=INLINE_CACHE_TIME)
+    
     async def handle_player_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE, player_name: str = None):
         """Обрабатывает поиск по игрокам"""
         if player_name is None:
             player_name = update.message.text.strip()
         
+        # Поиск приходит и из сообщения, и с кнопки "искать как есть"
+        message = update.effective_message
         if len(player_name) < 2:
-            await update.message.reply_text(
+            await message.reply_text(
                 "❌ Слишком короткий запрос. Введите минимум 2 символа.",
                 reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 К списку игроков", callback_data="search_players")]])
             )
             return
         
         # Показываем сообщение о поиске
-        search_msg = await update.message.reply_text(f"🔍 Ищу новости по игроку '{player_name}'...")
+        search_msg = await message.reply_text(f"🔍 Ищу новости по игроку '{player_name}'...")
         
-        # Ищем новости по игроку - ТОЛЬКО В ЗАГОЛОВКЕ
-        news_items = self.get_news_from_db(limit=50, player=player_name)
+        # Ищем новости по игроку в заголовках и текстах статей, включая архив
+        news_items = await self.fetch_news(limit=50, player=player_name, include_archive=True)
         
         # Удаляем сообщение о поиске
         await search_msg.delete()
@@ -327,11 +554,11 @@ class FootballNewsBot:
                 [InlineKeyboardButton("✏️ Ввести другое имя", callback_data="manual_player_search")]
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text(text, reply_markup=reply_markup)
+            await message.reply_text(text, reply_markup=reply_markup)
             return
         
-        # Сохраняем новости в контексте пользователя
-        context.user_data['news_items'] = news_items
+        # В контексте пользователя храним только id новостей, сами строки - в общем кэше
+        context.user_data['news_ids'] = self.row_cache.store(news_items)
         context.user_data['current_news_index'] = 0
         context.user_data['current_player'] = player_name
         context.user_data['news_type'] = "player_search"
@@ -354,8 +581,8 @@ class FootballNewsBot:
         # Показываем сообщение о поиске
         search_msg = await update.message.reply_text(f"🔍 Ищу новости по клубу '{club_name}'...")
         
-        # Ищем новости по клубу
-        news_items = self.get_news_from_db(limit=50, club=club_name)
+        # Ищем новости по клубу, включая архив
+        news_items = await self.fetch_news(limit=50, club=club_name, include_archive=True)
         
         # Удаляем сообщение о поиске
         await search_msg.delete()
@@ -377,8 +604,8 @@ class FootballNewsBot:
             await update.message.reply_text(text, reply_markup=reply_markup)
             return
         
-        # Сохраняем новости в контексте пользователя
-        context.user_data['news_items'] = news_items
+        # В контексте пользователя храним только id новостей, сами строки - в общем кэше
+        context.user_data['news_ids'] = self.row_cache.store(news_items)
         context.user_data['current_news_index'] = 0
         context.user_data['current_club'] = club_name
         context.user_data['news_type'] = "club_search"
@@ -430,7 +657,7 @@ class FootballNewsBot:
         if update.message:
             await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
         else:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def show_favorite_clubs(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает избранные клубы пользователя"""
@@ -445,14 +672,14 @@ class FootballNewsBot:
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
             return
         
         text = "⭐ <b>Ваши избранные клубы</b>\n\nВыберите клуб для просмотра новостей:"
         
         keyboard = []
         for club in favorite_clubs:
-            keyboard.append([InlineKeyboardButton(f"🏟 {club}", callback_data=f"club_{club}")])
+            keyboard.append([InlineKeyboardButton(f"🏟 {club}", callback_data=self.entity_registry.callback(OPEN_ENTITY, 'club', club))])
         
         keyboard.extend([
             [InlineKeyboardButton("📰 Все новости по избранным клубам", callback_data="favorite_clubs_news")],
@@ -461,7 +688,7 @@ class FootballNewsBot:
         ])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def show_favorite_players(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает избранных игроков пользователя"""
@@ -476,14 +703,14 @@ class FootballNewsBot:
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
             return
         
         text = "⭐ <b>Ваши избранные игроки</b>\n\nВыберите игрока для просмотра новостей:"
         
         keyboard = []
         for player in favorite_players:
-            keyboard.append([InlineKeyboardButton(f"👤 {player}", callback_data=f"player_{player}")])
+            keyboard.append([InlineKeyboardButton(f"👤 {player}", callback_data=self.entity_registry.callback(OPEN_ENTITY, 'player', player))])
         
         keyboard.extend([
             [InlineKeyboardButton("📰 Все новости по избранным игрокам", callback_data="favorite_players_news")],
@@ -492,7 +719,7 @@ class FootballNewsBot:
         ])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+        await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
     
     async def show_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE, 
                        club: str = None, league: str = None, player: str = None, news_type: str = "all"):
@@ -505,13 +732,16 @@ class FootballNewsBot:
         
         # Получаем новости
         if news_type == "favorite_clubs":
-            favorite_clubs = self.get_favorites(update.effective_user.id, 'club')
-            news_items = self.get_news_for_favorite_clubs(favorite_clubs)
+            news_items = self.get_news_for_favorite_clubs(update.effective_user.id)
         elif news_type == "favorite_players":
-            favorite_players = self.get_favorites(update.effective_user.id, 'player')
-            news_items = self.get_news_for_favorite_players(favorite_players)
+            news_items = self.get_news_for_favorite_players(update.effective_user.id)
+        elif not club and not player:
+            # Общая лента и лента лиги - из памяти
+            news_items = self.latest_feeds.get_latest(league)
+            if not news_items:
+                news_items = await self.fetch_news(limit=50, league=league)
         else:
-            news_items = self.get_news_from_db(limit=50, club=club, league=league, player=player)
+            news_items = await self.fetch_news(limit=50, club=club, league=league, player=player)
         
         if not news_items:
             if club:
@@ -532,38 +762,63 @@ class FootballNewsBot:
             
             if hasattr(update, 'callback_query') and update.callback_query:
                 query = update.callback_query
-                await query.edit_message_text(text, reply_markup=reply_markup)
+                await self.edit_message_text(query, text, reply_markup=reply_markup)
             else:
                 await update.message.reply_text(text, reply_markup=reply_markup)
             return
         
-        # Сохраняем новости в контексте пользователя
-        context.user_data['news_items'] = news_items
+        # В контексте пользователя храним только id новостей, сами строки - в общем кэше
+        context.user_data['news_ids'] = self.row_cache.store(news_items)
         context.user_data['current_news_index'] = 0
         
         # Показываем первую новость
         await self.display_news(update, context, 0)
     
+    async def fetch_news(self, limit: int = 50, club: str = None, league: str = None, player: str = None,
+                         include_archive: bool = False) -> List[Dict]:
+        """Лента новостей без блокировки бота; одновременные одинаковые запросы склеиваются в один"""
+        key = (limit, club, league, player, include_archive)
+        news_items = await self.feed_flight.do(
+            key, self.get_news_from_db, limit=limit, club=club, league=league, player=player,
+            include_archive=include_archive
+        )
+        # Список общий для всех, кто получил этот результат: вызывающие его только читают
+        return news_items
+    
     async def display_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE, index: int):
         """Отображает новость по индексу"""
-        news_items = context.user_data.get('news_items', [])
+        news_ids = context.user_data.get('news_ids', ())
+        news_item = self.row_cache.get(news_ids[index]) if 0 <= index < len(news_ids) else None
         
-        if not news_items or index >= len(news_items):
+        if news_item is None:
             if hasattr(update, 'callback_query') and update.callback_query:
                 await update.callback_query.answer("Новости закончились! 🏁", show_alert=True)
             else:
                 await update.message.reply_text("Новости закончились! 🏁")
             return
         
-        news_item = news_items[index]
-        
-        # Формируем заголовок с информацией о фильтре
-        filter_info = ""
         club = context.user_data.get('current_club')
         league = context.user_data.get('current_league')
         player = context.user_data.get('current_player')
         news_type = context.user_data.get('news_type')
+        club_is_favorite = bool(club) and self.is_favorite(update.effective_user.id, 'club', club)
+        player_is_favorite = bool(player) and self.is_favorite(update.effective_user.id, 'player', player)
+        
+        # Карточка зависит только от новости, позиции в ленте, фильтра и состояния избранного
+        card_args = (news_item, index, len(news_ids), club, league, player, news_type,
+                     club_is_favorite, player_is_favorite)
+        text, reply_markup = self.render.cached(
+            ('news_card', news_item['id']) + card_args[1:], lambda: self.build_news_card(*card_args)
+        )
         
+        # Отправляем или редактируем карточку новости
+        await self.send_news_card(update, text, reply_markup, news_item.get('image_url'))
+    
+    def build_news_card(self, news_item, index: int, total: int, club: str, league: str, player: str,
+                        news_type: str, club_is_favorite: bool, player_is_favorite: bool):
+        """Текст и клавиатура карточки новости"""
+        # Формируем заголовок с информацией о фильтре
+        filter_info = ""
         if club:
             filter_info = f" | Клуб: {club}"
         elif league:
@@ -622,9 +877,9 @@ class FootballNewsBot:
         if index > 0:
             nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data="news_prev"))
         
-        nav_buttons.append(InlineKeyboardButton(f"{index + 1}/{len(news_items)}", callback_data="page_info"))
+        nav_buttons.append(InlineKeyboardButton(f"{index + 1}/{total}", callback_data="page_info"))
         
-        if index < len(news_items) - 1:
+        if index < total - 1:
             nav_buttons.append(InlineKeyboardButton("Вперед ➡️", callback_data="news_next"))
         
         if nav_buttons:
@@ -632,22 +887,18 @@ class FootballNewsBot:
         
         # Кнопки добавления в избранное
         favorite_buttons = []
-        current_club = context.user_data.get('current_club')
-        current_player = context.user_data.get('current_player')
         
-        if current_club:
-            is_favorite = self.is_favorite(update.effective_user.id, 'club', current_club)
-            if is_favorite:
-                favorite_buttons.append(InlineKeyboardButton("❌ Удалить клуб из избранного", callback_data=f"remove_favorite_club_{current_club}"))
+        if club:
+            if club_is_favorite:
+                favorite_buttons.append(InlineKeyboardButton("❌ Удалить клуб из избранного", callback_data=self.favorite_callback(REMOVE_FAVORITE, 'club', club, True)))
             else:
-                favorite_buttons.append(InlineKeyboardButton("⭐ Добавить клуб в избранное", callback_data=f"add_favorite_club_{current_club}"))
+                favorite_buttons.append(InlineKeyboardButton("⭐ Добавить клуб в избранное", callback_data=self.favorite_callback(ADD_FAVORITE, 'club', club, False)))
         
-        if current_player:
-            is_favorite = self.is_favorite(update.effective_user.id, 'player', current_player)
-            if is_favorite:
-                favorite_buttons.append(InlineKeyboardButton("❌ Удалить игрока из избранного", callback_data=f"remove_favorite_player_{current_player}"))
+        if player:
+            if player_is_favorite:
+                favorite_buttons.append(InlineKeyboardButton("❌ Удалить игрока из избранного", callback_data=self.favorite_callback(REMOVE_FAVORITE, 'player', player, True)))
             else:
-                favorite_buttons.append(InlineKeyboardButton("⭐ Добавить игрока в избранное", callback_data=f"add_favorite_player_{current_player}"))
+                favorite_buttons.append(InlineKeyboardButton("⭐ Добавить игрока в избранное", callback_data=self.favorite_callback(ADD_FAVORITE, 'player', player, False)))
         
         if favorite_buttons:
             keyboard.append(favorite_buttons)
@@ -674,37 +925,112 @@ class FootballNewsBot:
         if other_buttons:
             keyboard.append(other_buttons)
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    def favorite_callback(self, action: str, kind: str, name: str, is_favorite: bool) -> str:
+        """callback_data кнопки избранного; в постоянный реестр попадают только известные сущности и избранное"""
+        # Клубы приходят только из справочника, а игрок - и из свободного поиска
+        if kind == 'club' or is_favorite or name in entities.current().players:
+            return self.entity_registry.callback(action, kind, name)
+        # Произвольный текст поиска: без id, обработчик возьмет имя из сессии пользователя
+        return action
+    
+    async def send_news_card(self, update: Update, text: str, reply_markup: InlineKeyboardMarkup, image_url: str = None):
+        """Отправляет новость карточкой с фото (по file_id из кэша) или текстом, если фото нет"""
+        photo = self.media_cache.resolve(image_url) if len(text) <= CAPTION_LIMIT else None
+        query = update.callback_query if hasattr(update, 'callback_query') else None
+        # В отпечатке - исходная ссылка: после кэширования file_id картинка для пользователя та же
+        media = image_url if photo else None
+        
+        if query and self.render.is_unchanged(query.message, text, reply_markup, media):
+            # Пользователь уже видит ровно эту карточку - не тратим запрос к Telegram
+            return
         
-        # Отправляем или редактируем сообщение
-        if hasattr(update, 'callback_query') and update.callback_query:
-            query = update.callback_query
-            
-            # Редактируем существующее сообщение
-            try:
-                await query.edit_message_text(
-                    text=text,
-                    reply_markup=reply_markup,
-                    parse_mode='HTML',
-                    disable_web_page_preview=False
-                )
-            except Exception as e:
-                logger.error(f"Ошибка редактирования сообщения: {e}")
-                # Если не удалось отредактировать, отправляем новое сообщение
-                await query.message.reply_text(
-                    text=text,
-                    reply_markup=reply_markup,
-                    parse_mode='HTML',
-                    disable_web_page_preview=False
-                )
-        else:
-            # Отправляем новое сообщение
-            await update.message.reply_text(
+        try:
+            if query and query.message and bool(query.message.photo) == bool(photo):
+                # Тип сообщения не меняется - просто редактируем его
+                if photo:
+                    sent = await query.edit_message_media(
+                        InputMediaPhoto(media=photo, caption=text, parse_mode='HTML'),
+                        reply_markup=reply_markup
+                    )
+                else:
+                    await query.edit_message_text(
+                        text=text,
+                        reply_markup=reply_markup,
+                        parse_mode='HTML',
+                        disable_web_page_preview=False
+                    )
+                    self.render.remember(query.message, text, reply_markup)
+                    return
+            else:
+                if query and query.message:
+                    # Текст нельзя превратить в фото (и наоборот) редактированием - заменяем сообщение
+                    message = query.message
+                    await message.delete()
+                    self.render.forget(message)
+                else:
+                    message = update.message
+                
+                if photo:
+                    sent = await message.chat.send_photo(photo=photo, caption=text, reply_markup=reply_markup, parse_mode='HTML')
+                else:
+                    sent = await message.chat.send_message(
+                        text=text,
+                        reply_markup=reply_markup,
+                        parse_mode='HTML',
+                        disable_web_page_preview=False
+                    )
+                    self.render.remember(sent, text, reply_markup)
+                    return
+        except Exception as e:
+            if is_not_modified_error(e):
+                # Содержимое не изменилось - это не ошибка, и дублировать сообщение не нужно
+                self.render.remember(query.message if query else None, text, reply_markup, media)
+                return
+            logger.error(f"Ошибка отправки карточки новости: {e}")
+            if photo and is_media_error(e):
+                # Устаревший file_id удаляем, а ссылку, которую Telegram не смог скачать, больше не пробуем.
+                # Сетевые сбои и прочие ошибки кэш не трогают - в следующий раз фото попробуем снова
+                if self.media_cache.is_cached(image_url):
+                    self.media_cache.forget(image_url)
+                else:
+                    self.media_cache.remember(image_url, UNUSABLE)
+            # Если не удалось, отправляем новое текстовое сообщение
+            message = query.message if query and query.message else update.message
+            sent = await message.chat.send_message(
                 text=text,
                 reply_markup=reply_markup,
                 parse_mode='HTML',
                 disable_web_page_preview=False
             )
+            self.render.remember(sent, text, reply_markup)
+            return
+        
+        self.render.remember(sent, text, reply_markup, media)
+        
+        # Запоминаем file_id после первой загрузки - дальше отправляем без повторного скачивания
+        if isinstance(sent, Message) and sent.photo and not self.media_cache.is_cached(image_url):
+            self.media_cache.remember(image_url, sent.photo[-1].file_id)
+    
+    async def edit_message_text(self, query, text: str, **kwargs):
+        """Редактирует текст сообщения; карточку с фото заменяет текстовым сообщением"""
+        reply_markup = kwargs.get('reply_markup')
+        if self.render.is_unchanged(query.message, text, reply_markup):
+            return
+        
+        if query.message and query.message.photo:
+            await query.message.delete()
+            self.render.forget(query.message)
+            sent = await query.message.chat.send_message(text, **kwargs)
+            self.render.remember(sent, text, reply_markup)
+        else:
+            try:
+                await query.edit_message_text(text, **kwargs)
+            except BadRequest as e:
+                if not is_not_modified_error(e):
+                    raise
+            self.render.remember(query.message, text, reply_markup)
     
     async def show_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает статистику"""
@@ -751,148 +1077,201 @@ class FootballNewsBot:
         if update.message:
             await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
         else:
-            await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+            await self.edit_message_text(update.callback_query, text, reply_markup=reply_markup, parse_mode='HTML')
+    
+    async def show_metrics(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Сводка метрик для администраторов (полная выгрузка - на HTTP-эндпоинте /metrics)"""
+        if update.effective_user.id not in ADMIN_USER_IDS:
+            await update.message.reply_text("Команда доступна только администраторам")
+            return
+        
+        text = REGISTRY.summary() or "Пока нет данных"
+        # Ограничение Telegram на длину сообщения - 4096 символов
+        await update.message.reply_text(f"<pre>{html.escape(text[:4000])}</pre>", parse_mode='HTML')
+    
+    async def show_slow_queries(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Самые тяжелые формы запросов к базе с планами (для администраторов)"""
+        if update.effective_user.id not in ADMIN_USER_IDS:
+            await update.message.reply_text("Команда доступна только администраторам")
+            return
+        
+        text = QUERY_LOG.report(limit=5) or "Запросов пока не было"
+        await update.message.reply_text(f"<pre>{html.escape(text[:4000])}</pre>", parse_mode='HTML')
+    
+    async def start_profiling(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Семплирующий профайлер на N секунд (/profile N); результат - файл collapsed stacks для flame graph"""
+        if update.effective_user.id not in ADMIN_USER_IDS:
+            await update.message.reply_text("Команда доступна только администраторам")
+            return
+        
+        seconds = PROFILE_SECONDS
+        if context.args and context.args[0].isdigit():
+            seconds = max(1, min(int(context.args[0]), MAX_PROFILE_SECONDS))
+        loop = asyncio.get_running_loop()
+        message = update.message
+        
+        def on_done(path, profiler):
+            top = '\n'.join(f"{count:>6} {function}" for function, count in profiler.top_functions(10))
+            text = f"Профиль: {path} ({profiler.sample_count} замеров)\n\n{top}"
+            asyncio.run_coroutine_threadsafe(
+                message.reply_text(f"<pre>{html.escape(text[:4000])}</pre>", parse_mode='HTML'), loop
+            )
+        
+        if profile_in_background('bot', seconds, loop, on_done):
+            await message.reply_text(f"Профилирование на {seconds} с запущено")
+        else:
+            await message.reply_text("Профилирование уже идет")
+    
+    def build_callback_routes(self) -> Dict:
+        """Таблица обработчиков кнопок: действие -> метод"""
+        return {
+            "show_news_categories": self.show_news_categories,
+            "news_latest_all": self.show_news,
+            "show_leagues": self.show_leagues,
+            "show_clubs": self.show_clubs,
+            "search_players": self.show_players_search,
+            "manual_player_search": self.show_manual_player_search,
+            "manual_club_search": self.show_manual_club_search,
+            "show_favorites": self.show_favorites,
+            "favorite_clubs": self.show_favorite_clubs,
+            "favorite_players": self.show_favorite_players,
+            "favorite_clubs_news": self.show_favorite_clubs_news,
+            "favorite_players_news": self.show_favorite_players_news,
+            "news_next": self.show_next_news,
+            "news_prev": self.show_previous_news,
+            "stats": self.show_stats,
+            "page_info": self.show_page_info,
+            "search_raw": self.search_raw_text,
+            OPEN_ENTITY: self.open_entity,
+            ADD_FAVORITE: self.add_favorite_entity,
+            REMOVE_FAVORITE: self.remove_favorite_entity,
+        }
     
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик нажатий на кнопки"""
         query = update.callback_query
-        await query.answer()
-        
-        data = query.data
-        
-        if data == "show_news_categories":
-            await self.show_news_categories(update, context)
-        
-        elif data == "news_latest_all":
-            await self.show_news(update, context)
-        
-        elif data == "show_leagues":
-            await self.show_leagues(update, context)
-        
-        elif data == "show_clubs":
-            await self.show_clubs(update, context)
-        
-        elif data == "search_players":
-            await self.show_players_search(update, context)
-        
-        elif data == "manual_player_search":
-            await self.show_manual_player_search(update, context)
-        
-        elif data == "manual_club_search":
-            await self.show_manual_club_search(update, context)
-        
-        elif data == "show_favorites":
-            await self.show_favorites(update, context)
-        
-        elif data == "favorite_clubs":
-            await self.show_favorite_clubs(update, context)
-        
-        elif data == "favorite_players":
-            await self.show_favorite_players(update, context)
-        
-        elif data == "favorite_clubs_news":
-            await self.show_news(update, context, news_type="favorite_clubs")
-        
-        elif data == "favorite_players_news":
-            await self.show_news(update, context, news_type="favorite_players")
-        
-        elif data.startswith("player_"):
-            player = data[7:]  # Убираем префикс "player_"
-            await self.show_news(update, context, player=player)
-        
-        elif data.startswith("league_"):
-            league = data[7:]  # Убираем префикс "league_"
-            await self.show_news(update, context, league=league)
-        
-        elif data.startswith("club_"):
-            club = data[5:]  # Убираем префикс "club_"
-            await self.show_news(update, context, club=club)
-        
-        elif data.startswith("add_favorite_club_"):
-            club = data[18:]  # Убираем префикс "add_favorite_club_"
-            user_id = update.effective_user.id
-            self.add_favorite(user_id, 'club', club)
-            await query.answer(f"✅ Клуб '{club}' добавлен в избранное!")
-            # Обновляем текущее сообщение
-            current_index = context.user_data.get('current_news_index', 0)
-            await self.display_news(update, context, current_index)
-        
-        elif data.startswith("remove_favorite_club_"):
-            club = data[21:]  # Убираем префикс "remove_favorite_club_"
-            user_id = update.effective_user.id
-            self.remove_favorite(user_id, 'club', club)
-            await query.answer(f"❌ Клуб '{club}' удален из избранного")
-            # Обновляем текущее сообщение
-            current_index = context.user_data.get('current_news_index', 0)
-            await self.display_news(update, context, current_index)
-        
-        elif data.startswith("add_favorite_player_"):
-            player = data[20:]  # Убираем префикс "add_favorite_player_"
-            user_id = update.effective_user.id
-            self.add_favorite(user_id, 'player', player)
-            await query.answer(f"✅ Игрок '{player}' добавлен в избранное!")
-            # Обновляем текущее сообщение
-            current_index = context.user_data.get('current_news_index', 0)
-            await self.display_news(update, context, current_index)
-        
-        elif data.startswith("remove_favorite_player_"):
-            player = data[23:]  # Убираем префикс "remove_favorite_player_"
-            user_id = update.effective_user.id
-            self.remove_favorite(user_id, 'player', player)
-            await query.answer(f"❌ Игрок '{player}' удален из избранного")
-            # Обновляем текущее сообщение
-            current_index = context.user_data.get('current_news_index', 0)
-            await self.display_news(update, context, current_index)
-        
-        elif data == "news_next":
-            current_index = context.user_data.get('current_news_index', 0)
-            context.user_data['current_news_index'] = current_index + 1
-            await self.display_news(update, context, current_index + 1)
-        
-        elif data == "news_prev":
-            current_index = context.user_data.get('current_news_index', 0)
-            context.user_data['current_news_index'] = current_index - 1
-            await self.display_news(update, context, current_index - 1)
-        
-        elif data == "stats":
-            await self.show_stats(update, context)
-        
-        elif data == "page_info":
-            # Просто показываем информацию о текущей странице
-            current_index = context.user_data.get('current_news_index', 0)
-            news_items = context.user_data.get('news_items', [])
-            await query.answer(f"Страница {current_index + 1} из {len(news_items)}")
+        action, entity_id = decode_callback(query.data)
+        handler = self.callback_routes.get(action)
+        
+        # Метка - только известные действия, чтобы мусорные callback_data не плодили серии
+        with HANDLER_SECONDS.time('callback', action if handler else 'unknown'):
+            await self.dispatch_callback(update, context, query, action, entity_id, handler)
+    
+    async def dispatch_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE, query, action: str,
+                                entity_id, handler):
+        """Отвечает на нажатие и вызывает обработчик действия (с сущностью из реестра, если она есть)"""
+        if action not in SELF_ANSWERING_ACTIONS:
+            await query.answer()
+        
+        if handler is None:
+            # Кнопка из старой версии бота
+            logger.info(f"Неизвестная кнопка: {query.data}")
+            return
+        
+        if entity_id is None:
+            await handler(update, context)
+            return
+        
+        entity = self.entity_registry.lookup(entity_id)
+        if entity is None:
+            logger.info(f"Неизвестная сущность в кнопке: {query.data}")
+            return
+        await handler(update, context, *entity)
+    
+    async def open_entity(self, update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str, name: str):
+        """Лента новостей по клубу, лиге или игроку"""
+        await self.show_news(update, context, **{kind: name})
+    
+    async def add_favorite_entity(self, update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str = None,
+                                  name: str = None):
+        if name is None:
+            # Кнопка без id (см. favorite_callback) - игрок из текущего поиска
+            kind, name = 'player', context.user_data.get('current_player')
+            if not name:
+                await update.callback_query.answer("Кнопка устарела - откройте ленту заново")
+                return
+        self.add_favorite(update.effective_user.id, kind, name)
+        if kind == 'club':
+            await update.callback_query.answer(f"✅ Клуб '{name}' добавлен в избранное!")
+        else:
+            await update.callback_query.answer(f"✅ Игрок '{name}' добавлен в избранное!")
+        # Обновляем текущее сообщение
+        await self.display_news(update, context, context.user_data.get('current_news_index', 0))
+    
+    async def remove_favorite_entity(self, update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str = None,
+                                     name: str = None):
+        if name is None:
+            # Кнопка без id (см. favorite_callback) - игрок из текущего поиска
+            kind, name = 'player', context.user_data.get('current_player')
+            if not name:
+                await update.callback_query.answer("Кнопка устарела - откройте ленту заново")
+                return
+        self.remove_favorite(update.effective_user.id, kind, name)
+        if kind == 'club':
+            await update.callback_query.answer(f"❌ Клуб '{name}' удален из избранного")
+        else:
+            await update.callback_query.answer(f"❌ Игрок '{name}' удален из избранного")
+        # Обновляем текущее сообщение
+        await self.display_news(update, context, context.user_data.get('current_news_index', 0))
+    
+    async def show_favorite_clubs_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self.show_news(update, context, news_type="favorite_clubs")
+    
+    async def show_favorite_players_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await self.show_news(update, context, news_type="favorite_players")
+    
+    async def show_next_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        current_index = context.user_data.get('current_news_index', 0)
+        context.user_data['current_news_index'] = current_index + 1
+        await self.display_news(update, context, current_index + 1)
+    
+    async def show_previous_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        current_index = context.user_data.get('current_news_index', 0)
+        context.user_data['current_news_index'] = current_index - 1
+        await self.display_news(update, context, current_index - 1)
+    
+    async def show_page_info(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Просто показываем информацию о текущей странице"""
+        current_index = context.user_data.get('current_news_index', 0)
+        news_ids = context.user_data.get('news_ids', ())
+        await update.callback_query.answer(f"Страница {current_index + 1} из {len(news_ids)}")
     
     # Методы для работы с избранным
+    @track(DB_QUERY_SECONDS, 'add_favorite')
     def add_favorite(self, user_id: int, item_type: str, name: str):
         """Добавляет элемент в избранное"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute(
             'INSERT OR REPLACE INTO favorites (user_id, type, name) VALUES (?, ?, ?)',
             (user_id, item_type, name)
         )
+        # Подписки изменились - пересобираем личную ленту
+        rebuild_inbox(cursor, user_id, item_type)
         
         conn.commit()
         conn.close()
     
+    @track(DB_QUERY_SECONDS, 'remove_favorite')
     def remove_favorite(self, user_id: int, item_type: str, name: str):
         """Удаляет элемент из избранного"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute(
             'DELETE FROM favorites WHERE user_id = ? AND type = ? AND name = ?',
             (user_id, item_type, name)
         )
+        rebuild_inbox(cursor, user_id, item_type)
         
         conn.commit()
         conn.close()
     
+    @track(DB_QUERY_SECONDS, 'get_favorites')
     def get_favorites(self, user_id: int, item_type: str = None):
         """Получает избранное пользователя"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         if item_type:
@@ -914,9 +1293,10 @@ class FootballNewsBot:
         else:
             return results
     
+    @track(DB_QUERY_SECONDS, 'is_favorite')
     def is_favorite(self, user_id: int, item_type: str, name: str) -> bool:
         """Проверяет, есть ли элемент в избранном"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute(
@@ -928,55 +1308,28 @@ class FootballNewsBot:
         conn.close()
         return result
     
-    def get_news_for_favorite_clubs(self, clubs: List[str], limit: int = 50):
+    def get_news_for_favorite_clubs(self, user_id: int, limit: int = 50):
         """Получает новости для избранных клубов"""
-        if not clubs:
-            return []
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Создаем условия для LIKE для каждого клуба
-        conditions = []
-        params = []
-        for club in clubs:
-            conditions.append('club_tags LIKE ?')
-            params.append(f'%{club}%')
-        
-        query = f'SELECT * FROM news WHERE ({" OR ".join(conditions)}) ORDER BY created_at DESC LIMIT ?'
-        params.append(limit)
-        
-        cursor.execute(query, params)
-        
-        news_items = []
-        columns = [column[0] for column in cursor.description]
-        
-        for row in cursor.fetchall():
-            news_item = dict(zip(columns, row))
-            news_items.append(news_item)
-        
-        conn.close()
-        return news_items
+        return self.get_inbox_news(user_id, 'club', limit)
     
-    def get_news_for_favorite_players(self, players: List[str], limit: int = 50):
+    def get_news_for_favorite_players(self, user_id: int, limit: int = 50):
         """Получает новости для избранных игроков"""
-        if not players:
-            return []
-        
-        conn = sqlite3.connect(self.db_path)
+        return self.get_inbox_news(user_id, 'player', limit)
+    
+    @track(DB_QUERY_SECONDS, 'get_inbox_news')
+    def get_inbox_news(self, user_id: int, kind: str, limit: int = 50):
+        """Читает личную ленту избранного: новости туда раскладываются при сохранении,
+        поэтому время чтения не зависит от количества подписок"""
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        # Создаем условия для LIKE для каждого игрока
-        conditions = []
-        params = []
-        for player in players:
-            conditions.append('title LIKE ?')
-            params.append(f'%{player}%')
-        
-        query = f'SELECT * FROM news WHERE ({" OR ".join(conditions)}) ORDER BY created_at DESC LIMIT ?'
-        params.append(limit)
-        
-        cursor.execute(query, params)
+        cursor.execute('''
+            SELECT news.* FROM user_inbox
+            JOIN news ON news.id = user_inbox.news_id
+            WHERE user_inbox.user_id = ? AND user_inbox.kind = ?
+            ORDER BY news.created_at DESC, news.id DESC
+            LIMIT ?
+        ''', (user_id, kind, limit))
         
         news_items = []
         columns = [column[0] for column in cursor.description]
@@ -989,28 +1342,62 @@ class FootballNewsBot:
         return news_items
     
     # Методы для работы с базой данных новостей
-    def get_news_from_db(self, limit: int = 100, club: str = None, league: str = None, player: str = None):
-        """Получает новости из базы данных"""
-        conn = sqlite3.connect(self.db_path)
+    @track(DB_QUERY_SECONDS, 'get_news_from_db')
+    def get_news_from_db(self, limit: int = 100, club: str = None, league: str = None, player: str = None,
+                         include_archive: bool = False):
+        """Получает новости из базы данных (с include_archive - вместе с архивом старых новостей)"""
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        query = 'SELECT * FROM news WHERE 1=1'
+        conditions = []
         params = []
         
         if club:
-            query += ' AND club_tags LIKE ?'
+            conditions.append('club_tags LIKE ?')
             params.append(f'%{club}%')
         
         if league:
-            query += ' AND league = ?'
+            conditions.append('league = ?')
             params.append(league)
+        
+        archive_conditions = list(conditions)
+        archive_params = list(params)
             
         if player:
-            # ИЩЕМ ТОЛЬКО В ЗАГОЛОВКЕ, так как поля content нет
-            query += ' AND title LIKE ?'
-            params.append(f'%{player}%')
-            
-        query += ' ORDER BY created_at DESC LIMIT ?'
+            # Известный игрок - по индексу тегов, иначе по заголовку; плюс полнотекстовый индекс статей
+            fts_query = build_fts_query(player)
+            canonical = resolve_player(player)
+            if canonical:
+                conditions.append(
+                    '(id IN (SELECT news_id FROM player_tags WHERE player = ?)'
+                    ' OR id IN (SELECT rowid FROM news_fts WHERE news_fts MATCH ?))'
+                )
+                params.extend([canonical, fts_query])
+            elif fts_query:
+                conditions.append('(title LIKE ? OR id IN (SELECT rowid FROM news_fts WHERE news_fts MATCH ?))')
+                params.extend([f'%{player}%', fts_query])
+            else:
+                conditions.append('title LIKE ?')
+                params.append(f'%{player}%')
+            # В архиве полнотекстового индекса нет - только заголовки
+            archive_conditions.append('title LIKE ?')
+            archive_params.append(f'%{player}%')
+        
+        where = ' AND '.join(conditions) or '1=1'
+        
+        if include_archive and attach_archive(conn, default_archive_path(self.db_path)):
+            # История: горячая база и архив, подключенный через ATTACH
+            archive_where = ' AND '.join(archive_conditions) or '1=1'
+            query = (
+                f'SELECT * FROM ('
+                f'SELECT {NEWS_COLUMNS} FROM main.news WHERE {where} '
+                f'UNION ALL '
+                f'SELECT {NEWS_COLUMNS} FROM archive.news WHERE {archive_where}'
+                f') ORDER BY created_at DESC LIMIT ?'
+            )
+            params.extend(archive_params)
+        else:
+            query = f'SELECT * FROM news WHERE {where} ORDER BY created_at DESC LIMIT ?'
         params.append(limit)
         
         # Отладочная информация
@@ -1029,9 +1416,27 @@ class FootballNewsBot:
         conn.close()
         return news_items
     
+    @track(DB_QUERY_SECONDS, 'get_popular_players')
+    def get_popular_players(self, limit: int = 10) -> List[str]:
+        """Игроки, которые чаще всего встречаются в новостях"""
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT player FROM player_tags
+            GROUP BY player
+            ORDER BY COUNT(*) DESC, player
+            LIMIT ?
+        ''', (limit,))
+        
+        players = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        return players
+    
+    @track(DB_QUERY_SECONDS, 'get_all_clubs')
     def get_all_clubs(self):
         """Получает список всех клубов из базы данных"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1048,9 +1453,10 @@ class FootballNewsBot:
         conn.close()
         return sorted(list(clubs))
     
+    @track(DB_QUERY_SECONDS, 'get_all_leagues')
     def get_all_leagues(self):
         """Получает список всех лиг из базы данных"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1064,9 +1470,10 @@ class FootballNewsBot:
         conn.close()
         return sorted(list(set(leagues)))
     
+    @track(DB_QUERY_SECONDS, 'get_news_count')
     def get_news_count(self, league: str = None):
         """Получает общее количество новостей в базе"""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         if league:
@@ -1078,32 +1485,6 @@ class FootballNewsBot:
         conn.close()
         return count
     
-    def check_database_structure(self):
-        """Проверяет структуру базы данных для отладки"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Проверяем таблицы
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
-        print("Таблицы в базе:", tables)
-        
-        # Проверяем структуру таблицы news
-        cursor.execute("PRAGMA table_info(news)")
-        columns = cursor.fetchall()
-        print("Структура таблицы news:")
-        for col in columns:
-            print(f"  {col[1]} ({col[2]})")
-        
-        # Показываем примеры данных (только существующие колонки)
-        cursor.execute("SELECT * FROM news LIMIT 3")
-        samples = cursor.fetchall()
-        print("Примеры новостей (первые 3 записи):")
-        for i, sample in enumerate(samples, 1):
-            print(f"  {i}. {sample}")
-        
-        conn.close()
-    
     def run(self):
         """Запускает бота"""
         print("Бот запущен...")
@@ -1117,11 +1498,14 @@ class FootballNewsBot:
         print("/stats - Статистика")
         print(f"\nПопулярные игроки для поиска: {', '.join(self.popular_players)}")
         print("\n🔍 Теперь можно искать новости по клубам и игрокам с клавиатуры!")
-        
-        # Проверяем структуру базы данных при запуске
-        print("\n=== ПРОВЕРКА СТРУКТУРЫ БАЗЫ ДАННЫХ ===")
-        self.check_database_structure()
-        print("=== КОНЕЦ ПРОВЕРКИ ===\n")
+        print("💬 Inline-режим: @имя_бота <текст> в любом чате (включается в @BotFather командой /setinline)")
+        if METRICS_PORT:
+            try:
+                serve(METRICS_PORT, METRICS_HOST)
+                print(f"📈 Метрики: http://{METRICS_HOST}:{METRICS_PORT}/metrics (сводка в чате - /metrics для BOT_ADMIN_IDS)")
+            except OSError as e:
+                # Порт занят (второй экземпляр бота и т.п.) - бот работает и без эндпоинта, сводка /metrics остается
+                logger.error(f"Эндпоинт метрик {METRICS_HOST}:{METRICS_PORT} не запущен: {e}")
         
         self.application.run_polling()
 
@@ -0,0 +1,73 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from database import connect
+
+# Формат callback_data: "<действие>" или "<действие>:<id сущности>".
+# Имя клуба или игрока в кнопку не попадает - только короткий id из реестра,
+# так что любая длина имени укладывается в лимит Telegram (64 байта).
+
+# Действия с сущностью (тип сущности определяется по id)
+OPEN_ENTITY = 'o'
+ADD_FAVORITE = 'fa'
+REMOVE_FAVORITE = 'fr'
+
+# Telegram не принимает callback_data длиннее 64 байт
+CALLBACK_DATA_LIMIT = 64
+
+
+class EntityRegistry:
+    """Постоянный реестр сущностей для кнопок: (тип, имя) <-> целочисленный id.
+
+    id не меняются между перезапусками, поэтому старые кнопки в чатах продолжают работать.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.ids: Dict[Tuple[str, str], int] = {}
+        self.entities: Dict[int, Tuple[str, str]] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, kind, name FROM callback_entities')
+        for entity_id, kind, name in cursor.fetchall():
+            self.ids[(kind, name)] = entity_id
+            self.entities[entity_id] = (kind, name)
+        conn.close()
+
+    def intern(self, kind: str, name: str) -> int:
+        """id сущности; новая сущность записывается в базу один раз"""
+        entity_id = self.ids.get((kind, name))
+        if entity_id is not None:
+            return entity_id
+        with self.lock:
+            entity_id = self.ids.get((kind, name))
+            if entity_id is None:
+                conn = connect(self.db_path)
+                conn.execute('INSERT OR IGNORE INTO callback_entities (kind, name) VALUES (?, ?)', (kind, name))
+                entity_id = conn.execute(
+                    'SELECT id FROM callback_entities WHERE kind = ? AND name = ?', (kind, name)
+                ).fetchone()[0]
+                conn.commit()
+                conn.close()
+                self.entities[entity_id] = (kind, name)
+                self.ids[(kind, name)] = entity_id
+        return entity_id
+
+    def lookup(self, entity_id: int) -> Optional[Tuple[str, str]]:
+        return self.entities.get(entity_id)
+
+    def callback(self, action: str, kind: str, name: str) -> str:
+        """callback_data для действия с сущностью"""
+        return f'{action}:{self.intern(kind, name)}'
+
+
+def decode_callback(data: str) -> Tuple[str, Optional[int]]:
+    """Разбирает callback_data на действие и id сущности (None для простых действий)"""
+    action, _, entity_id = data.partition(':')
+    if entity_id.isdigit():
+        return action, int(entity_id)
+    return action, None
@@ -0,0 +1,84 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import ensure_schema
+from metrics import write_textfile
+from profiler import SamplingProfiler, default_path, install_signal_handler
+from news_source import SOURCES
+from retention import NewsArchiver
+
+# Импорт модулей регистрирует источники в news_source.SOURCES
+import scrap  # noqa: F401
+import scrap_champ  # noqa: F401
+
+
+def run_source(source, pages: int):
+    """Обходит один источник и возвращает (новости, время)"""
+    started = time.perf_counter()
+    try:
+        news = source.scrape(pages)
+    except Exception as e:
+        print(f"[{source.name}] Ошибка парсинга: {e}")
+        news = []
+    return news, time.perf_counter() - started
+
+
+def run_all_sources(db_path: str = "football_news.db", pages: int = 2, fetch_bodies: bool = False,
+                    save_files: bool = True):
+    """Параллельно обходит все зарегистрированные источники.
+
+    Сайты обходятся одновременно (внутри сайта страницы идут последовательно с паузами),
+    поэтому полное обновление длится столько, сколько самый медленный сайт.
+    """
+    # Миграции один раз до запуска потоков
+    ensure_schema(db_path)
+    sources = [source_class(db_path, fetch_bodies=fetch_bodies) for source_class in SOURCES]
+
+    started = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+        futures = {source.name: executor.submit(run_source, source, pages) for source in sources}
+        for source in sources:
+            results[source.name] = futures[source.name].result()
+    total_time = time.perf_counter() - started
+
+    print("\n=== ИТОГИ ОБНОВЛЕНИЯ ===")
+    all_news = []
+    for source in sources:
+        news, seconds = results[source.name]
+        all_news.extend(news)
+        print(f"{source.name}: {len(news)} новостей, новых в БД: {len(source.new_links)}, {seconds:.1f} с")
+        if save_files and news:
+            source.save_data(news, "all_leagues")
+    print(f"Всего: {len(all_news)} новостей за {total_time:.1f} с "
+          f"(последовательно было бы {sum(seconds for _, seconds in results.values()):.1f} с)")
+
+    NewsArchiver(db_path).rollover()
+    return all_news
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    pages = int(args[0]) if args else 2
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    fetch_bodies = '--bodies' in sys.argv
+    # kill -USR2 <pid> профилирует идущий обход; --profile - весь обход целиком
+    install_signal_handler('crawler')
+    profiler = SamplingProfiler() if '--profile' in sys.argv else None
+    if profiler:
+        profiler.start()
+    run_all_sources(pages=pages, fetch_bodies=fetch_bodies)
+    if profiler:
+        profiler.stop()
+        path = default_path('crawler')
+        profiler.write(path)
+        print(f"Профиль: {path} ({profiler.sample_count} замеров)")
+    if 'metrics' in options:
+        # Процесс короткий - метрики сохраняем файлом (например, для textfile-коллектора Prometheus)
+        write_textfile(options['metrics'])
+        print(f"Метрики: {options['metrics']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import sqlite3
+
+from entities import extract_player_tags
+from inbox import rebuild_all_inboxes
+from query_log import ENABLED as QUERY_LOG_ENABLED, LoggedConnection
+
+# Общий модуль схемы БД для парсеров и бота.
+# Версия схемы хранится в PRAGMA user_version; каждая миграция выполняется ровно один раз,
+# а обычный запуск сводится к одной проверке версии.
+
+
+class Migration:
+    def __init__(self, version: int, description: str, statements, transactional: bool = True):
+        self.version = version
+        self.description = description
+        # Список SQL-выражений или функция apply(cursor)
+        self.statements = statements
+        # PRAGMA journal_mode, VACUUM и т.п. нельзя выполнять внутри транзакции
+        self.transactional = transactional
+
+    def apply(self, cursor):
+        if callable(self.statements):
+            self.statements(cursor)
+        else:
+            for statement in self.statements:
+                cursor.execute(statement)
+
+
+def connect(db_path: str, timeout: float = 30) -> sqlite3.Connection:
+    """Открывает соединение с БД (с журналом медленных запросов, если он не выключен)"""
+    if QUERY_LOG_ENABLED:
+        return sqlite3.connect(db_path, timeout=timeout, factory=LoggedConnection)
+    return sqlite3.connect(db_path, timeout=timeout)
+
+
+def _create_news_schema(cursor):
+    """Базовая схема: таблица новостей и избранного"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            link TEXT UNIQUE,
+            rubric TEXT,
+            date TEXT,
+            image_url TEXT,
+            scraped_at TEXT,
+            club_tags TEXT,
+            league TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # В старых базах колонки league может не быть
+    cursor.execute("PRAGMA table_info(news)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'league' not in columns:
+        cursor.execute('ALTER TABLE news ADD COLUMN league TEXT')
+
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_title ON news(title)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_club_tags ON news(club_tags)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_league ON news(league)')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS favorites (
+            user_id INTEGER,
+            type TEXT, -- 'club' или 'player'
+            name TEXT,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, type, name)
+        )
+    ''')
+
+
+def _create_player_tags(cursor):
+    """Связь новость <-> игрок с индексами в обе стороны и разметка уже сохраненных новостей"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS player_tags (
+            player TEXT NOT NULL,
+            news_id INTEGER NOT NULL,
+            PRIMARY KEY (player, news_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_player_tags_news ON player_tags(news_id)')
+
+    cursor.execute('SELECT id, title FROM news')
+    for news_id, title in cursor.fetchall():
+        save_player_tags(cursor, news_id, extract_player_tags(title))
+
+
+def save_player_tags(cursor, news_id: int, players):
+    """Записывает теги игроков для новости"""
+    cursor.executemany(
+        'INSERT OR IGNORE INTO player_tags (player, news_id) VALUES (?, ?)',
+        [(player, news_id) for player in players]
+    )
+
+
+def _create_user_inbox(cursor):
+    """Личные ленты избранного: новость раскладывается подписчикам при сохранении"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_inbox (
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL, -- 'club' или 'player', как type в favorites
+            news_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, kind, news_id)
+        ) WITHOUT ROWID
+    ''')
+    # Для удаления новостей при переносе в архив
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_inbox_news ON user_inbox(news_id)')
+    rebuild_all_inboxes(cursor)
+
+
+MIGRATIONS = [
+    Migration(1, "Таблицы news и favorites", _create_news_schema),
+    Migration(2, "Тексты статей и полнотекстовый индекс", [
+        # Тексты храним отдельно от news, чтобы горячие запросы не читали лишние байты
+        '''CREATE TABLE IF NOT EXISTS news_bodies (
+            news_id INTEGER PRIMARY KEY REFERENCES news(id),
+            body BLOB NOT NULL,
+            raw_size INTEGER NOT NULL,
+            fetched_at TEXT
+        )''',
+        # Индекс без хранения контента: rowid = news.id, сам текст лежит сжатым в news_bodies
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+            title, body, content='', tokenize='unicode61 remove_diacritics 2'
+        )''',
+    ]),
+    Migration(3, "Кэш file_id картинок Telegram", [
+        '''CREATE TABLE IF NOT EXISTS media_cache (
+            image_url TEXT PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+    ]),
+    Migration(4, "WAL и инкрементальный VACUUM", [
+        # WAL: перенос в архив и запись парсеров не блокируют читателей бота
+        'PRAGMA journal_mode = WAL',
+        # auto_vacuum вступает в силу только после полного VACUUM
+        'PRAGMA auto_vacuum = INCREMENTAL',
+        'VACUUM',
+    ], transactional=False),
+    Migration(5, "Индекс по дате добавления для ленты и архивации", [
+        'CREATE INDEX IF NOT EXISTS idx_news_created_at ON news(created_at)',
+    ]),
+    Migration(6, "Теги игроков", _create_player_tags),
+    Migration(7, "Личные ленты избранного", _create_user_inbox),
+    Migration(8, "Реестр сущностей для кнопок", [
+        # Короткие постоянные id клубов, лиг и игроков для callback_data
+        '''CREATE TABLE IF NOT EXISTS callback_entities (
+            id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (kind, name)
+        )''',
+    ]),
+    Migration(9, "Версия разметки новостей", [
+        # 0 - размечено до появления версий; такие строки переразмечает retag.py
+        'ALTER TABLE news ADD COLUMN tag_version INTEGER NOT NULL DEFAULT 0',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def ensure_schema(db_path: str) -> int:
+    """Приводит схему к последней версии и возвращает номер версии"""
+    conn = connect(db_path)
+    try:
+        version = get_schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            return version
+
+        # Управляем транзакциями вручную
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        for migration in MIGRATIONS:
+            if migration.transactional:
+                # IMMEDIATE сразу берет блокировку записи: если парсер и бот стартуют
+                # одновременно, второй дождется первого и увидит уже новую версию
+                cursor.execute('BEGIN IMMEDIATE')
+                if get_schema_version(conn) >= migration.version:
+                    cursor.execute('ROLLBACK')
+                    continue
+                try:
+                    migration.apply(cursor)
+                    cursor.execute(f'PRAGMA user_version = {migration.version}')
+                    cursor.execute('COMMIT')
+                except Exception:
+                    cursor.execute('ROLLBACK')
+                    raise
+            else:
+                if get_schema_version(conn) >= migration.version:
+                    continue
+                migration.apply(cursor)
+                cursor.execute(f'PRAGMA user_version = {migration.version}')
+            print(f"Миграция БД {migration.version}: {migration.description}")
+
+        return get_schema_version(conn)
+    finally:
+        conn.close()
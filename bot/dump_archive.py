@@ -0,0 +1,225 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+# Архив выгрузок источника: вместо снимка JSON+CSV на каждый обход новости дописываются
+# в сжатые файлы NDJSON по дням (sportbox_news/sportbox_2025-10-06.ndjson.gz), каждая ссылка - один раз.
+# Каждая дозапись - отдельный член gzip (формат это допускает, gzip.open читает файл целиком),
+# compact() склеивает их в один и заодно переносит в архив старые снимки.
+
+PARTITION_SUFFIX = '.ndjson.gz'
+# Индекс ссылок: 8 байт blake2b на ссылку, только дозапись; по нему отсеиваются повторы
+INDEX_NAME = 'links.idx'
+HASH_BYTES = 8
+
+# Старые снимки: sportbox_20251008_140552_all_leagues.json / .csv
+SNAPSHOT_FILE = re.compile(r'^(?P<source>[a-z]+)_(?P<stamp>\d{8}_\d{6})(?:_.*)?\.(?P<ext>json|csv)$')
+DAY = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+
+def link_hash(link: str) -> bytes:
+    return hashlib.blake2b(link.encode('utf-8'), digest_size=HASH_BYTES).digest()
+
+
+def encode_item(item: Dict) -> str:
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+
+def read_snapshot(path: str) -> List[Dict]:
+    """Новости из старого снимка JSON (список) или CSV"""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class DumpArchive:
+    """Сжатый архив новостей одного источника, разбитый по дням"""
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        self.index_path = os.path.join(directory, f'{name}_{INDEX_NAME}')
+        self.lock = threading.Lock()
+        # Хеши уже записанных ссылок; читаются при первой записи
+        self.seen = None
+
+    def partition_path(self, day: str) -> str:
+        return os.path.join(self.directory, f'{self.name}_{day}{PARTITION_SUFFIX}')
+
+    def partitions(self) -> List[str]:
+        prefix = f'{self.name}_'
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+            if filename.startswith(prefix) and filename.endswith(PARTITION_SUFFIX)
+        )
+
+    @staticmethod
+    def partition_day(item: Dict) -> str:
+        """День по времени сбора новости (scraped_at), иначе сегодняшний"""
+        scraped_at = item.get('scraped_at') or ''
+        if DAY.match(scraped_at):
+            return scraped_at[:10]
+        return datetime.now().strftime('%Y-%m-%d')
+
+    def load_index(self) -> set:
+        if self.seen is None:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'rb') as f:
+                    data = f.read()
+                self.seen = {data[i:i + HASH_BYTES] for i in range(0, len(data) - HASH_BYTES + 1, HASH_BYTES)}
+            else:
+                # Индекса нет (первый запуск или удален) - собираем по самим файлам
+                self.seen = self.rebuild_index()
+        return self.seen
+
+    def rebuild_index(self) -> set:
+        seen = set()
+        for item in self.read():
+            if item.get('link'):
+                seen.add(link_hash(item['link']))
+        self.write_index(seen)
+        return seen
+
+    def write_index(self, hashes: Iterable[bytes]):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(sorted(hashes)))
+        os.replace(tmp_path, self.index_path)
+
+    def append(self, items: Iterable[Dict]) -> int:
+        """Дописывает новости, которых еще нет в архиве; возвращает число записанных"""
+        with self.lock:
+            seen = self.load_index()
+            lines_by_day: Dict[str, List[str]] = {}
+            new_hashes = []
+            for item in items:
+                link = item.get('link')
+                if not link:
+                    continue
+                digest = link_hash(link)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                new_hashes.append(digest)
+                lines_by_day.setdefault(self.partition_day(item), []).append(encode_item(item))
+
+            if not new_hashes:
+                return 0
+            os.makedirs(self.directory, exist_ok=True)
+            for day, lines in lines_by_day.items():
+                # Низкая степень сжатия: дозапись идет на каждой странице, compact() потом пережмет
+                with gzip.open(self.partition_path(day), 'at', encoding='utf-8', compresslevel=1) as f:
+                    f.write('\n'.join(lines) + '\n')
+            # Индекс пишется после данных: при сбое между ними возможен повтор, но не потеря
+            # (повторы убирает compact)
+            with open(self.index_path, 'ab') as f:
+                f.write(b''.join(new_hashes))
+            return len(new_hashes)
+
+    def read(self, day: str = None) -> Iterator[Dict]:
+        """Новости из архива (за день или все) по одной, без чтения файлов целиком"""
+        paths = [self.partition_path(day)] if day else self.partitions()
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def snapshot_files(self) -> List[str]:
+        """Все файлы старых снимков источника (JSON и CSV)"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+            if (match := SNAPSHOT_FILE.match(filename)) and match.group('source') == self.name
+        )
+
+    def snapshots(self) -> List[str]:
+        """Снимки для чтения по времени создания; CSV - только если нет JSON того же снимка"""
+        found = {}
+        for path in self.snapshot_files():
+            base, ext = os.path.splitext(path)
+            if ext == '.json' or base not in found:
+                found[base] = path
+        return sorted(found.values(), key=lambda path: SNAPSHOT_FILE.match(os.path.basename(path)).group('stamp'))
+
+    def disk_usage(self) -> int:
+        paths = self.partitions() + self.snapshot_files() + [self.index_path]
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+    def compact(self, delete_snapshots: bool = False) -> Dict:
+        """Переносит старые снимки в архив и пережимает каждый день одним членом gzip без повторов"""
+        stats = {'snapshots': 0, 'read': 0, 'added': 0, 'partitions': 0, 'duplicates': 0,
+                 'bytes_before': self.disk_usage(), 'bytes_after': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+
+        snapshots = self.snapshots()
+        for path in snapshots:
+            items = read_snapshot(path)
+            stats['snapshots'] += 1
+            stats['read'] += len(items)
+            stats['added'] += self.append(items)
+
+        with self.lock:
+            seen = set()
+            for path in self.partitions():
+                tmp_path = path + '.tmp'
+                with gzip.open(path, 'rt', encoding='utf-8') as src, \
+                        gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=9) as dst:
+                    for line in src:
+                        if not line.strip():
+                            continue
+                        item = json.loads(line)
+                        digest = link_hash(item.get('link') or line)
+                        if digest in seen:
+                            stats['duplicates'] += 1
+                            continue
+                        seen.add(digest)
+                        dst.write(encode_item(item) + '\n')
+                os.replace(tmp_path, path)
+                stats['partitions'] += 1
+            self.write_index(seen)
+            self.seen = seen
+
+        if delete_snapshots:
+            # CSV-двойники JSON-снимков содержат те же новости - удаляются вместе с ними
+            for path in self.snapshot_files():
+                os.remove(path)
+        stats['bytes_after'] = self.disk_usage()
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+
+def main():
+    """python dump_archive.py compact [sportbox championat] [--delete]"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args or args[0] != 'compact':
+        print("Использование: python dump_archive.py compact [источник ...] [--delete]")
+        return
+    names = args[1:] or ['sportbox', 'championat']
+    for name in names:
+        archive = DumpArchive(f'{name}_news', name)
+        stats = archive.compact(delete_snapshots='--delete' in sys.argv)
+        print(f"[{name}] снимков: {stats['snapshots']}, прочитано новостей: {stats['read']}, "
+              f"добавлено: {stats['added']}, дней: {stats['partitions']}, повторов убрано: {stats['duplicates']}; "
+              f"на диске {stats['bytes_before'] / 1024:.0f} КБ -> {stats['bytes_after'] / 1024:.0f} КБ "
+              f"за {stats['seconds']:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List
+
+# Справочник сущностей, по которым размечаются новости: клубы с вариантами написания, лиги
+# с рубриками источников, игроки. Лежит в entities.json; файл собирается в структуры для поиска
+# один раз и перечитывается при изменении - без перезапуска бота и парсеров.
+#
+# "version" в файле - версия разметки: увеличивается при любом изменении клубов, их написаний
+# или игроков. Новость помнит версию, которой размечена (news.tag_version); retag.py
+# переразмечает устаревшие.
+
+ENTITIES_PATH = os.environ.get('BOT_ENTITIES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  'entities.json'))
+# Как часто проверять время изменения файла (секунды)
+RELOAD_CHECK_INTERVAL = 2.0
+
+WORD_PATTERN = re.compile(r"[\w'-]+")
+
+
+def normalize_text(text: str) -> str:
+    return text.lower().replace('ё', 'е')
+
+
+def inflect(word: str) -> List[str]:
+    """Падежные формы русской фамилии: Холанд -> Холанда, Холанду, Холандом, Холанде"""
+    if not re.fullmatch(r'[а-я-]+', word):
+        # Латиница не склоняется
+        return [word]
+    last = word[-1]
+    if last in 'иыуюеэо':
+        # Месси, Роналду, Мбаппе - несклоняемые
+        return [word]
+    if last == 'а':
+        stem = word[:-1]
+        soft = stem[-1:] in 'гкхжчшщ'
+        return [word, stem + ('и' if soft else 'ы'), stem + 'е', stem + 'у', stem + 'ой', stem + 'ою']
+    if last == 'я':
+        stem = word[:-1]
+        return [word, stem + 'и', stem + 'е', stem + 'ю', stem + 'ей']
+    if last in 'йь':
+        stem = word[:-1]
+        forms = [word, stem + 'я', stem + 'ю', stem + 'ем', stem + 'е']
+        if word.endswith('ий'):
+            # Левандовский -> Левандовского, Левандовскому, Левандовским
+            forms += [stem[:-1] + 'ого', stem[:-1] + 'ому', stem[:-1] + 'им', stem[:-1] + 'ом']
+        return forms
+    # Согласная: после шипящих и ц окончание творительного падежа -ем
+    instrumental = 'ем' if last in 'жчшщц' else 'ом'
+    return [word, word + 'а', word + 'у', word + instrumental, word + 'е']
+
+
+class EntityDictionary:
+    """Справочник, собранный в структуры для поиска; при изменении файла создается новый"""
+
+    def __init__(self, data: Dict):
+        self.version = int(data['version'])
+        # Клуб -> варианты написания (группы по лигам в файле - только для удобства чтения)
+        self.clubs = {club: aliases for group in data['clubs'].values() for club, aliases in group.items()}
+        self.players = data['players']
+        self.leagues = list(data['leagues'])
+        self.popular_players = data.get('popular_players') or list(self.players)[:10]
+
+        # Вариант написания -> все клубы с ним ('реал' - и Реал, и Реал Мадрид)
+        keywords = {}
+        for club, aliases in self.clubs.items():
+            for alias in aliases:
+                clubs = keywords.setdefault(alias.lower(), [])
+                if club not in clubs:
+                    clubs.append(club)
+        self.club_keywords = list(keywords.items())
+        self.club_order = {club: position for position, club in enumerate(self.clubs)}
+
+        # Рубрика -> лига: проверяются в порядке файла, побеждает первое совпадение подстроки
+        self.league_rubrics = [
+            (rubric.lower(), league) for league, rubrics in data['leagues'].items() for rubric in rubrics
+        ]
+
+        self.player_words, self.player_phrases = self.compile_players()
+
+    def compile_players(self):
+        """Однословные формы -> игрок, многословные фразы -> игрок"""
+        words = {}
+        phrases = []
+        for player, aliases in self.players.items():
+            for alias in aliases:
+                alias = normalize_text(alias)
+                parts = alias.split()
+                if len(parts) == 1:
+                    for form in inflect(alias):
+                        words.setdefault(form, player)
+                else:
+                    # Склоняем последнее слово фразы: "эрлинг холанд" -> "эрлинг холанда"
+                    for form in inflect(parts[-1]):
+                        phrases.append((' '.join(parts[:-1] + [form]), player))
+        return words, phrases
+
+    def club_tags(self, title: str) -> str:
+        # Один проход по плоскому списку вариантов вместо генератора на каждый клуб (втрое быстрее)
+        title_lower = title.lower()
+        found = set()
+        for keyword, clubs in self.club_keywords:
+            if keyword in title_lower:
+                found.update(clubs)
+        return ', '.join(sorted(found, key=self.club_order.__getitem__))
+
+    def player_tags(self, title: str) -> List[str]:
+        if not title:
+            return []
+        words = WORD_PATTERN.findall(normalize_text(title))
+        found = []
+        for word in words:
+            player = self.player_words.get(word)
+            if player and player not in found:
+                found.append(player)
+        padded = f' {" ".join(words)} '
+        for phrase, player in self.player_phrases:
+            if player not in found and f' {phrase} ' in padded:
+                found.append(player)
+        return found
+
+    def league(self, rubric: str) -> str:
+        rubric_lower = (rubric or '').lower()
+        for key, league in self.league_rubrics:
+            if key in rubric_lower:
+                return league
+        return rubric
+
+
+def load(path: str = ENTITIES_PATH) -> EntityDictionary:
+    with open(path, encoding='utf-8') as f:
+        return EntityDictionary(json.load(f))
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+_lock = threading.Lock()
+# Время изменения последней прочитанной (или неудачно прочитанной) версии файла
+_loaded_mtime = _mtime(ENTITIES_PATH)
+_dictionary = load()
+_checked_at = time.monotonic()
+
+
+def current() -> EntityDictionary:
+    """Текущий справочник; не чаще раза в RELOAD_CHECK_INTERVAL проверяет, не изменился ли файл.
+
+    Справочник читается только через эту функцию: ссылка, сохраненная при импорте, после перечитывания
+    устарела бы. fuzzy_search пересобирает свой индекс, когда видит здесь другой объект"""
+    global _dictionary, _checked_at, _loaded_mtime
+    now = time.monotonic()
+    if now - _checked_at < RELOAD_CHECK_INTERVAL:
+        return _dictionary
+    with _lock:
+        if now - _checked_at < RELOAD_CHECK_INTERVAL:
+            return _dictionary
+        _checked_at = now
+        mtime = _mtime(ENTITIES_PATH)
+        if mtime == _loaded_mtime:
+            return _dictionary
+        _loaded_mtime = mtime
+        try:
+            dictionary = load(ENTITIES_PATH)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            # Файл с ошибкой или записан не до конца - работаем с прежним справочником до следующего изменения
+            print(f"Ошибка чтения справочника {ENTITIES_PATH}: {e}; используется прежний")
+            return _dictionary
+        _dictionary = dictionary
+        print(f"Справочник сущностей перечитан: {ENTITIES_PATH} (версия разметки {dictionary.version})")
+    return _dictionary
+
+
+def extract_club_tags(title: str) -> str:
+    """Извлекает теги клубов из заголовка"""
+    return current().club_tags(title)
+
+
+def extract_player_tags(title: str) -> List[str]:
+    """Находит игроков в заголовке (по словам, с учетом падежных форм)"""
+    return current().player_tags(title)
+
+
+def determine_league(rubric: str) -> str:
+    """Определяет лигу по рубрике; если соответствия нет - возвращает рубрику"""
+    return current().league(rubric)
+
+
+def resolve_player(name: str):
+    """Каноническое имя игрока по введенному тексту (Холанда -> Холанд) или None"""
+    if not name:
+        return None
+    dictionary = current()
+    if name in dictionary.players:
+        return name
+    tags = dictionary.player_tags(name)
+    return tags[0] if len(tags) == 1 else None
@@ -0,0 +1,148 @@
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+import entities
+from entities import normalize_text
+
+# Ниже этой похожести кандидат считается случайным совпадением (но выше - еще не найденной сущностью:
+# "Роналдиньо" похож на Роналду, "Кейнс" - на Кейна). Такие кандидаты только предлагаются на выбор
+MIN_SCORE = 0.45
+
+# Подставляется без вопросов только точное совпадение с вариантом написания (падежная форма тоже)
+# или опечатка в одну букву в имени не короче TYPO_MIN_LENGTH: "Ливерпул", "Барселонна"
+MAX_TYPO_DISTANCE = 1
+TYPO_MIN_LENGTH = 6
+
+# Типы сущностей в индексе
+CLUB = 'club'
+PLAYER = 'player'
+
+
+class Match(NamedTuple):
+    name: str       # каноническое имя (как в тегах новостей)
+    kind: str       # CLUB или PLAYER
+    score: float    # коэффициент Дайса по триграммам, 1.0 - точное совпадение
+    distance: int   # расстояние Левенштейна до ближайшего варианта написания
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(normalize_text(text).split())
+
+
+def trigrams(text: str) -> List[str]:
+    """Триграммы строки с пробелами по краям: короткие слова и начала слов тоже дают совпадения"""
+    padded = f'  {normalize_query(text)} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Расстояние Левенштейна; все, что больше limit, возвращается как limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def is_confident(match: 'Match', query: str) -> bool:
+    """Можно ли подставить сущность вместо введенного текста без вопроса пользователю"""
+    if match.distance == 0:
+        return True
+    return match.distance <= MAX_TYPO_DISTANCE and len(normalize_query(query)) >= TYPO_MIN_LENGTH
+
+
+class TrigramIndex:
+    """Индекс по триграммам для поиска сущностей с опечатками (Ливерпул, Барселонна)"""
+
+    def __init__(self):
+        # Вариант написания -> (каноническое имя, тип, число триграмм, сам вариант, допускает ли опечатки)
+        self.entries = []
+        # Триграмма -> номера вариантов, где она встречается
+        self.postings = {}
+
+    def add(self, text: str, name: str, kind: str, typos: bool = True):
+        grams = set(trigrams(text))
+        entry_id = len(self.entries)
+        self.entries.append((name, kind, len(grams), normalize_query(text), typos))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(entry_id)
+
+    def search(self, query: str, limit: int = 5, min_score: float = MIN_SCORE) -> List[Match]:
+        """Кандидаты: сначала самые близкие по написанию, затем по похожести; не больше одного на сущность"""
+        grams = set(trigrams(query))
+        if not grams:
+            return []
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        normalized = normalize_query(query)
+        best = {}
+        for entry_id, common in shared.items():
+            name, kind, size, text, typos = self.entries[entry_id]
+            score = 2.0 * common / (len(grams) + size)
+            if score < min_score:
+                continue
+            # Расстояние считаем только для прошедших порог вариантов - их единицы
+            if typos:
+                distance = edit_distance(normalized, text, MAX_TYPO_DISTANCE)
+            else:
+                distance = 0 if normalized == text else MAX_TYPO_DISTANCE + 1
+            previous = best.get((name, kind))
+            if previous is None or (distance, -score) < (previous.distance, -previous.score):
+                best[(name, kind)] = Match(name, kind, score, distance)
+
+        matches = sorted(best.values(), key=lambda match: (match.distance, -match.score, match.name))
+        return matches[:limit]
+
+    def best(self, query: str, min_score: float = MIN_SCORE) -> Optional[Match]:
+        matches = self.search(query, limit=1, min_score=min_score)
+        return matches[0] if matches else None
+
+
+def build_entity_index(dictionary: entities.EntityDictionary) -> TrigramIndex:
+    """Индекс по названиям клубов, их синонимам и игрокам (вместе с падежными формами)"""
+    index = TrigramIndex()
+    for club, keywords in dictionary.clubs.items():
+        for text in {club.lower(), *keywords}:
+            index.add(text, club, CLUB)
+    for player, aliases in dictionary.players.items():
+        for text in {player.lower(), *aliases}:
+            index.add(text, player, PLAYER)
+    # Падежные формы сами отличаются от имени на букву-две: опечатка в форме ("Салахов" от "Салахом")
+    # уже другое слово, поэтому формы подставляются только при точном совпадении
+    for form, player in dictionary.player_words.items():
+        index.add(form, player, PLAYER, typos=False)
+    return index
+
+
+_index = None
+_index_source = None
+
+
+def get_entity_index() -> TrigramIndex:
+    """Индекс строится один раз и пересобирается, только если справочник сущностей перечитан"""
+    global _index, _index_source
+    dictionary = entities.current()
+    if _index is None or _index_source is not dictionary:
+        _index = build_entity_index(dictionary)
+        _index_source = dictionary
+    return _index
+
+
+def resolve_entity(query: str) -> Optional[Match]:
+    """Сущность, которую можно подставить вместо введенного текста, или None (см. is_confident)"""
+    match = get_entity_index().best(query)
+    return match if match and is_confident(match, query) else None
+
+
+def suggest_entities(query: str, limit: int = 3) -> List[Match]:
+    """Похожие сущности для подсказки "возможно, вы имели в виду" (без автоматической подстановки)"""
+    return get_entity_index().search(query, limit=limit)
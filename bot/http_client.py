@@ -0,0 +1,177 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Заголовки браузера, с которыми ходят все парсеры
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
+}
+
+# Размер пула соединений на один хост
+POOL_SIZE = 16
+
+# Таймаут подключения короткий: недоступный хост должен отвечать отказом быстро
+CONNECT_TIMEOUT = 5
+
+# Повторы временных ошибок с экспоненциальной задержкой и джиттером
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Сетевые ошибки, которые имеет смысл повторить (оборванный ответ - тоже)
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# Предохранитель: после N ошибок подряд хост считается недоступным на время COOLDOWN
+FAILURE_THRESHOLD = 3
+COOLDOWN = 120.0
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class HostUnavailableError(Exception):
+    """Хост временно отключен предохранителем - запрос даже не отправлялся"""
+
+
+class CircuitBreaker:
+    """Учет ошибок одного хоста: closed -> open (после серии ошибок) -> half-open (одна проба)"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self.lock:
+            if self.failures < FAILURE_THRESHOLD and time.monotonic() >= self.open_until:
+                return True
+            if time.monotonic() < self.open_until or self.probing:
+                return False
+            # Время охлаждения вышло: пропускаем один пробный запрос
+            self.probing = True
+            return True
+
+    def is_open(self) -> bool:
+        with self.lock:
+            return time.monotonic() < self.open_until
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.probing = False
+
+    def record_failure(self, retry_after: float = None):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if retry_after and retry_after > BACKOFF_MAX:
+                # Сервер просит подождать дольше, чем мы готовы спать, - не трогаем хост
+                self.open_until = max(self.open_until, time.monotonic() + retry_after)
+            if self.failures >= FAILURE_THRESHOLD:
+                self.open_until = max(self.open_until, time.monotonic() + COOLDOWN)
+                print(f"Хост {self.host} недоступен, пауза {COOLDOWN:.0f} с")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Предохранитель для хоста из URL"""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def is_host_available(url: str) -> bool:
+    """False, если хост сейчас отключен предохранителем"""
+    return not get_breaker(url).is_open()
+
+
+def parse_retry_after(value: str):
+    """Retry-After в секундах: число или HTTP-дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Экспоненциальная задержка с полным джиттером"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def get_session() -> requests.Session:
+    """Возвращает общую для процесса сессию с пулом keep-alive соединений"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def fetch_text(url: str, headers: dict = None, timeout: int = 30, retries: int = MAX_RETRIES) -> str:
+    """Загружает страницу через общий пул и возвращает текст.
+
+    Временные ошибки (сеть, 429, 5xx) повторяются с задержкой; остальные исключения
+    пробрасываются. Если хост отключен предохранителем, сразу HostUnavailableError.
+    Любой исход запроса учитывается предохранителем - иначе пробный запрос остался бы незавершенным
+    и хост был бы отключен до перезапуска.
+    """
+    breaker = get_breaker(url)
+
+    for attempt in range(retries + 1):
+        if not breaker.allow_request():
+            raise HostUnavailableError(f"Хост {breaker.host} временно отключен")
+
+        retry_after = None
+        try:
+            response = get_session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT, timeout))
+        except RETRY_ERRORS as e:
+            error = e
+        except requests.RequestException:
+            # TooManyRedirects, ContentDecodingError и т.п. - повтор не поможет
+            breaker.record_failure()
+            raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                # 4xx кроме 429 - ошибка запроса, а не хоста: не повторяем
+                breaker.record_success()
+                response.raise_for_status()
+                return response.text
+            error = requests.HTTPError(f"{response.status_code} для {url}", response=response)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+        breaker.record_failure(retry_after)
+        if attempt == retries or breaker.is_open():
+            raise error
+
+        delay = backoff_delay(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        time.sleep(delay)
@@ -0,0 +1,107 @@
+from typing import Dict, List, Set, Tuple
+
+from entities import resolve_player
+
+# Личная лента избранного: сколько последних новостей храним на пользователя и тип избранного.
+# "Последние" - по news.created_at, а не по id: импорт старых выгрузок (snapshot_import.py)
+# дает историческим новостям большие id, и они не должны вытеснять свежие.
+INBOX_SIZE = 100
+
+
+class FavoriteMatcher:
+    """Подписки всех пользователей в памяти: по новости быстро находит, кому она нужна"""
+
+    def __init__(self, cursor):
+        cursor.execute('SELECT user_id, type, name FROM favorites')
+        # Клуб -> пользователи; игрок (каноническое имя) -> пользователи; прочие имена ищем в заголовке
+        self.clubs: Dict[str, Set[int]] = {}
+        self.players: Dict[str, Set[int]] = {}
+        self.player_titles: Dict[str, Set[int]] = {}
+        for user_id, item_type, name in cursor.fetchall():
+            if item_type == 'club':
+                self.clubs.setdefault(name, set()).add(user_id)
+            elif item_type == 'player':
+                canonical = resolve_player(name)
+                if canonical:
+                    self.players.setdefault(canonical, set()).add(user_id)
+                else:
+                    self.player_titles.setdefault(name.lower(), set()).add(user_id)
+
+    def match(self, title: str, club_tags: str, players: List[str]) -> Set[Tuple[int, str]]:
+        """Пары (пользователь, тип избранного), которым подходит новость"""
+        found = set()
+        if club_tags:
+            # Та же логика, что и раньше в запросе: club_tags LIKE '%клуб%'
+            for club, users in self.clubs.items():
+                if club in club_tags:
+                    found.update((user_id, 'club') for user_id in users)
+        for player in players:
+            found.update((user_id, 'player') for user_id in self.players.get(player, ()))
+        if self.player_titles and title:
+            title_lower = title.lower()
+            for name, users in self.player_titles.items():
+                if name in title_lower:
+                    found.update((user_id, 'player') for user_id in users)
+        return found
+
+
+def fan_out(cursor, matcher: FavoriteMatcher, news_id: int, title: str, club_tags: str, players: List[str]):
+    """Раскладывает новую новость по лентам подписанных пользователей; возвращает затронутые ленты"""
+    targets = matcher.match(title, club_tags, players)
+    cursor.executemany(
+        'INSERT OR IGNORE INTO user_inbox (user_id, kind, news_id) VALUES (?, ?, ?)',
+        [(user_id, kind, news_id) for user_id, kind in targets]
+    )
+    return targets
+
+
+def trim_inboxes(cursor, inboxes):
+    """Оставляет в каждой ленте только INBOX_SIZE последних (по created_at) новостей"""
+    for user_id, kind in inboxes:
+        cursor.execute('''
+            DELETE FROM user_inbox WHERE user_id = ? AND kind = ? AND news_id NOT IN (
+                SELECT user_inbox.news_id FROM user_inbox
+                JOIN news ON news.id = user_inbox.news_id
+                WHERE user_inbox.user_id = ? AND user_inbox.kind = ?
+                ORDER BY news.created_at DESC, news.id DESC LIMIT ?
+            )
+        ''', (user_id, kind, user_id, kind, INBOX_SIZE))
+
+
+def rebuild_inbox(cursor, user_id: int, kind: str):
+    """Пересобирает ленту пользователя после изменения избранного (полный поиск - только здесь)"""
+    cursor.execute('DELETE FROM user_inbox WHERE user_id = ? AND kind = ?', (user_id, kind))
+    cursor.execute('SELECT name FROM favorites WHERE user_id = ? AND type = ?', (user_id, kind))
+    names = [row[0] for row in cursor.fetchall()]
+    if not names:
+        return
+
+    conditions = []
+    params = []
+    if kind == 'club':
+        for club in names:
+            conditions.append('club_tags LIKE ?')
+            params.append(f'%{club}%')
+    else:
+        tagged = [player for player in map(resolve_player, names) if player]
+        if tagged:
+            placeholders = ', '.join('?' for _ in tagged)
+            conditions.append(f'id IN (SELECT news_id FROM player_tags WHERE player IN ({placeholders}))')
+            params.extend(tagged)
+        for name in names:
+            if not resolve_player(name):
+                conditions.append('title LIKE ?')
+                params.append(f'%{name}%')
+
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO user_inbox (user_id, kind, news_id)
+        SELECT ?, ?, id FROM news WHERE {" OR ".join(conditions)}
+        ORDER BY created_at DESC, id DESC LIMIT ?
+    ''', [user_id, kind] + params + [INBOX_SIZE])
+
+
+def rebuild_all_inboxes(cursor):
+    """Ленты для всех пользователей с избранным (при создании таблицы)"""
+    cursor.execute('SELECT DISTINCT user_id, type FROM favorites')
+    for user_id, kind in cursor.fetchall():
+        rebuild_inbox(cursor, user_id, kind)
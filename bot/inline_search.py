@@ -0,0 +1,141 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from database import connect
+import entities
+from entities import normalize_text
+from fuzzy_search import CLUB, PLAYER
+
+# Сколько свежих заголовков держим в памяти на каждую сущность
+HEADLINES_PER_ENTITY = 10
+
+# Сколько последних новостей просматриваем при пересборке каталога
+RECENT_NEWS_LIMIT = 3000
+
+# Как часто пересобирать каталог (секунды)
+CATALOG_TTL = 120
+
+# Лиги есть только в подсказках: клубы и игроки - те же типы, что в нечетком поиске
+LEAGUE = 'league'
+
+
+class PrefixIndex:
+    """Отсортированный массив ключей: поиск по префиксу - двоичный поиск и проход по соседним ключам"""
+
+    def __init__(self, items: List[Tuple[str, str, str]]):
+        # (ключ, каноническое имя, тип); один и тот же ключ может вести к нескольким сущностям
+        self.items = sorted(set(items))
+        self.keys = [key for key, _, _ in self.items]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        prefix = normalize_text(prefix).strip()
+        if not prefix:
+            return []
+        found = []
+        for i in range(bisect_left(self.keys, prefix), len(self.keys)):
+            key, name, kind = self.items[i]
+            if not key.startswith(prefix):
+                break
+            if (name, kind) not in found:
+                found.append((name, kind))
+                if len(found) >= limit:
+                    break
+        return found
+
+
+def entity_keys(name: str, aliases) -> List[str]:
+    """Ключи для подсказок: имя и синонимы целиком, а также с каждого слова (юнайтед -> Манчестер Юнайтед)"""
+    keys = set()
+    for text in (name, *aliases):
+        words = normalize_text(text).split()
+        for i in range(len(words)):
+            keys.add(' '.join(words[i:]))
+    return sorted(keys)
+
+
+class InlineCatalog:
+    """Каталог для inline-режима: индекс префиксов по клубам, игрокам и лигам и свежие заголовки по каждой сущности.
+
+    Ответ на inline-запрос собирается только из памяти; база читается при пересборке каталога.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.index = PrefixIndex([])
+        # (тип, имя) -> последние новости
+        self.headlines: Dict[Tuple[str, str], List[Dict]] = {}
+        self.latest: List[Dict] = []
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.built_at > CATALOG_TTL
+
+    def refresh(self):
+        """Пересобирает каталог из последних новостей (вызывается вне обработчика запросов)"""
+        if not self.lock.acquire(blocking=False):
+            # Пересборка уже идет в другом потоке
+            return
+        try:
+            self._rebuild()
+        finally:
+            self.lock.release()
+
+    def _rebuild(self):
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, title, link, league, club_tags FROM news ORDER BY created_at DESC, id DESC LIMIT ?',
+            (RECENT_NEWS_LIMIT,)
+        )
+        rows = cursor.fetchall()
+
+        players_by_news = {}
+        if rows:
+            cursor.execute(
+                'SELECT news_id, player FROM player_tags WHERE news_id >= ?',
+                (min(row[0] for row in rows),)
+            )
+            for news_id, player in cursor.fetchall():
+                players_by_news.setdefault(news_id, []).append(player)
+        conn.close()
+
+        headlines = {}
+        latest = []
+        for news_id, title, link, league, club_tags in rows:
+            item = {'id': news_id, 'title': title, 'link': link, 'league': league, 'club_tags': club_tags}
+            if len(latest) < HEADLINES_PER_ENTITY:
+                latest.append(item)
+            tags = [(CLUB, club.strip()) for club in (club_tags or '').split(',') if club.strip()]
+            tags += [(PLAYER, player) for player in players_by_news.get(news_id, [])]
+            if league:
+                tags.append((LEAGUE, league))
+            for tag in tags:
+                bucket = headlines.setdefault(tag, [])
+                if len(bucket) < HEADLINES_PER_ENTITY:
+                    bucket.append(item)
+
+        # В подсказки попадают только сущности, по которым есть что показать
+        items = []
+        dictionary = entities.current()
+        for kind, name in headlines:
+            if kind == CLUB:
+                aliases = dictionary.clubs.get(name, [])
+            elif kind == PLAYER:
+                aliases = dictionary.players.get(name, [])
+            else:
+                aliases = []
+            items.extend((key, name, kind) for key in entity_keys(name, aliases))
+
+        # Подменяем целиком: обработчики запросов читают без блокировок
+        self.index, self.headlines, self.latest = PrefixIndex(items), headlines, latest
+        self.built_at = time.monotonic()
+
+    def suggest(self, text: str, limit: int = 5) -> List[Tuple[str, str]]:
+        """Сущности, начинающиеся с введенного текста: [(имя, тип)]"""
+        return self.index.search(text, limit)
+
+    def news_for(self, kind: str, name: str) -> List[Dict]:
+        return self.headlines.get((kind, name), [])
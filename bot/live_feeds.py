@@ -0,0 +1,102 @@
+from collections import deque
+from typing import Dict, List
+
+from database import connect
+from retention import NEWS_COLUMNS
+
+# Сколько последних новостей держим в каждой ленте (столько же бот показывает в ленте из базы)
+FEED_SIZE = 50
+
+# Как часто проверять базу на новые новости (секунды)
+FEED_POLL_INTERVAL = 30
+
+
+class LatestFeeds:
+    """Последние новости в памяти: общая лента и по одной на каждую лигу.
+
+    Кольцевые буферы заполняются при старте, а дальше дочитывают только новые строки (id > last_seen_id),
+    так что самые частые экраны бота не обращаются к базе.
+
+    Порядок в лентах - по created_at, как в ленте из базы, а не по id: импорт старых выгрузок
+    (snapshot_import.py) дает историческим новостям новые id, но в свежие ленты их не пускает.
+    """
+
+    def __init__(self, db_path: str, size: int = FEED_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self.latest = deque(maxlen=size)
+        self.leagues: Dict[str, deque] = {}
+        self.last_seen_id = 0
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        conn.close()
+        return rows
+
+    def prewarm(self):
+        """Заполняет ленты последними новостями из базы"""
+        rows = self._query(f'''
+            SELECT {NEWS_COLUMNS} FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY league ORDER BY created_at DESC, id DESC) AS league_rank
+                FROM news
+            )
+            WHERE league_rank <= ? OR id IN (SELECT id FROM news ORDER BY created_at DESC, id DESC LIMIT ?)
+            ORDER BY id
+        ''', (self.size, self.size))
+        self.latest.clear()
+        self.leagues.clear()
+        self.last_seen_id = 0
+        self.apply(rows)
+
+    def fetch_new(self) -> List[Dict]:
+        """Новые строки после последней прочитанной (можно вызывать из фонового потока)"""
+        return self._query(
+            f'SELECT {NEWS_COLUMNS} FROM news WHERE id > ? ORDER BY id',
+            (self.last_seen_id,)
+        )
+
+    @staticmethod
+    def _sort_key(row: Dict):
+        return row.get('created_at') or '', row['id']
+
+    def _insert(self, feed: deque, row: Dict) -> bool:
+        """Ставит строку в ленту по created_at; в полную ленту не попадает то, что старше ее хвоста"""
+        key = self._sort_key(row)
+        if len(feed) == feed.maxlen:
+            if key <= self._sort_key(feed[-1]):
+                return False
+            feed.pop()
+        # Обычно новость свежее всех в ленте и встает в начало; иначе ищем место (лента короткая)
+        position = 0
+        while position < len(feed) and self._sort_key(feed[position]) > key:
+            position += 1
+        feed.insert(position, row)
+        return True
+
+    def apply(self, rows: List[Dict]):
+        """Раскладывает строки (по возрастанию id) по лентам в порядке created_at"""
+        for row in rows:
+            if row['id'] <= self.last_seen_id:
+                continue
+            if row.get('league'):
+                feed = self.leagues.get(row['league'])
+                if feed is None:
+                    feed = self.leagues[row['league']] = deque(maxlen=self.size)
+                self._insert(feed, row)
+            self._insert(self.latest, row)
+            self.last_seen_id = row['id']
+
+    def poll(self) -> int:
+        rows = self.fetch_new()
+        self.apply(rows)
+        return len(rows)
+
+    def get_latest(self, league: str = None) -> List[Dict]:
+        """Свежие новости (от новых к старым) - общие или по лиге"""
+        if league:
+            return list(self.leagues.get(league, ()))
+        return list(self.latest)
@@ -0,0 +1,93 @@
+import re
+from typing import Optional
+
+from telegram.error import BadRequest
+
+from database import connect
+
+# Служебные картинки-заглушки (например, sportbox .../service/no-available-image-big.png)
+PLACEHOLDER_PATTERN = re.compile(r'no[-_]?available|/service/|placeholder|no[-_]?image|default[-_]image', re.IGNORECASE)
+
+# Пустой file_id в кэше означает, что Telegram не смог загрузить картинку - больше не пробуем
+UNUSABLE = ''
+
+# Ответы Telegram о том, что сам файл не годится: ссылку не удалось скачать, это не картинка,
+# file_id устарел. Остальные ошибки (сеть, таймауты, RetryAfter, подпись) от картинки не зависят
+MEDIA_ERROR_PATTERN = re.compile(
+    r'wrong file identifier|wrong remote file|failed to get http url content|wrong type of the web page content'
+    r'|image_process_failed|photo_invalid_dimensions|photo_save_file_invalid|file is too big',
+    re.IGNORECASE
+)
+
+
+def is_placeholder_image(image_url: str) -> bool:
+    """Проверяет, что ссылка ведет на заглушку, а не на фото к новости"""
+    if not image_url or not image_url.startswith('http'):
+        return True
+    return bool(PLACEHOLDER_PATTERN.search(image_url))
+
+
+def is_media_error(error: Exception) -> bool:
+    """Telegram отклонил именно картинку (а не запрос целиком)"""
+    return isinstance(error, BadRequest) and bool(MEDIA_ERROR_PATTERN.search(str(error)))
+
+
+class TelegramMediaCache:
+    """Постоянный кэш file_id: картинка загружается в Telegram один раз, дальше отправляется по file_id"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.file_ids = {}
+        # Статистика: сколько картинок отправлено по file_id и сколько загружалось по ссылке
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Загружает кэш в память целиком (таблица маленькая)"""
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT image_url, file_id FROM media_cache')
+        self.file_ids = dict(cursor.fetchall())
+        conn.close()
+
+    def resolve(self, image_url: str) -> Optional[str]:
+        """Возвращает что отправлять: file_id, исходную ссылку или None, если фото не нужно"""
+        if is_placeholder_image(image_url):
+            return None
+        file_id = self.file_ids.get(image_url)
+        if file_id == UNUSABLE:
+            return None
+        if file_id:
+            self.hits += 1
+            return file_id
+        self.misses += 1
+        return image_url
+
+    def is_cached(self, image_url: str) -> bool:
+        """Есть ли для картинки готовый file_id"""
+        return bool(self.file_ids.get(image_url))
+
+    def remember(self, image_url: str, file_id: str):
+        """Сохраняет file_id после первой загрузки (или UNUSABLE после ошибки)"""
+        if self.file_ids.get(image_url) == file_id:
+            return
+        self.file_ids[image_url] = file_id
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            'INSERT OR REPLACE INTO media_cache (image_url, file_id) VALUES (?, ?)',
+            (image_url, file_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def forget(self, image_url: str):
+        """Удаляет устаревший file_id, чтобы в следующий раз загрузить картинку заново"""
+        if self.file_ids.pop(image_url, None) is None:
+            return
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM media_cache WHERE image_url = ?', (image_url,))
+        conn.commit()
+        conn.close()
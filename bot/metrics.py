@@ -0,0 +1,305 @@
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from inspect import iscoroutinefunction
+from typing import Callable, Dict, Sequence, Tuple
+
+# Границы корзин гистограмм (секунды): от запроса к кэшу до медленной загрузки страницы
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Порт локального HTTP-эндпоинта по умолчанию (формат Prometheus)
+DEFAULT_PORT = 9108
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Timer:
+    """Контекстный менеджер: замеряет блок и пишет длительность в гистограмму"""
+
+    __slots__ = ('series', 'started')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _CounterSeries:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+
+class _HistogramSeries:
+    __slots__ = ('bounds', 'counts', 'total', 'count', 'lock')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя корзина - все, что больше верхней границы (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        index = bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def quantile(self, fraction: float) -> float:
+        """Оценка квантиля по корзинам (верхняя граница корзины, в которую он попал)"""
+        with self.lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = fraction * count
+        seen = 0
+        for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metric:
+    """Метрика с метками: серия на каждую комбинацию значений меток.
+
+    Серию лучше получить один раз через labels() и держать у себя - тогда на горячем пути
+    остаются только perf_counter, bisect и инкремент под локом.
+    """
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.series: Dict[Tuple[str, ...], object] = {}
+        self.lock = threading.Lock()
+
+    def new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        series = self.series.get(key)
+        if series is None:
+            with self.lock:
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = self.new_series()
+        return series
+
+    def header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def new_series(self):
+        return _CounterSeries()
+
+    def render(self):
+        lines = self.header()
+        for values, series in sorted(self.series.items()):
+            lines.append(f'{self.name}{format_labels(self.label_names, values)} {format_value(series.value)}')
+        return lines
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.bounds = tuple(sorted(buckets))
+
+    def new_series(self):
+        return _HistogramSeries(self.bounds)
+
+    def time(self, *values) -> _Timer:
+        return self.labels(*values).time()
+
+    def render(self):
+        lines = self.header()
+        for values, series in sorted(self.series.items()):
+            with series.lock:
+                counts, total, count = list(series.counts), series.total, series.count
+            cumulative = 0
+            for bound, bucket in zip(self.bounds + (float('inf'),), counts):
+                cumulative += bucket
+                le = '+Inf' if bound == float('inf') else format_value(bound)
+                labels = format_labels(self.label_names, values, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(self.label_names, values)
+            lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Значения считываются функцией в момент выгрузки: счетчики, которые объекты уже ведут сами
+    (попадания в кэши и т.п.), не стоят ничего на горячем пути"""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], kind: str, collect: Callable):
+        super().__init__(name, documentation, label_names)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self):
+        lines = self.header()
+        try:
+            values = self.collect()
+        except Exception as e:
+            return lines + [f'# {self.name}: ошибка сбора: {e}']
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f'{self.name}{format_labels(self.label_names, key)} {format_value(value)}')
+        return lines
+
+
+class Registry:
+    """Все метрики процесса; повторная регистрация с тем же именем возвращает уже созданную метрику"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric, replace: bool = False) -> Metric:
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None and not replace:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """Короткий отчет для чата: число замеров, среднее и p95 по гистограммам, значения счетчиков"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            if isinstance(metric, Histogram):
+                for values, series in sorted(metric.series.items()):
+                    if series.count:
+                        lines.append(f"{metric.name}[{','.join(values)}]: n={series.count} "
+                                     f"avg={series.total / series.count * 1000:.1f}мс "
+                                     f"p95≤{series.quantile(0.95) * 1000:.0f}мс")
+            else:
+                lines.extend(line for line in metric.render() if not line.startswith('#'))
+        return '\n'.join(lines)
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, label_names))
+
+
+def histogram(name: str, documentation: str, label_names: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, label_names, buckets))
+
+
+def register_callback(name: str, documentation: str, collect: Callable, label_names: Sequence[str] = (),
+                      kind: str = 'gauge') -> CallbackMetric:
+    """Метрика, значения которой отдает collect(): число или {значения меток: число}.
+    Новый collect заменяет старый (например, при пересоздании бота)"""
+    return REGISTRY.register(CallbackMetric(name, documentation, label_names, kind, collect), replace=True)
+
+
+def track(metric: Histogram, *values):
+    """Декоратор: длительность каждого вызова функции (обычной или async) в серию metric[values]"""
+    series = metric.labels(*values)
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    series.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                series.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = DEFAULT_PORT, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Запускает эндпоинт /metrics в фоновом потоке"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics').start()
+    return server
+
+
+def write_textfile(path: str):
+    """Сохраняет метрики в файл (для коротких процессов вроде обхода сайтов)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(REGISTRY.render())
@@ -0,0 +1,106 @@
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+from database import connect
+from retention import NEWS_COLUMNS, attach_archive, default_archive_path
+
+# Сколько новостей держим в общем кэше строк (на всех пользователей)
+ROW_CACHE_SIZE = 5000
+
+# Повторяющиеся строки (лига, рубрика, теги) храним в одном экземпляре
+INTERNED_FIELDS = ('rubric', 'date', 'club_tags', 'league')
+
+
+class NewsRow:
+    """Неизменяемая строка новости; читается как словарь: row['title'], row.get('link')"""
+
+    __slots__ = tuple(column.strip() for column in NEWS_COLUMNS.split(','))
+
+    def __init__(self, values: Dict):
+        for field in self.__slots__:
+            value = values.get(field)
+            if field in INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            object.__setattr__(self, field, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NewsRow неизменяем")
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+class NewsRowCache:
+    """Общий LRU-кэш строк новостей: в сессии пользователя хранятся только id (array('l'))"""
+
+    def __init__(self, db_path: str, capacity: int = ROW_CACHE_SIZE):
+        self.db_path = db_path
+        self.capacity = capacity
+        self.rows: OrderedDict = OrderedDict()
+        # Обработчики работают в цикле событий, но запросы ленты - в потоках
+        self.lock = threading.Lock()
+        # Статистика: сколько строк нашлось в кэше и сколько пришлось дочитать из базы
+        self.hits = 0
+        self.misses = 0
+
+    def store(self, news_items: Iterable[Dict]) -> array:
+        """Кладет строки в кэш (уже известные не дублируются) и возвращает их id"""
+        ids = array('l')
+        with self.lock:
+            for item in news_items:
+                news_id = item['id']
+                if news_id in self.rows:
+                    self.rows.move_to_end(news_id)
+                else:
+                    self.rows[news_id] = item if isinstance(item, NewsRow) else NewsRow(item)
+                ids.append(news_id)
+            self._evict()
+        return ids
+
+    def get(self, news_id: int) -> Optional[NewsRow]:
+        """Строка по id; вытесненную из кэша дочитывает из базы (или из архива)"""
+        with self.lock:
+            row = self.rows.get(news_id)
+            if row is not None:
+                self.rows.move_to_end(news_id)
+                self.hits += 1
+                return row
+            self.misses += 1
+
+        row = self._load(news_id)
+        if row is not None:
+            with self.lock:
+                self.rows[news_id] = row
+                self._evict()
+        return row
+
+    def _load(self, news_id: int) -> Optional[NewsRow]:
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'SELECT {NEWS_COLUMNS} FROM main.news WHERE id = ?', (news_id,))
+            values = cursor.fetchone()
+            if values is None and attach_archive(conn, default_archive_path(self.db_path)):
+                cursor.execute(f'SELECT {NEWS_COLUMNS} FROM archive.news WHERE id = ?', (news_id,))
+                values = cursor.fetchone()
+            if values is None:
+                return None
+            return NewsRow(dict(zip(NewsRow.__slots__, values)))
+        finally:
+            conn.close()
+
+    def _evict(self):
+        while len(self.rows) > self.capacity:
+            self.rows.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.rows)
@@ -0,0 +1,286 @@
+import os
+import random
+import re
+import sqlite3
+import time
+from typing import Dict, List, Tuple
+
+from article_bodies import ArticleBodyFetcher
+from database import ensure_schema, save_player_tags
+from dump_archive import DumpArchive
+import entities
+from entities import extract_club_tags, extract_player_tags
+from inbox import FavoriteMatcher, fan_out, trim_inboxes
+from http_client import HostUnavailableError, fetch_text, is_host_available
+from metrics import counter, histogram
+from retention import NewsArchiver
+
+# Реестр источников: сайт регистрируется декоратором @register_source
+SOURCES = []
+
+MONTHS = [
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
+]
+
+# Время в формате HH:MM или HH:MM:SS в конце строки
+TIME_SUFFIX = re.compile(r'\s*\d{1,2}:\d{2}(?::\d{2})?\s*$')
+# Даты типа "24 ноября", "1 декабря" в конце строки
+DATE_SUFFIX = re.compile(r'\s*\d{1,2}\s+(?:' + '|'.join(MONTHS) + r')\s*$')
+# Комбинации дата + время (например: "24 ноября 03:12")
+DATETIME_SUFFIX = re.compile(r'\s*\d{1,2}\s+(?:' + '|'.join(MONTHS) + r')\s+\d{1,2}:\d{2}(?::\d{2})?\s*$')
+
+
+# Длительность этапов обхода (загрузка страницы, разбор, сохранение) и число новостей по источникам
+SCRAPE_SECONDS = histogram('scrape_stage_seconds', 'Длительность этапа обхода сайта', ('source', 'stage'))
+SCRAPED_ITEMS = counter('scrape_items_total', 'Новости: разобрано со страниц и сохранено новых', ('source', 'result'))
+
+
+def register_source(source_class):
+    """Регистрирует класс источника для общего запуска"""
+    SOURCES.append(source_class)
+    return source_class
+
+
+def clean_title(title):
+    """Очищает заголовок от времени и дат в конце"""
+    if not title:
+        return title
+
+    cleaned_title = TIME_SUFFIX.sub('', title).strip()
+    cleaned_title = DATE_SUFFIX.sub('', cleaned_title).strip()
+    cleaned_title = DATETIME_SUFFIX.sub('', cleaned_title).strip()
+    return cleaned_title
+
+
+class NewsSource:
+    """Базовый класс источника новостей.
+
+    Сайт описывает только свои адреса (listing_pages) и разбор страницы (parse_news);
+    загрузка, очистка заголовков, теги клубов и сохранение общие для всех источников.
+    """
+
+    # Короткое имя источника: используется в логах и именах файлов выгрузки
+    name = ''
+    base_url = ''
+    # Дополнительные заголовки запроса для сайта
+    request_headers = None
+    # Пауза между страницами одного сайта (секунды)
+    page_delay = (2, 4)
+
+    def __init__(self, db_path: str = "football_news.db", fetch_bodies: bool = False, base_url: str = None,
+                 output_dir: str = None, archive: bool = True):
+        self.news_data = []
+        self.db_path = db_path
+        self.new_links = []
+        if base_url:
+            # Например, локальная копия сайта для нагрузочных тестов
+            self.base_url = base_url.rstrip('/')
+        # Каталог выгрузки фиксируется абсолютным путем: смена текущего каталога после создания
+        # источника не уводит запись в другое место
+        self.output_dir = os.path.abspath(output_dir or f'{self.name}_news')
+        # Сжатый архив всех собранных новостей по дням (вместо снимков JSON/CSV на каждый обход);
+        # archive=False - без архива (тесты и замеры на синтетических страницах)
+        self.archive = None
+        if archive:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.archive = DumpArchive(self.output_dir, self.name)
+        # Сколько новостей текущего обхода впервые попало в архив
+        self.archived_count = 0
+        self.init_database()
+        # Версия справочника, которой размечаются новости текущего обхода
+        self.tagger_version = entities.current().version
+
+        # Необязательная загрузка полных текстов статей для новых ссылок
+        self.body_fetcher = ArticleBodyFetcher(db_path) if fetch_bodies else None
+
+    # --- То, что определяет конкретный сайт ---
+
+    def listing_pages(self, pages: int) -> List[Tuple[str, str]]:
+        """Возвращает список страниц для обхода: (url, название лиги)"""
+        raise NotImplementedError
+
+    def parse_news(self, html_content, league_name=""):
+        """Разбирает страницу списка новостей"""
+        raise NotImplementedError
+
+    # --- Общая инфраструктура ---
+
+    def init_database(self):
+        """Инициализация базы данных (миграции выполняются только при смене версии схемы)"""
+        try:
+            version = ensure_schema(self.db_path)
+            print(f"База данных инициализирована: {self.db_path} (версия схемы {version})")
+        except Exception as e:
+            print(f"Ошибка инициализации БД: {e}")
+
+    def clean_title(self, title):
+        """Очищает заголовок от времени и дат в конце"""
+        return clean_title(title)
+
+    def extract_club_tags(self, title: str, league: str = "") -> str:
+        """Извлекает теги клубов из заголовка"""
+        return extract_club_tags(title)
+
+    def extract_player_tags(self, title: str):
+        """Извлекает игроков из заголовка (с учетом падежных форм)"""
+        return extract_player_tags(title)
+
+    def get_page_content(self, url):
+        """Получаем контент страницы"""
+        try:
+            # Общая сессия с пулом соединений и заголовками браузера
+            return fetch_text(url, headers=self.request_headers, timeout=30)
+        except HostUnavailableError as e:
+            print(f"[{self.name}] {e}, страница {url} пропущена")
+            return None
+        except Exception as e:
+            print(f"Ошибка загрузки страницы {url}: {e}")
+            return None
+
+    def scrape(self, pages: int = 2, listing: List[Tuple[str, str]] = None):
+        """Обходит страницы источника (или переданный список), сохраняет новости в БД и возвращает их"""
+        all_news = []
+        # Версию берем до разбора: если справочник перечитают посреди обхода, новости получат
+        # старую версию и retag.py разметит их заново, а не наоборот
+        self.tagger_version = entities.current().version
+        self.archived_count = 0
+        if listing is None:
+            listing = self.listing_pages(pages)
+
+        for i, (page_url, league_name) in enumerate(listing):
+            if not is_host_available(page_url):
+                # Сайт лежит: не ждем таймаутов и пауз, пропускаем оставшиеся страницы
+                print(f"[{self.name}] Сайт недоступен, пропускаем {page_url}")
+                continue
+
+            print(f"[{self.name}] Парсим {page_url}...")
+
+            with SCRAPE_SECONDS.time(self.name, 'fetch'):
+                html = self.get_page_content(page_url)
+            if html:
+                with SCRAPE_SECONDS.time(self.name, 'parse'):
+                    news = self.parse_news(html, league_name)
+                SCRAPED_ITEMS.labels(self.name, 'parsed').inc(len(news))
+                with SCRAPE_SECONDS.time(self.name, 'archive'):
+                    self.archived_count += self.archive_news(news)
+                all_news.extend(news)
+                print(f"[{self.name}] Собрано новостей: {len(news)}")
+
+            if i < len(listing) - 1:
+                time.sleep(random.uniform(*self.page_delay))
+
+        # Сохраняем в базу данных
+        if all_news:
+            with SCRAPE_SECONDS.time(self.name, 'save'):
+                self.save_to_database(all_news)
+
+            # Загружаем тексты только для новых ссылок
+            if self.body_fetcher:
+                self.body_fetcher.fetch_bodies(self.new_links)
+
+        return all_news
+
+    def save_to_database(self, news_items: List[Dict]):
+        """Сохраняет новости в базу данных"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            cursor = conn.cursor()
+
+            saved_count = 0
+            self.new_links = []
+            # Подписки читаем один раз на пачку; затронутые ленты обрезаем в конце
+            matcher = FavoriteMatcher(cursor)
+            touched_inboxes = set()
+            for item in news_items:
+                try:
+                    # Убедимся, что заголовок очищен
+                    item['title'] = self.clean_title(item['title'])
+
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO news
+                        (title, link, rubric, date, image_url, scraped_at, club_tags, league, tag_version)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (
+                        item['title'],
+                        item['link'],
+                        item['rubric'],
+                        item['date'],
+                        item['image_url'],
+                        item['scraped_at'],
+                        item.get('club_tags', ''),
+                        item.get('league', ''),
+                        self.tagger_version
+                    ))
+                    if cursor.rowcount > 0:
+                        saved_count += 1
+                        self.new_links.append(item['link'])
+                        # Теги игроков и ленты подписчиков пишем вместе с новостью, в той же транзакции
+                        news_id = cursor.lastrowid
+                        players = self.extract_player_tags(item['title'])
+                        save_player_tags(cursor, news_id, players)
+                        touched_inboxes |= fan_out(
+                            cursor, matcher, news_id, item['title'], item.get('club_tags', ''), players
+                        )
+                except sqlite3.IntegrityError:
+                    # Пропускаем дубликаты (UNIQUE constraint on link)
+                    continue
+                except Exception as e:
+                    print(f"Ошибка сохранения новости в БД: {e}")
+
+            trim_inboxes(cursor, touched_inboxes)
+            conn.commit()
+            conn.close()
+            SCRAPED_ITEMS.labels(self.name, 'saved').inc(saved_count)
+            print(f"[{self.name}] Сохранено новых новостей в БД: {saved_count}")
+            return saved_count
+        except Exception as e:
+            print(f"Ошибка подключения к БД: {e}")
+            return 0
+
+    def archive_news(self, news_items: List[Dict]) -> int:
+        """Дописывает новости в архив выгрузок (повторные ссылки пропускаются)"""
+        if self.archive is None:
+            return 0
+        try:
+            return self.archive.append(news_items)
+        except Exception as e:
+            print(f"[{self.name}] Ошибка записи архива: {e}")
+            return 0
+
+    def save_data(self, data, filename_suffix=""):
+        """Итог сохранения выгрузки.
+
+        Раньше каждый вызов писал новый снимок JSON+CSV; теперь scrape() дописывает новости в сжатый
+        архив по дням постранично, здесь остается только отчет. Аргументы оставлены для совместимости
+        со старыми вызовами.
+        """
+        if self.archive is not None:
+            print(f"Данные сохранены в архив {self.output_dir}/{self.name}_<день>.ndjson.gz "
+                  f"(новых за обход: {self.archived_count} из {len(data)})")
+        print(f"Всего новостей в базе данных: {self.get_news_count()}")
+
+    def get_news_count(self, league: str = None):
+        """Получает общее количество новостей в базе"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            if league:
+                cursor.execute('SELECT COUNT(*) FROM news WHERE league = ?', (league,))
+            else:
+                cursor.execute('SELECT COUNT(*) FROM news')
+
+            count = cursor.fetchone()[0]
+            conn.close()
+            return count
+        except Exception as e:
+            print(f"Ошибка получения количества новостей: {e}")
+            return 0
+
+    def rollover_archive(self, max_age_days: int = 30):
+        """Переносит старые новости в архивную базу, чтобы горячая база оставалась маленькой"""
+        try:
+            NewsArchiver(self.db_path, max_age_days=max_age_days).rollover()
+        except Exception as e:
+            print(f"Ошибка переноса новостей в архив: {e}")
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Optional
+
+# Семплирующий профайлер по запросу: отдельный поток раз в INTERVAL снимает стеки всех потоков
+# (sys._current_frames) и, если передан цикл событий, стеки ожидающих задач asyncio.
+# Результат - файл в формате collapsed stacks ("кадр;кадр;кадр число"), который понимают
+# flamegraph.pl, speedscope и inferno. Пока профайлер не запущен, он ничего не стоит:
+# ни потока, ни хуков трассировки.
+
+INTERVAL = 0.005
+DEFAULT_SECONDS = int(os.environ.get('BOT_PROFILE_SECONDS', 30))
+PROFILES_DIR = 'profiles'
+
+# Поток, который ждет окончания профилирования, в стеки не попадает
+RUNNER_THREAD = 'profile-runner'
+
+# Сигнал для запуска профилирования работающего процесса: kill -USR2 <pid>
+PROFILE_SIGNAL = getattr(signal, 'SIGUSR2', None)
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ',')
+
+
+def collapse(frame) -> list:
+    """Кадры стека от корня к вершине"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def await_chain(coro) -> list:
+    """Кадры цепочки await ожидающей корутины: от обработчика до самого глубокого await"""
+    labels = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        labels.append(frame_label(frame))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return labels
+
+
+class SamplingProfiler:
+    """Собирает стеки с заданной частотой, пока не вызван stop()"""
+
+    def __init__(self, interval: float = INTERVAL, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.interval = interval
+        self.loop = loop
+        self.samples = Counter()
+        self.sample_count = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True, name='sampling-profiler')
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            self.sample(own)
+
+    def sample(self, own_ident: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident or names.get(ident) == RUNNER_THREAD:
+                continue
+            stack = [f'thread:{names.get(ident, ident)}'] + collapse(frame)
+            self.samples[';'.join(stack)] += 1
+        if self.loop is not None:
+            self.sample_tasks()
+        self.sample_count += 1
+
+    def sample_tasks(self):
+        """Задачи asyncio, которые сейчас ждут (await): где обработчики проводят время вне CPU"""
+        try:
+            tasks = list(asyncio.all_tasks(self.loop))
+        except RuntimeError:
+            # Набор задач изменился во время обхода - пропускаем этот замер
+            return
+        for task in tasks:
+            if task.done():
+                continue
+            coro = task.get_coro()
+            stack = ['asyncio-tasks', getattr(coro, '__qualname__', type(coro).__name__).replace(';', ',')]
+            stack.extend(await_chain(coro))
+            self.samples[';'.join(stack)] += 1
+
+    def write(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def top_functions(self, limit: int = 10):
+        """Функции, которые чаще всего оказывались на вершине стека потоков (собственное время)"""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            if not stack.startswith('thread:'):
+                continue
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(limit)
+
+
+def default_path(name: str) -> str:
+    return os.path.join(PROFILES_DIR, f'{name}_{datetime.now():%Y%m%d_%H%M%S}.folded')
+
+
+def profile_for(seconds: float, path: str, loop: asyncio.AbstractEventLoop = None,
+                interval: float = INTERVAL) -> SamplingProfiler:
+    """Профилирует процесс seconds секунд и пишет collapsed stacks в path (блокирует вызывающий поток)"""
+    profiler = SamplingProfiler(interval, loop)
+    profiler.start()
+    time.sleep(seconds)
+    profiler.stop()
+    profiler.write(path)
+    return profiler
+
+
+_active = threading.Lock()
+
+
+def profile_in_background(name: str, seconds: float = DEFAULT_SECONDS, loop: asyncio.AbstractEventLoop = None,
+                          on_done: Callable = None) -> bool:
+    """Запускает профилирование в фоновом потоке; False, если оно уже идет.
+    on_done(path, profiler) вызывается в том же фоновом потоке после записи файла"""
+    if not _active.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            path = default_path(name)
+            profiler = profile_for(seconds, path, loop)
+            print(f"Профиль записан: {path} ({profiler.sample_count} замеров)")
+            if on_done:
+                on_done(path, profiler)
+        finally:
+            _active.release()
+
+    threading.Thread(target=run, daemon=True, name=RUNNER_THREAD).start()
+    return True
+
+
+def install_signal_handler(name: str, loop: asyncio.AbstractEventLoop = None, seconds: float = DEFAULT_SECONDS):
+    """kill -USR2 <pid> запускает профилирование на seconds секунд (только из главного потока; не на Windows)"""
+    if PROFILE_SIGNAL is None:
+        return
+    signal.signal(PROFILE_SIGNAL, lambda signum, frame: profile_in_background(name, seconds, loop))
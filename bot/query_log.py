@@ -0,0 +1,289 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from functools import lru_cache
+from typing import Dict, List
+
+# Журнал медленных запросов: соединения из database.connect() замеряют каждый запрос
+# (выполнение вместе с чтением строк), а запросы дольше порога пишутся в лог
+# с нормализованным SQL, формой параметров и планом EXPLAIN QUERY PLAN.
+
+# Порог медленного запроса (мс) и выключатель (BOT_QUERY_LOG=0)
+SLOW_QUERY_MS = float(os.environ.get('BOT_SLOW_QUERY_MS', 50))
+ENABLED = os.environ.get('BOT_QUERY_LOG', '1') != '0'
+
+# Обработчик прогресса SQLite вызывается раз в столько инструкций виртуальной машины.
+# Число вызовов * PROGRESS_STEPS - оценка объема работы запроса: SQLite не сообщает,
+# сколько строк просмотрено, но полный просмотр таблицы дает на порядки больше инструкций,
+# чем поиск по индексу.
+PROGRESS_STEPS = 1000
+
+logger = logging.getLogger(__name__)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Форма запроса: без литералов, лишних пробелов и с IN (?, ?, ...) в виде IN (?...)"""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = WHITESPACE.sub(' ', sql).strip()
+    return PLACEHOLDER_LIST.sub('(?...)', sql)
+
+
+def params_shape(params) -> str:
+    """Типы параметров без значений; LIKE-шаблоны отмечены отдельно"""
+    if not params:
+        return '()'
+    if isinstance(params, dict):
+        items = [f'{key}={_param_type(value)}' for key, value in params.items()]
+    else:
+        items = [_param_type(value) for value in params]
+    return '(' + ', '.join(items) + ')'
+
+
+def _param_type(value) -> str:
+    if isinstance(value, str) and value.startswith('%') and value.endswith('%'):
+        return 'like'
+    return type(value).__name__
+
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> List[str]:
+    """EXPLAIN QUERY PLAN в виде строк с отступами по вложенности"""
+    cursor = sqlite3.Cursor(conn)
+    try:
+        rows = cursor.execute('EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall()
+    except sqlite3.Error as e:
+        return [f'план недоступен: {e}']
+    finally:
+        cursor.close()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+class QueryShapeStats:
+    __slots__ = ('sql', 'calls', 'total', 'max', 'slow', 'rows', 'steps', 'params', 'plan')
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.rows = 0
+        self.steps = 0
+        self.params = ''
+        self.plan: List[str] = []
+
+    @property
+    def full_scan(self) -> bool:
+        # "SCAN news" - полный просмотр; "SCAN ... USING INDEX" - просмотр индекса, тоже без поиска
+        return any(line.strip().startswith('SCAN') for line in self.plan)
+
+
+class QueryLog:
+    """Статистика по формам запросов процесса и запись медленных запросов в лог"""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS):
+        self.slow_seconds = slow_ms / 1000
+        self.shapes: Dict[str, QueryShapeStats] = {}
+        self.lock = threading.Lock()
+
+    def record(self, conn, sql: str, params, seconds: float, rows: int, steps: int):
+        shape = normalize_sql(sql)
+        slow = seconds >= self.slow_seconds
+        with self.lock:
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = QueryShapeStats(shape)
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.rows += rows
+            stats.steps += steps
+            need_plan = slow and not stats.plan
+            if slow:
+                stats.slow += 1
+        if not slow:
+            return
+        stats.params = params_shape(params)
+        if need_plan:
+            # План одинаков для формы запроса - снимаем его один раз
+            stats.plan = explain(conn, sql, params)
+        logger.warning(
+            f"Медленный запрос {seconds * 1000:.1f} мс (строк: {rows}, инструкций VM: ~{steps}): {shape} "
+            f"параметры {stats.params}; план: {' | '.join(line.strip() for line in stats.plan)}"
+        )
+
+    def worst(self, limit: int = 10) -> List[QueryShapeStats]:
+        """Формы запросов с наибольшим суммарным временем"""
+        with self.lock:
+            shapes = list(self.shapes.values())
+        return sorted(shapes, key=lambda stats: stats.total, reverse=True)[:limit]
+
+    def report(self, limit: int = 10) -> str:
+        lines = []
+        for stats in self.worst(limit):
+            lines.append(
+                f"{stats.total * 1000:.0f} мс всего, {stats.calls} выз., "
+                f"ср. {stats.total / stats.calls * 1000:.1f} мс, макс. {stats.max * 1000:.1f} мс, "
+                f"медленных {stats.slow}, строк ~{stats.rows // stats.calls}, VM ~{stats.steps // stats.calls}"
+                + (" [ПОЛНЫЙ ПРОСМОТР]" if stats.full_scan else "")
+            )
+            lines.append(f"  {stats.sql[:300]} {stats.params}")
+            lines.extend(f"    {line}" for line in stats.plan)
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.shapes.clear()
+
+
+QUERY_LOG = QueryLog()
+
+
+class LoggedCursor(sqlite3.Cursor):
+    """Курсор, который замеряет запрос от execute до последней прочитанной строки.
+
+    Запрос записывается, когда строки кончились, при следующем execute, при закрытии курсора
+    или соединения и при сборке курсора: выборка одной строки через fetchone() до конца
+    курсор не дочитывает, а закрывают в коде обычно только соединение.
+    """
+
+    def __init__(self, conn):
+        super().__init__(conn)
+        self._query = None
+        conn.open_cursors.add(self)
+
+    def _start(self, sql, params):
+        self._finish()
+        self._query = [sql, params, 0.0, 0, self.connection.progress_calls]
+
+    def _finish(self):
+        query = self._query
+        if query is None:
+            return
+        self._query = None
+        sql, params, seconds, rows, calls = query
+        steps = (self.connection.progress_calls - calls) * PROGRESS_STEPS
+        QUERY_LOG.record(self.connection, sql, params, seconds, rows, steps)
+
+    def execute(self, sql, params=()):
+        self._start(sql, params)
+        started = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        except Exception:
+            # Ошибочный запрос в статистику не попадает
+            self._query = None
+            raise
+        self._query[2] += time.perf_counter() - started
+        if self.description is None:
+            # Не SELECT: все сделано в execute
+            self._query[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        started = time.perf_counter()
+        calls = self.connection.progress_calls
+        super().executemany(sql, seq_of_params)
+        steps = (self.connection.progress_calls - calls) * PROGRESS_STEPS
+        QUERY_LOG.record(self.connection, sql, (), time.perf_counter() - started, max(self.rowcount, 0), steps)
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        query = self._query
+        if query is None:
+            return fetch(*args)
+        started = time.perf_counter()
+        result = fetch(*args)
+        query[2] += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if self._query is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._query[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, size or self.arraysize)
+        if self._query is not None:
+            self._query[3] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._query is not None:
+            self._query[3] += len(rows)
+            self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            # Сборка курсора при завершении процесса или после ошибки - статистика не важнее выхода
+            pass
+
+
+class LoggedConnection(sqlite3.Connection):
+    """Соединение, все курсоры которого пишут статистику в QUERY_LOG"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.progress_calls = 0
+        self.set_progress_handler(self._progress, PROGRESS_STEPS)
+        # Курсоры с недописанными запросами дописываются при закрытии соединения
+        self.open_cursors = weakref.WeakSet()
+
+    def _progress(self):
+        self.progress_calls += 1
+        return 0
+
+    def cursor(self, factory=LoggedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def close(self):
+        # До закрытия: медленному запросу еще нужен план EXPLAIN по этому соединению
+        for cursor in list(self.open_cursors):
+            cursor._finish()
+        super().close()
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from telegram import InlineKeyboardMarkup
+
+# Сколько готовых клавиатур/карточек и отпечатков отправленных сообщений держим в памяти
+MEMO_SIZE = 2000
+RENDERED_MESSAGES_LIMIT = 20000
+
+_MISSING = object()
+
+
+class LRU:
+    """Небольшой словарь с вытеснением самых давно использованных ключей"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        value = self.items.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+
+    def pop(self, key):
+        self.items.pop(key, None)
+
+
+def markup_signature(reply_markup: Optional[InlineKeyboardMarkup]):
+    if reply_markup is None:
+        return None
+    return tuple(
+        tuple((button.text, button.callback_data, button.url) for button in row)
+        for row in reply_markup.inline_keyboard
+    )
+
+
+def content_hash(text: str, reply_markup: InlineKeyboardMarkup = None, media: str = None) -> int:
+    """Отпечаток того, что видит пользователь: текст, кнопки и картинка"""
+    return hash((text, markup_signature(reply_markup), media))
+
+
+class RenderCache:
+    """Слой отрисовки: готовые клавиатуры и карточки по ключу (поколение данных, состояние избранного)
+    и отпечатки отправленных сообщений, чтобы не редактировать сообщение тем же содержимым"""
+
+    def __init__(self):
+        self.memo = LRU(MEMO_SIZE)
+        self.rendered = LRU(RENDERED_MESSAGES_LIMIT)
+        # Статистика: сколько раз обошлись без сборки и без запроса к Telegram
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.skipped_edits = 0
+
+    def cached(self, key: Hashable, build: Callable):
+        """Результат build() для ключа; ключ должен включать все, от чего результат зависит"""
+        value = self.memo.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.memo.put(key, value)
+            self.memo_misses += 1
+        else:
+            self.memo_hits += 1
+        return value
+
+    @staticmethod
+    def message_key(message):
+        return message.chat_id, message.message_id
+
+    def is_unchanged(self, message, text: str, reply_markup=None, media: str = None) -> bool:
+        """True, если в сообщении уже показано ровно это - редактировать незачем"""
+        if message is None:
+            return False
+        unchanged = self.rendered.get(self.message_key(message)) == content_hash(text, reply_markup, media)
+        if unchanged:
+            self.skipped_edits += 1
+        return unchanged
+
+    def remember(self, message, text: str, reply_markup=None, media: str = None):
+        """Запоминает содержимое отправленного или отредактированного сообщения"""
+        if message is not None and hasattr(message, 'message_id'):
+            self.rendered.put(self.message_key(message), content_hash(text, reply_markup, media))
+
+    def forget(self, message):
+        if message is not None:
+            self.rendered.pop(self.message_key(message))
+
+
+def is_not_modified_error(error: Exception) -> bool:
+    """Telegram отвечает ошибкой, если новое содержимое совпадает со старым"""
+    return 'not modified' in str(error).lower()
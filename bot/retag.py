@@ -0,0 +1,194 @@
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from database import ensure_schema, save_player_tags
+import entities
+from entities import extract_club_tags, extract_player_tags, resolve_player
+from inbox import rebuild_inbox
+from retention import attach_archive, default_archive_path, init_archive_schema
+
+# Переразметка новостей после изменения справочника (поле version в entities.json):
+# строки с устаревшей версией читаются по возрастанию id пачками, размечаются в процессах
+# (разметка - чистый Python, потоки уперлись бы в GIL) и записываются короткими транзакциями.
+# Прерванный запуск продолжается с того же места: готовые строки уже несут новую версию.
+#
+# Архив (retention.py) размечается так же, но только по клубам: тегов игроков и личных лент
+# у архивных новостей нет, поиск игроков в архиве идет по заголовку.
+
+DEFAULT_CHUNK_SIZE = 2000
+# Пауза между транзакциями, чтобы парсеры могли вклиниться с записью (читателей в WAL запись не блокирует)
+DEFAULT_PAUSE = 0.01
+
+
+def split_clubs(club_tags: str) -> set:
+    return set(club_tags.split(', ')) if club_tags else set()
+
+
+def tag_chunk(rows: List[Tuple[int, str, str, str]]) -> List[Tuple[int, str, str, str, List[str], List[str]]]:
+    """Разметка пачки в процессе-исполнителе: (id, заголовок, старые клубы, новые клубы, старые игроки, новые игроки)"""
+    return [
+        (news_id, title, old_tags or '', extract_club_tags(title),
+         old_players.split('|') if old_players else [], extract_player_tags(title))
+        for news_id, title, old_tags, old_players in rows
+    ]
+
+
+class Retagger:
+    """Переразмечает новости, размеченные старой версией справочника"""
+
+    def __init__(self, db_path: str = "football_news.db", workers: int = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, pause: float = DEFAULT_PAUSE):
+        self.db_path = db_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pause = pause
+        # Версия, до которой доводим разметку; фиксируется на время запуска
+        self.version = entities.current().version
+        # Клубы и игроки, у которых изменился набор новостей в горячей базе, - по ним ищем ленты для пересборки
+        self.changed_clubs = set()
+        self.changed_players = set()
+
+    def read_chunks(self, conn: sqlite3.Connection, schema: str):
+        """Пачки устаревших строк по возрастанию id (курсор по id, без OFFSET)"""
+        if schema == 'main':
+            players = "(SELECT group_concat(player, '|') FROM main.player_tags WHERE news_id = news.id)"
+        else:
+            players = 'NULL'
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                f'SELECT id, title, club_tags, {players} FROM {schema}.news '
+                f'WHERE id > ? AND tag_version < ? ORDER BY id LIMIT ?',
+                (last_id, self.version, self.chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def write_chunk(self, cursor, schema: str, tagged) -> Tuple[int, int]:
+        """Одна транзакция на пачку; возвращает (размечено строк, из них с изменившимися тегами)"""
+        written = changed = 0
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for news_id, title, old_tags, club_tags, old_players, players in tagged:
+                # Заголовок могли исправить, пока пачка размечалась, - такую строку разметим в следующий раз
+                cursor.execute(f'UPDATE {schema}.news SET club_tags = ?, tag_version = ? WHERE id = ? AND title = ?',
+                               (club_tags, self.version, news_id, title))
+                if cursor.rowcount == 0:
+                    continue
+                written += 1
+                clubs_diff = split_clubs(old_tags) ^ split_clubs(club_tags)
+                players_diff = set(old_players) ^ set(players) if schema == 'main' else set()
+                if players_diff:
+                    cursor.execute('DELETE FROM main.player_tags WHERE news_id = ?', (news_id,))
+                    save_player_tags(cursor, news_id, players)
+                if clubs_diff or players_diff:
+                    changed += 1
+                if schema == 'main':
+                    self.changed_clubs.update(clubs_diff)
+                    self.changed_players.update(players_diff)
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        return written, changed
+
+    def run(self) -> Dict:
+        ensure_schema(self.db_path)
+        stats = {'retagged': 0, 'changed': 0, 'archive_retagged': 0, 'chunks': 0, 'inboxes': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+
+        # Отдельные соединения: чтение пачек не держит транзакцию записи
+        reader = sqlite3.connect(self.db_path, timeout=30)
+        writer = sqlite3.connect(self.db_path, timeout=30)
+        writer.isolation_level = None
+        cursor = writer.cursor()
+        schemas = ['main']
+        archive_path = default_archive_path(self.db_path)
+        if attach_archive(writer, archive_path):
+            init_archive_schema(cursor)
+            attach_archive(reader, archive_path)
+            schemas.append('archive')
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for schema in schemas:
+                    pending = []
+                    for rows in self.read_chunks(reader, schema):
+                        pending.append(executor.submit(tag_chunk, rows))
+                        # В работе не больше двух пачек на исполнителя - память не зависит от размера базы
+                        if len(pending) >= self.workers * 2:
+                            self.flush(cursor, schema, pending.pop(0).result(), stats, started)
+                    for future in pending:
+                        self.flush(cursor, schema, future.result(), stats, started)
+
+            stats['inboxes'] = self.rebuild_inboxes(cursor)
+        finally:
+            reader.close()
+            writer.close()
+
+        stats['seconds'] = time.perf_counter() - started
+        print(f"Переразмечено новостей: {stats['retagged']} (теги изменились у {stats['changed']}, "
+              f"из архива {stats['archive_retagged']}), пересобрано лент: {stats['inboxes']} "
+              f"за {stats['seconds']:.1f} с, версия разметки {self.version}")
+        return stats
+
+    def affected_inboxes(self, cursor) -> List[Tuple[int, str]]:
+        """Ленты (пользователь, тип), в которых могли измениться новости"""
+        if not self.changed_clubs and not self.changed_players:
+            return []
+        cursor.execute('SELECT DISTINCT user_id, type, name FROM favorites')
+        affected = set()
+        for user_id, kind, name in cursor.fetchall():
+            if kind == 'club':
+                # Лента клуба собирается по club_tags LIKE '%клуб%'
+                hit = any(name.lower() in club.lower() for club in self.changed_clubs)
+            else:
+                # Лента игрока - по player_tags (имена, которых нет в справочнике, ищутся по заголовку)
+                hit = resolve_player(name) in self.changed_players
+            if hit:
+                affected.add((user_id, kind))
+        return sorted(affected)
+
+    def rebuild_inboxes(self, cursor) -> int:
+        """Пересобирает затронутые ленты, по транзакции на ленту - парсеры пишут между ними"""
+        inboxes = self.affected_inboxes(cursor)
+        for user_id, kind in inboxes:
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                rebuild_inbox(cursor, user_id, kind)
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            time.sleep(self.pause)
+        return len(inboxes)
+
+    def flush(self, cursor, schema: str, tagged, stats: Dict, started: float):
+        written, changed = self.write_chunk(cursor, schema, tagged)
+        stats['retagged'] += written
+        stats['changed'] += changed
+        if schema != 'main':
+            stats['archive_retagged'] += written
+        stats['chunks'] += 1
+        if stats['chunks'] % 50 == 0:
+            seconds = time.perf_counter() - started
+            print(f"Переразмечено {stats['retagged']} ({stats['retagged'] / seconds:.0f} строк/с)")
+        time.sleep(self.pause)
+
+
+def main():
+    """python retag.py [football_news.db] [--workers=N] [--chunk=2000]"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    db_path = args[0] if args else "football_news.db"
+    workers = int(options['workers']) if 'workers' in options else None
+    Retagger(db_path, workers=workers, chunk_size=int(options.get('chunk', DEFAULT_CHUNK_SIZE))).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict
+
+from article_bodies import decompress_body
+from database import connect, ensure_schema
+
+# Архив лежит рядом с основной базой: football_news.db -> football_news_archive.db
+ARCHIVE_SUFFIX = '_archive'
+
+# Колонки news в фиксированном порядке (в старых базах порядок и набор колонок отличаются)
+NEWS_COLUMNS = 'id, title, link, rubric, date, image_url, scraped_at, club_tags, league, created_at'
+
+# Сколько дней новость живет в горячей базе по умолчанию
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+def default_archive_path(db_path: str) -> str:
+    root, ext = os.path.splitext(db_path)
+    return f"{root}{ARCHIVE_SUFFIX}{ext or '.db'}"
+
+
+def attach_archive(conn: sqlite3.Connection, archive_path: str) -> bool:
+    """Подключает архив как схему archive; возвращает False, если архива еще нет"""
+    if not os.path.exists(archive_path):
+        return False
+    attached = [row[1] for row in conn.execute('PRAGMA database_list')]
+    if 'archive' not in attached:
+        conn.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+    return True
+
+
+def init_archive_schema(cursor):
+    """Создает таблицы в подключенном архиве (та же структура, без автоинкремента)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archive.news (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            link TEXT UNIQUE,
+            rubric TEXT,
+            date TEXT,
+            image_url TEXT,
+            scraped_at TEXT,
+            club_tags TEXT,
+            league TEXT,
+            created_at TIMESTAMP,
+            tag_version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_league ON news(league)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_created_at ON news(created_at)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archive.news_bodies (
+            news_id INTEGER PRIMARY KEY,
+            body BLOB NOT NULL,
+            raw_size INTEGER NOT NULL,
+            fetched_at TEXT
+        )
+    ''')
+    # Архивы, созданные до версии разметки: новости в них размечены версией 0 и будут переразмечены
+    columns = [row[1] for row in cursor.execute('PRAGMA archive.table_info(news)').fetchall()]
+    if 'tag_version' not in columns:
+        cursor.execute('ALTER TABLE archive.news ADD COLUMN tag_version INTEGER NOT NULL DEFAULT 0')
+
+
+class NewsArchiver:
+    """Переносит старые новости из горячей базы в архивную пачками"""
+
+    def __init__(self, db_path: str, archive_path: str = None, max_age_days: int = DEFAULT_MAX_AGE_DAYS,
+                 batch_size: int = 500, pause: float = 0.05):
+        self.db_path = db_path
+        self.archive_path = archive_path or default_archive_path(db_path)
+        self.max_age_days = max_age_days
+        self.batch_size = batch_size
+        # Пауза между пачками, чтобы парсеры могли вклиниться с записью
+        self.pause = pause
+
+    def rollover(self) -> Dict:
+        """Переносит новости старше max_age_days в архив и освобождает место"""
+        ensure_schema(self.db_path)
+        stats = {'moved': 0, 'batches': 0, 'freed_pages': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+
+        conn = connect(self.db_path)
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        cursor.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+        init_archive_schema(cursor)
+
+        cutoff = f'-{int(self.max_age_days)} days'
+        while True:
+            # Короткая транзакция на пачку: читатели в WAL не блокируются вовсе,
+            # а писатели ждут не дольше одной пачки
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                cursor.execute(
+                    "SELECT id FROM main.news WHERE created_at < datetime('now', ?) ORDER BY id LIMIT ?",
+                    (cutoff, self.batch_size)
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    cursor.execute('COMMIT')
+                    break
+                self.move_batch(cursor, ids)
+                cursor.execute('COMMIT')
+            except Exception:
+                cursor.execute('ROLLBACK')
+                conn.close()
+                raise
+
+            stats['moved'] += len(ids)
+            stats['batches'] += 1
+            time.sleep(self.pause)
+
+        if stats['moved']:
+            # Возвращаем освободившиеся страницы ФС, не переписывая всю базу
+            freelist_before = cursor.execute('PRAGMA main.freelist_count').fetchone()[0]
+            # execute() делает один шаг прагмы (одна страница), executescript() - до конца
+            cursor.executescript('PRAGMA main.incremental_vacuum;')
+            freelist_after = cursor.execute('PRAGMA main.freelist_count').fetchone()[0]
+            stats['freed_pages'] = freelist_before - freelist_after
+            cursor.execute('PRAGMA main.wal_checkpoint(PASSIVE)')
+
+        conn.close()
+        stats['seconds'] = time.perf_counter() - started
+        if stats['moved']:
+            print(f"В архив перенесено новостей: {stats['moved']} ({stats['batches']} пачек) "
+                  f"за {stats['seconds']:.1f} с, освобождено страниц: {stats['freed_pages']}")
+        return stats
+
+    def move_batch(self, cursor, ids):
+        """Копирует пачку в архив и удаляет ее из горячей базы (внутри транзакции)"""
+        placeholders = ', '.join('?' for _ in ids)
+
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO archive.news ({NEWS_COLUMNS}, tag_version)
+            SELECT {NEWS_COLUMNS}, tag_version FROM main.news WHERE id IN ({placeholders})
+        ''', ids)
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO archive.news_bodies (news_id, body, raw_size, fetched_at)
+            SELECT news_id, body, raw_size, fetched_at FROM main.news_bodies WHERE news_id IN ({placeholders})
+        ''', ids)
+
+        # Из индекса без контента удалять можно только передав исходные значения
+        cursor.execute(f'''
+            SELECT b.news_id, n.title, b.body FROM main.news_bodies b
+            JOIN main.news n ON n.id = b.news_id
+            WHERE b.news_id IN ({placeholders})
+        ''', ids)
+        for news_id, title, body in cursor.fetchall():
+            cursor.execute(
+                "INSERT INTO main.news_fts (news_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+                (news_id, title, decompress_body(body))
+            )
+
+        cursor.execute(f'DELETE FROM main.news_bodies WHERE news_id IN ({placeholders})', ids)
+        cursor.execute(f'DELETE FROM main.player_tags WHERE news_id IN ({placeholders})', ids)
+        cursor.execute(f'DELETE FROM main.user_inbox WHERE news_id IN ({placeholders})', ids)
+        cursor.execute(f'DELETE FROM main.news WHERE id IN ({placeholders})', ids)
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "football_news.db"
+    max_age_days = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_AGE_DAYS
+    archiver = NewsArchiver(db_path, max_age_days=max_age_days)
+    stats = archiver.rollover()
+    if not stats['moved']:
+        print(f"Новостей старше {max_age_days} дней нет")
+
+
+if __name__ == "__main__":
+    main()
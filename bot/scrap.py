@@ -1,105 +1,45 @@
-import requests
 from bs4 import BeautifulSoup
-import time
-import json
-import csv
-import os
-from datetime import datetime
-import random
 import sqlite3
-from typing import List, Dict
-import re
+from datetime import datetime
+from article_bodies import ArticleBodyFetcher
+from news_source import NewsSource, register_source
 
-class SimpleSportboxScraper:
-    def __init__(self, db_path: str = "football_news.db"):
-        self.news_data = []
-        self.db_path = db_path
-        os.makedirs('sportbox_news', exist_ok=True)
-        self.init_database()
+@register_source
+class SimpleSportboxScraper(NewsSource):
+    name = 'sportbox'
+    base_url = "https://news.sportbox.ru"
+    
+    # Разделы сайта для разных лиг: ключ -> (путь, название лиги)
+    leagues = {
+        'champions_league': ("/Vidy_sporta/Futbol/Liga_Chempionov", 'Лига Чемпионов'),
+        'premier_league': ("/Vidy_sporta/Futbol/Evropejskie_chempionaty/Angliya", 'Английская Премьер-лига'),
+        'la_liga': ("/Vidy_sporta/Futbol/Evropejskie_chempionaty/Ispaniya", 'Ла Лига'),
+        'serie_a': ("/Vidy_sporta/Futbol/Evropejskie_chempionaty/Italiya", 'Серия А'),
+        'bundesliga': ("/Vidy_sporta/Futbol/Evropejskie_chempionaty/Germaniya", 'Бундеслига'),
+        'ligue_1': ("/Vidy_sporta/Futbol/Evropejskie_chempionaty/Franciya", 'Лига 1'),
+        'europa_league': ("/Vidy_sporta/Futbol/europa_league", 'Лига Европы'),
+        'rpl': ("/Vidy_sporta/Futbol/Russia/premier_league", 'Российская Премьер-лига')
+    }
+    
+    def __init__(self, db_path: str = "football_news.db", fetch_bodies: bool = False, base_url: str = None,
+                 output_dir: str = None, archive: bool = True):
+        super().__init__(db_path, fetch_bodies, base_url, output_dir, archive)
         
         # URL-адреса для разных лиг
-        self.league_urls = {
-           'champions_league': "https://news.sportbox.ru/Vidy_sporta/Futbol/Liga_Chempionov",
-            'premier_league': "https://news.sportbox.ru/Vidy_sporta/Futbol/Evropejskie_chempionaty/Angliya",
-            'la_liga': "https://news.sportbox.ru/Vidy_sporta/Futbol/Evropejskie_chempionaty/Ispaniya",
-            'serie_a': "https://news.sportbox.ru/Vidy_sporta/Futbol/Evropejskie_chempionaty/Italiya",
-            'bundesliga': "https://news.sportbox.ru/Vidy_sporta/Futbol/Evropejskie_chempionaty/Germaniya",
-            'ligue_1': "https://news.sportbox.ru/Vidy_sporta/Futbol/Evropejskie_chempionaty/Franciya",
-            'europa_league': "https://news.sportbox.ru/Vidy_sporta/Futbol/europa_league",
-            'rpl': "https://news.sportbox.ru/Vidy_sporta/Futbol/Russia/premier_league"
-        }
-        
-    def init_database(self):
-        """Инициализация базы данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Создаем таблицу, если она не существует
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS news (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                link TEXT UNIQUE,
-                rubric TEXT,
-                date TEXT,
-                image_url TEXT,
-                scraped_at TEXT,
-                club_tags TEXT,
-                league TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Проверяем существование колонки league и добавляем если нужно
-        cursor.execute("PRAGMA table_info(news)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'league' not in columns:
-            print("Добавляем колонку 'league' в таблицу...")
-            cursor.execute('ALTER TABLE news ADD COLUMN league TEXT')
-        
-        # Создаем индексы для быстрого поиска
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_title ON news(title)
-        ''')
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_club_tags ON news(club_tags)
-        ''')
-        
-        # Создаем индекс для league только если колонка существует
-        if 'league' in columns:
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_league ON news(league)
-            ''')
-        
-        conn.commit()
-        conn.close()
-        print(f"База данных инициализирована: {self.db_path}")
-        
-    def clean_title(self, title):
-        """Очищает заголовок от времени и дат в конце"""
-        if not title:
-            return title
-        
-        # Убираем время в формате HH:MM или HH:MM:SS в конце строки
-        cleaned_title = re.sub(r'\s*\d{1,2}:\d{2}(?::\d{2})?\s*$', '', title).strip()
-        
-        # Убираем даты в формате DD Month (например: "24 ноября", "1 декабря")
-        months = [
-            'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
-            'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'
-        ]
-        
-        # Паттерн для дат типа "24 ноября", "1 декабря" и т.д.
-        date_pattern = r'\s*\d{1,2}\s+(?:' + '|'.join(months) + r')\s*$'
-        cleaned_title = re.sub(date_pattern, '', cleaned_title).strip()
-        
-        # Убираем комбинации дата + время (например: "24 ноября 03:12")
-        datetime_pattern = r'\s*\d{1,2}\s+(?:' + '|'.join(months) + r')\s+\d{1,2}:\d{2}(?::\d{2})?\s*$'
-        cleaned_title = re.sub(datetime_pattern, '', cleaned_title).strip()
+        self.league_urls = {key: self.base_url + path for key, (path, _) in self.leagues.items()}
+    
+    def league_listing(self, league_key: str, league_name: str, pages: int):
+        """Страницы одной лиги: первая без параметра, остальные с ?page=N"""
+        url = self.league_urls[league_key]
+        return [(url if page == 1 else f"{url}?page={page}", league_name) for page in range(1, pages + 1)]
+    
+    def listing_pages(self, pages: int):
+        """Страницы всех лиг"""
+        listing = []
+        for league_key, (_, league_name) in self.leagues.items():
+            listing.extend(self.league_listing(league_key, league_name, pages))
+        return listing
         
-        return cleaned_title
-
     def clean_all_titles_in_db(self):
         """Очищает все заголовки в базе данных от времени и дат"""
         conn = sqlite3.connect(self.db_path)
@@ -120,102 +60,6 @@ class SimpleSportboxScraper:
         print(f"Очищено заголовков: {updated_count}")
         return updated_count
         
-    def get_page_content(self, url):
-        """Получаем контент страницы"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'ru-RU,ru;q=0.8,en-US;q=0.5,en;q=0.3',
-        }
-        
-        try:
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            print(f"Ошибка загрузки страницы {url}: {e}")
-            return None
-
-    def extract_club_tags(self, title: str, league: str = "") -> str:
-        """Извлекает теги клубов из заголовка с учетом лиги"""
-        clubs = {
-            # Английская Премьер-лига
-            'Манчестер Юнайтед': ['манчестер юнайтед', 'manchester united', 'ман юнайтед'],
-            'Манчестер Сити': ['манчестер сити', 'manchester city'],
-            'Ливерпуль': ['ливерпуль', 'liverpool'],
-            'Челси': ['челси', 'chelsea'],
-            'Арсенал': ['арсенал', 'arsenal'],
-            'Тоттенхэм': ['тоттенхэм', 'tottenham'],
-            'Ньюкасл': ['ньюкасл', 'newcastle'],
-            'Астон Вилла': ['астон вилла', 'aston villa'],
-            'Вест Хэм': ['вест хэм', 'west ham'],
-            'Брайтон': ['брайтон', 'brighton'],
-            
-            # Ла Лига
-            'Реал Мадрид': ['реал', 'мадрид', 'real madrid'],
-            'Барселона': ['барселона', 'barcelona', 'барса'],
-            'Атлетико Мадрид': ['атлетико мадрид', 'atletico madrid'],
-            'Севилья': ['севилья', 'sevilla'],
-            'Валенсия': ['валенсия', 'valencia'],
-            'Вильярреал': ['вильярреал', 'villarreal'],
-            'Атлетик Бильбао': ['атлетик бильбао', 'athletic bilbao'],
-            'Реал Сосьедад': ['реал сосьедад', 'real sociedad'],
-            
-            # Серия А
-            'Ювентус': ['ювентус', 'juventus'],
-            'Милан': ['милан', 'milan'],
-            'Интер': ['интер', 'inter'],
-            'Наполи': ['наполи', 'napoli'],
-            'Рома': ['рома', 'roma'],
-            'Лацио': ['лацио', 'lazio'],
-            'Аталанта': ['аталанта', 'atalanta'],
-            'Фиорентина': ['фиорентина', 'fiorentina'],
-            
-            # Бундеслига
-            'Бавария': ['бавария', 'bayern', 'бавария мюнхен'],
-            'Боруссия Дортмунд': ['боруссия', 'dortmund', 'дортмунд', 'borussia dortmund'],
-            'Байер Леверкузен': ['байер леверкузен', 'bayer leverkusen', 'леверкузен'],
-            'РБ Лейпциг': ['рб лейпциг', 'rb leipzig', 'лейпциг'],
-            'Боруссия Мёнхенгладбах': ['боруссия мёнхенгладбах', 'borussia mönchengladbach'],
-            'Айнтрахт Франкфурт': ['айнтрахт франкфурт', 'eintracht frankfurt'],
-            'Вольфсбург': ['вольфсбург', 'wolfsburg'],
-            'Хоффенхайм': ['хоффенхайм', 'hoffenheim'],
-            
-            # Лига 1
-            'ПСЖ': ['псж', 'psg', 'пари сен-жермен'],
-            'Марсель': ['марсель', 'marseille'],
-            'Лион': ['лион', 'lyon'],
-            'Монако': ['монако', 'monaco'],
-            'Лилль': ['лилль', 'lille'],
-            'Ренн': ['ренн', 'rennes'],
-            'Ницца': ['ница', 'nice'],
-            
-            # Лига Чемпионов/Европы
-            'Байерн': ['байерн', 'bayern'],
-            'Реал': ['реал', 'real'],
-            'Барса': ['барса', 'barca'],
-            'Ман Юнайтед': ['ман юнайтед', 'man united'],
-            'Ман Сити': ['ман сити', 'man city'],
-            
-            # Российская Премьер-лига
-            'Зенит': ['зенит', 'zenit'],
-            'Спартак': ['спартак', 'spartak'],
-            'ЦСКА': ['цска', 'cska'],
-            'Локомотив': ['локомотив', 'lokomotiv'],
-            'Динамо': ['динамо', 'dynamo'],
-            'Краснодар': ['краснодар', 'krasnodar'],
-            'Ростов': ['ростов', 'rostov']
-        }
-        
-        found_clubs = []
-        title_lower = title.lower()
-        
-        for club, keywords in clubs.items():
-            if any(keyword in title_lower for keyword in keywords):
-                found_clubs.append(club)
-                
-        return ', '.join(found_clubs) if found_clubs else ''
-
     def parse_news(self, html_content, league_name=""):
         """Парсим новости"""
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -259,7 +103,7 @@ class SimpleSportboxScraper:
             link_elem = element.find('a')
             link = link_elem.get('href') if link_elem else ""
             if link and not link.startswith('http'):
-                link = 'https://news.sportbox.ru' + link
+                link = self.base_url + link
             
             # Рубрика
             rubric_elem = element.select_one('.rubric, .teaser-rubric, .news-rubric, .b-news-rubric, .b-news-teaser-item__rubric')
@@ -293,42 +137,6 @@ class SimpleSportboxScraper:
             print(f"Ошибка извлечения: {e}")
             return None
 
-    def save_to_database(self, news_items: List[Dict]):
-        """Сохраняет новости в базу данных"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        saved_count = 0
-        for item in news_items:
-            try:
-                # Убедимся, что заголовок очищен
-                item['title'] = self.clean_title(item['title'])
-                
-                cursor.execute('''
-                    INSERT OR IGNORE INTO news 
-                    (title, link, rubric, date, image_url, scraped_at, club_tags, league)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    item['title'],
-                    item['link'],
-                    item['rubric'],
-                    item['date'],
-                    item['image_url'],
-                    item['scraped_at'],
-                    item.get('club_tags', ''),
-                    item.get('league', '')
-                ))
-                saved_count += 1
-            except sqlite3.IntegrityError:
-                # Пропускаем дубликаты (UNIQUE constraint on link)
-                continue
-            except Exception as e:
-                print(f"Ошибка сохранения новости в БД: {e}")
-        
-        conn.commit()
-        conn.close()
-        print(f"Сохранено новых новостей в БД: {saved_count}")
-        
     def get_news_from_db(self, limit: int = 100, club: str = None, league: str = None):
         """Получает новости из базы данных с очищенными заголовками"""
         conn = sqlite3.connect(self.db_path)
@@ -396,102 +204,18 @@ class SimpleSportboxScraper:
         conn.close()
         return sorted(list(set(leagues)))
     
-    def get_news_count(self, league: str = None):
-        """Получает общее количество новостей в базе"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if league:
-            cursor.execute('SELECT COUNT(*) FROM news WHERE league = ?', (league,))
-        else:
-            cursor.execute('SELECT COUNT(*) FROM news')
-            
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-
     def scrape_league(self, league_key: str, league_name: str, pages: int = 3):
         """Парсит конкретную лигу"""
         if league_key not in self.league_urls:
             print(f"Неизвестная лига: {league_key}")
             return []
-            
-        url = self.league_urls[league_key]
-        all_news = []
         
         print(f"\n=== Парсим лигу: {league_name} ===")
-        
-        for page in range(1, pages + 1):
-            print(f"Парсим страницу {page}...")
-            
-            if page == 1:
-                page_url = url
-            else:
-                page_url = f"{url}?page={page}"
-            
-            html = self.get_page_content(page_url)
-            if html:
-                news = self.parse_news(html, league_name)
-                all_news.extend(news)
-                print(f"Собрано новостей: {len(news)}")
-            
-            if page < pages:
-                time.sleep(random.uniform(2, 4))
-        
-        # Сохраняем в базу данных
-        if all_news:
-            self.save_to_database(all_news)
-        
-        return all_news
+        return self.scrape(pages, listing=self.league_listing(league_key, league_name, pages))
 
     def scrape_all_leagues(self, pages: int = 2):
         """Парсит все лиги"""
-        all_news = []
-        leagues_to_scrape = {
-            'champions_league': 'Лига Чемпионов',
-            'premier_league': 'Английская Премьер-лига',
-            'la_liga': 'Ла Лига',
-            'serie_a': 'Серия А',
-            'bundesliga': 'Бундеслига',
-            'ligue_1': 'Лига 1',
-            'europa_league': 'Лига Европы',
-            'rpl': 'Российская Премьер-лига'
-        }
-        
-        for league_key, league_name in leagues_to_scrape.items():
-            news = self.scrape_league(league_key, league_name, pages)
-            all_news.extend(news)
-            print(f"Всего собрано для {league_name}: {len(news)} новостей")
-            time.sleep(random.uniform(3, 6))  # Пауза между лигами
-        
-        return all_news
-
-    def save_data(self, data, filename_suffix=""):
-        """Сохраняем данные в файлы и базу данных"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if filename_suffix:
-            filename_suffix = f"_{filename_suffix}"
-        
-        # Очищаем заголовки перед сохранением в файлы
-        for item in data:
-            item['title'] = self.clean_title(item['title'])
-        
-        # JSON
-        json_filename = f'sportbox_news/sportbox_{timestamp}{filename_suffix}.json'
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        # CSV
-        if data:
-            csv_filename = f'sportbox_news/sportbox_{timestamp}{filename_suffix}.csv'
-            with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
-        
-        print(f"Данные сохранены в sportbox_news/sportbox_{timestamp}{filename_suffix}.[json|csv]")
-        print(f"Всего новостей в базе данных: {self.get_news_count()}")
+        return self.scrape(pages)
 
     def print_statistics(self):
         """Печатает статистику по лигам"""
@@ -520,8 +244,9 @@ def main():
     print("1 - Парсить все лиги")
     print("2 - Парсить конкретную лигу")
     print("3 - Только статистика")
+    print("4 - Загрузить тексты статей")
     
-    choice = input("Введите номер (1-3): ").strip()
+    choice = input("Введите номер (1-4): ").strip()
     
     if choice == "1":
         # Парсим все лиги
@@ -530,6 +255,7 @@ def main():
         if news:
             scraper.save_data(news, "all_leagues")
             print(f"\nУспешно собрано {len(news)} новостей со всех лиг!")
+            scraper.rollover_archive()
             
             # Показываем первые 3 новости из каждой лиги
             leagues = scraper.get_all_leagues()
@@ -567,6 +293,7 @@ def main():
             if news:
                 scraper.save_data(news, league_key)
                 print(f"\nУспешно собрано {len(news)} новостей для {league_name}!")
+                scraper.rollover_archive()
                 
                 # Показываем первые 5 новостей
                 for i, item in enumerate(news[:5]):
@@ -581,6 +308,11 @@ def main():
         # Только статистика
         scraper.print_statistics()
     
+    elif choice == "4":
+        # Тексты для последних новостей, у которых их еще нет
+        limit = int(input("Сколько статей загрузить? (по умолчанию 200): ") or "200")
+        ArticleBodyFetcher(scraper.db_path).fetch_missing(limit=limit)
+    
     else:
         print("Неверный выбор")
 
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Склеивает одинаковые одновременные запросы: выполняется один, остальные ждут его результат.
+
+    Готовый результат живет еще ttl секунд, так что волна одинаковых нажатий после матча
+    превращается в один запрос к базе на каждый уникальный фильтр.
+    Функция выполняется в отдельном потоке, чтобы не блокировать цикл событий бота.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.results: Dict[Hashable, Tuple[float, Any]] = {}
+        # Статистика: сколько запросов реально выполнено и сколько получили чужой результат
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable, *args, **kwargs):
+        cached = self.results.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            self.shared += 1
+            return cached[1]
+
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            # shield: отмена одного ожидающего не должна отменять запрос для остальных
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        self.executed += 1
+        try:
+            result = await asyncio.to_thread(fn, *args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            # Ошибку получают все ожидающие; чтобы не было предупреждения "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            self._store(key, result)
+            return result
+        finally:
+            del self.in_flight[key]
+
+    def _store(self, key: Hashable, result):
+        now = time.monotonic()
+        # Выбрасываем устаревшие результаты, чтобы словарь не рос бесконечно
+        expired = [k for k, (at, _) in self.results.items() if now - at >= self.ttl]
+        for k in expired:
+            del self.results[k]
+        self.results[key] = (now, result)
+
+    def clear(self):
+        self.results.clear()
@@ -0,0 +1,259 @@
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterator, List, TextIO
+
+from article_bodies import decompress_body
+from database import ensure_schema, save_player_tags
+from dump_archive import PARTITION_SUFFIX
+import entities
+from news_source import clean_title
+from retention import attach_archive, default_archive_path
+
+# Загрузка старых выгрузок (снимки JSON/CSV и архивы NDJSON) в базу потоком:
+# файл читается кусками, записи проходят тот же разбор, что и при обходе сайтов
+# (очистка заголовка, клубы, лига, игроки), и пишутся большими транзакциями.
+# Память не зависит от размера файла - в ней только текущая пачка.
+#
+# Импортированные новости не раскладываются по личным лентам: это история, а не свежие новости.
+
+# Сколько записей в одной транзакции
+DEFAULT_BATCH_SIZE = 5000
+# Кусок файла для потокового разбора JSON
+READ_CHUNK = 1 << 16
+# Предел числа параметров в одном запросе (в старых SQLite - 999)
+MAX_PARAMS = 900
+# Как часто печатать прогресс (записей)
+PROGRESS_EVERY = 50000
+
+SUPPORTED_SUFFIXES = ('.json', '.csv', '.ndjson', '.jsonl', PARTITION_SUFFIX, '.json.gz', '.csv.gz', '.jsonl.gz')
+
+
+def open_text(path: str) -> TextIO:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def iter_json_array(f: TextIO, chunk_size: int = READ_CHUNK) -> Iterator[Dict]:
+    """Элементы JSON-массива верхнего уровня по одному, без чтения файла целиком.
+
+    Элементы - объекты, поэтому raw_decode не может принять обрезанный на границе куска
+    элемент за целый: незакрытый объект - всегда ошибка, и тогда дочитываем следующий кусок.
+    """
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size).lstrip()
+    if not buffer:
+        return
+    if buffer[0] != '[':
+        raise ValueError('ожидался JSON-массив')
+    pos = 1
+    eof = False
+    while True:
+        # Пропускаем пробелы и запятые между элементами
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        if pos < len(buffer):
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                continue
+        if eof:
+            raise ValueError('JSON-массив оборван')
+        # Разобранное отбрасываем, чтобы буфер не рос
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    """Записи файла выгрузки любого поддерживаемого формата"""
+    name = path[:-3] if path.endswith('.gz') else path
+    with open_text(path) as f:
+        if name.endswith('.csv'):
+            yield from csv.DictReader(f)
+        elif name.endswith(('.ndjson', '.jsonl')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+def find_files(paths: List[str]) -> List[str]:
+    """Файлы выгрузок по списку файлов и каталогов; CSV пропускается, если рядом есть JSON того же снимка"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, filename) for filename in os.listdir(path)
+                if filename.endswith(SUPPORTED_SUFFIXES)
+            ))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            print(f"Файл не найден: {path}")
+    present = set(files)
+    return [path for path in files if not (path.endswith('.csv') and path[:-4] + '.json' in present)]
+
+
+def prepare(record: Dict):
+    """Запись выгрузки -> строка news и игроки (как при обходе сайта) или None, если записи не хватает полей"""
+    title = clean_title((record.get('title') or '').strip())
+    link = (record.get('link') or '').strip()
+    if not title or not link:
+        return None
+    dictionary = entities.current()
+    rubric = record.get('rubric') or ''
+    league = record.get('league') or dictionary.league(rubric)
+    scraped_at = record.get('scraped_at') or None
+    row = (title, link, rubric, record.get('date') or '', record.get('image_url') or '', scraped_at,
+           dictionary.club_tags(title), league, scraped_at, dictionary.version)
+    return row, dictionary.player_tags(title)
+
+
+class SnapshotImporter:
+    """Потоковый импорт выгрузок в news с отсевом дублей по ссылке и исправлением неочищенных заголовков"""
+
+    def __init__(self, db_path: str = "football_news.db", batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.stats = {'read': 0, 'inserted': 0, 'fixed': 0, 'duplicates': 0, 'archived': 0, 'invalid': 0,
+                      'files': 0, 'seconds': 0.0}
+
+    def run(self, paths: List[str]) -> Dict:
+        ensure_schema(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        # Новости, уже перенесенные в архивную базу, повторно не загружаем
+        has_archive = attach_archive(conn, default_archive_path(self.db_path))
+
+        started = time.perf_counter()
+        next_progress = PROGRESS_EVERY
+        batch = {}
+        try:
+            for path in find_files(paths):
+                self.stats['files'] += 1
+                print(f"Импорт {path}...")
+                for record in iter_records(path):
+                    self.stats['read'] += 1
+                    prepared = prepare(record)
+                    if prepared is None:
+                        self.stats['invalid'] += 1
+                        continue
+                    link = prepared[0][1]
+                    if link in batch:
+                        self.stats['duplicates'] += 1
+                        continue
+                    batch[link] = prepared
+                    if len(batch) >= self.batch_size:
+                        self.write_batch(cursor, batch, has_archive)
+                        batch = {}
+                    if self.stats['read'] >= next_progress:
+                        next_progress += PROGRESS_EVERY
+                        self.print_progress(started)
+            if batch:
+                self.write_batch(cursor, batch, has_archive)
+        finally:
+            conn.close()
+
+        self.stats['seconds'] = time.perf_counter() - started
+        self.print_progress(started, final=True)
+        return self.stats
+
+    def existing(self, cursor, links: List[str], table: str) -> Dict[str, tuple]:
+        """ссылка -> (id, заголовок) для уже сохраненных новостей"""
+        found = {}
+        for i in range(0, len(links), MAX_PARAMS):
+            chunk = links[i:i + MAX_PARAMS]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(f'SELECT link, id, title FROM {table} WHERE link IN ({placeholders})', chunk)
+            for link, news_id, title in cursor.fetchall():
+                found[link] = (news_id, title)
+        return found
+
+    def write_batch(self, cursor, batch: Dict[str, tuple], has_archive: bool):
+        """Одна транзакция на пачку: новые ссылки вставляются, устаревшие заголовки исправляются"""
+        links = list(batch)
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            stored = self.existing(cursor, links, 'main.news')
+            archived = self.existing(cursor, links, 'archive.news') if has_archive else {}
+            for link, (row, players) in batch.items():
+                if link in stored:
+                    news_id, old_title = stored[link]
+                    self.fix_title(cursor, news_id, old_title, row, players)
+                    continue
+                if link in archived:
+                    self.stats['archived'] += 1
+                    continue
+                cursor.execute('''
+                    INSERT OR IGNORE INTO news
+                    (title, link, rubric, date, image_url, scraped_at, club_tags, league, created_at, tag_version)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+                ''', row)
+                if cursor.rowcount > 0:
+                    self.stats['inserted'] += 1
+                    save_player_tags(cursor, cursor.lastrowid, players)
+                else:
+                    self.stats['duplicates'] += 1
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def fix_title(self, cursor, news_id: int, old_title: str, row: tuple, players: List[str]):
+        """Исправляет заголовок, сохраненный без очистки ("... 7 ноября 10:51"); другие отличия не трогает"""
+        title = row[0]
+        if old_title == title or clean_title(old_title) != title:
+            self.stats['duplicates'] += 1
+            return
+        cursor.execute('UPDATE news SET title = ?, club_tags = ?, tag_version = ? WHERE id = ?',
+                       (title, row[6], row[9], news_id))
+        save_player_tags(cursor, news_id, players)
+        # Полнотекстовый индекс без контента: старую запись удаляем по прежним значениям
+        cursor.execute('SELECT body FROM news_bodies WHERE news_id = ?', (news_id,))
+        body_row = cursor.fetchone()
+        if body_row:
+            body = decompress_body(body_row[0])
+            cursor.execute("INSERT INTO news_fts (news_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+                           (news_id, old_title, body))
+            cursor.execute('INSERT INTO news_fts (rowid, title, body) VALUES (?, ?, ?)', (news_id, title, body))
+        self.stats['fixed'] += 1
+
+    def print_progress(self, started: float, final: bool = False):
+        stats = self.stats
+        seconds = max(time.perf_counter() - started, 1e-9)
+        prefix = "Импорт завершен" if final else "Прогресс"
+        print(f"{prefix}: прочитано {stats['read']} ({stats['read'] / seconds:.0f} строк/с), "
+              f"добавлено {stats['inserted']}, исправлено заголовков {stats['fixed']}, "
+              f"дублей {stats['duplicates']}, уже в архиве {stats['archived']}, пропущено {stats['invalid']}")
+
+
+def main():
+    """python snapshot_import.py [файлы и каталоги ...] [--db=football_news.db] [--batch=5000]"""
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+    paths = args or ['sportbox_news', 'championat_news']
+    importer = SnapshotImporter(options.get('db', 'football_news.db'),
+                                batch_size=int(options.get('batch', DEFAULT_BATCH_SIZE)))
+    stats = importer.run(paths)
+    print(f"Файлов: {stats['files']}, время: {stats['seconds']:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
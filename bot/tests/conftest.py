@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули бота импортируются по плоским именам (from database import ...), как при запуске из bot/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
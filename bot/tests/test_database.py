@@ -0,0 +1,73 @@
+import sqlite3
+
+from database import SCHEMA_VERSION, ensure_schema
+
+# Схема из baseline: news еще без league, user_version не выставлен
+BASELINE_SCHEMA = '''
+    CREATE TABLE news (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        link TEXT UNIQUE,
+        rubric TEXT,
+        date TEXT,
+        image_url TEXT,
+        scraped_at TEXT,
+        club_tags TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE favorites (
+        user_id INTEGER,
+        type TEXT,
+        name TEXT,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, type, name)
+    );
+'''
+
+
+def tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def test_empty_database(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    assert ensure_schema(db_path) == SCHEMA_VERSION
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert {'news', 'favorites', 'news_bodies', 'media_cache', 'player_tags', 'user_inbox',
+            'callback_entities'} <= tables(conn)
+    assert {'league', 'tag_version'} <= columns(conn, 'news')
+
+
+def test_baseline_database_keeps_data(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO news (title, link, club_tags) VALUES ('Месси забил за Барселону', 'https://example.com/1', 'Барселона')")
+    conn.execute("INSERT INTO favorites (user_id, type, name) VALUES (1, 'club', 'Барселона')")
+    conn.commit()
+    conn.close()
+
+    assert ensure_schema(db_path) == SCHEMA_VERSION
+
+    conn = sqlite3.connect(db_path)
+    assert {'league', 'tag_version'} <= columns(conn, 'news')
+    assert conn.execute('SELECT title, tag_version FROM news').fetchall() == [('Месси забил за Барселону', 0)]
+    # Миграции 6 и 7 размечают и раскладывают уже сохраненные новости
+    assert conn.execute('SELECT player FROM player_tags').fetchall() == [('Месси',)]
+    assert conn.execute('SELECT user_id, kind FROM user_inbox').fetchall() == [(1, 'club')]
+
+
+def test_second_run_does_nothing(tmp_path, capsys):
+    db_path = str(tmp_path / 'news.db')
+    ensure_schema(db_path)
+    capsys.readouterr()
+
+    assert ensure_schema(db_path) == SCHEMA_VERSION
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,31 @@
+import pytest
+
+from fuzzy_search import edit_distance, resolve_entity, suggest_entities
+
+
+@pytest.mark.parametrize('query, name', [
+    ('Ливерпуль', 'Ливерпуль'),
+    ('Холанда', 'Холанд'),
+    ('Левандовскому', 'Левандовски'),
+    ('Ливерпул', 'Ливерпуль'),
+    ('Барселонна', 'Барселона'),
+])
+def test_exact_forms_and_typos_resolve(query, name):
+    assert resolve_entity(query).name == name
+
+
+@pytest.mark.parametrize('query, suggested', [
+    ('Роналдиньо', 'Роналду'),
+    ('Салахов', 'Салах'),
+    ('Кейнс', 'Кейн'),
+    ('Интер Майами', 'Интер'),
+])
+def test_other_entities_are_only_suggested(query, suggested):
+    assert resolve_entity(query) is None
+    assert suggested in [match.name for match in suggest_entities(query)]
+
+
+def test_edit_distance_is_capped():
+    assert edit_distance('кейн', 'кейн', 1) == 0
+    assert edit_distance('кейнс', 'кейн', 1) == 1
+    assert edit_distance('роналдиньо', 'роналду', 1) == 2
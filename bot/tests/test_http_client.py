@@ -0,0 +1,40 @@
+import pytest
+import requests
+
+import http_client
+from http_client import FAILURE_THRESHOLD, fetch_text, get_breaker
+
+
+class FailingSession:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+@pytest.mark.parametrize('error', [
+    requests.TooManyRedirects('redirects'),
+    requests.exceptions.ContentDecodingError('gzip'),
+    requests.exceptions.ChunkedEncodingError('chunk'),
+])
+def test_failed_probe_releases_breaker(monkeypatch, error):
+    url = f'https://probe-{type(error).__name__.lower()}.example.com/news'
+    breaker = get_breaker(url)
+    # Хост отключен, охлаждение только что закончилось: следующий запрос - пробный
+    breaker.failures = FAILURE_THRESHOLD
+    breaker.open_until = 0.0
+    session = FailingSession(error)
+    monkeypatch.setattr(http_client, 'get_session', lambda: session)
+
+    with pytest.raises(type(error)):
+        fetch_text(url, retries=0)
+
+    assert session.calls == 1
+    assert not breaker.probing
+    assert breaker.is_open()
+    # После нового охлаждения хост снова получает пробный запрос, а не отключен навсегда
+    breaker.open_until = 0.0
+    assert breaker.allow_request()
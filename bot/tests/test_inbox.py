@@ -0,0 +1,59 @@
+import sqlite3
+
+import inbox
+from database import ensure_schema
+from inbox import FavoriteMatcher, fan_out, rebuild_inbox, trim_inboxes
+
+
+def open_db(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO favorites (user_id, type, name) VALUES (1, 'club', 'Арсенал')")
+    return conn
+
+
+def add_news(cursor, title, created_at):
+    cursor.execute(
+        "INSERT INTO news (title, link, club_tags, league, created_at) VALUES (?, ?, 'Арсенал', 'АПЛ', ?)",
+        (title, f'https://example.com/{title}', created_at)
+    )
+    return cursor.lastrowid
+
+
+def inbox_titles(cursor):
+    cursor.execute('''
+        SELECT news.title FROM user_inbox JOIN news ON news.id = user_inbox.news_id
+        WHERE user_id = 1 AND kind = 'club'
+        ORDER BY news.created_at DESC, news.id DESC
+    ''')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def test_trim_keeps_newest_by_created_at(tmp_path, monkeypatch):
+    monkeypatch.setattr(inbox, 'INBOX_SIZE', 3)
+    conn = open_db(tmp_path)
+    cursor = conn.cursor()
+    matcher = FavoriteMatcher(cursor)
+    touched = set()
+    for day in range(1, 4):
+        news_id = add_news(cursor, f'fresh {day}', f'2025-10-0{day} 12:00:00')
+        touched |= fan_out(cursor, matcher, news_id, f'fresh {day}', 'Арсенал', [])
+    # Импортированная историческая новость: id больше всех, created_at старше всех
+    news_id = add_news(cursor, 'imported', '2019-10-08 14:05:52')
+    touched |= fan_out(cursor, matcher, news_id, 'imported', 'Арсенал', [])
+
+    trim_inboxes(cursor, touched)
+    assert inbox_titles(cursor) == ['fresh 3', 'fresh 2', 'fresh 1']
+
+
+def test_rebuild_takes_newest_by_created_at(tmp_path, monkeypatch):
+    monkeypatch.setattr(inbox, 'INBOX_SIZE', 2)
+    conn = open_db(tmp_path)
+    cursor = conn.cursor()
+    add_news(cursor, 'fresh 1', '2025-10-01 12:00:00')
+    add_news(cursor, 'fresh 2', '2025-10-02 12:00:00')
+    add_news(cursor, 'imported', '2019-10-08 14:05:52')
+
+    rebuild_inbox(cursor, 1, 'club')
+    assert inbox_titles(cursor) == ['fresh 2', 'fresh 1']
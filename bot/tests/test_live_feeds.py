@@ -0,0 +1,59 @@
+import json
+import sqlite3
+
+from database import ensure_schema
+from live_feeds import LatestFeeds
+from snapshot_import import SnapshotImporter
+
+
+def insert_news(db_path, count, created_at, prefix):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        'INSERT INTO news (title, link, rubric, league, created_at) VALUES (?, ?, ?, ?, ?)',
+        [(f'{prefix} {i}', f'https://example.com/{prefix}/{i}', 'АПЛ', 'АПЛ', created_at) for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_import_while_bot_running_keeps_fresh_feed(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    ensure_schema(db_path)
+    insert_news(db_path, 50, '2025-10-08 12:00:00', 'fresh')
+
+    # Бот запущен: ленты уже прогреты
+    feeds = LatestFeeds(db_path)
+    feeds.prewarm()
+
+    snapshot = tmp_path / 'sportbox_20191008_140552_all_leagues.json'
+    snapshot.write_text(json.dumps([
+        {'title': f'old {i}', 'link': f'https://example.com/old/{i}', 'rubric': 'АПЛ',
+         'scraped_at': '2019-10-08T14:05:52'}
+        for i in range(60)
+    ]), encoding='utf-8')
+    stats = SnapshotImporter(db_path).run([str(snapshot)])
+    assert stats['inserted'] == 60
+
+    # Опрос базы видит импортированные строки (у них id больше), но ленты они не вытесняют
+    assert feeds.poll() == 60
+    for items in (feeds.get_latest(), feeds.get_latest('АПЛ')):
+        assert len(items) == 50
+        assert all(item['title'].startswith('fresh') for item in items)
+
+    # То же после перезапуска бота
+    feeds.prewarm()
+    assert all(item['title'].startswith('fresh') for item in feeds.get_latest())
+
+
+def test_feed_orders_by_created_at(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    ensure_schema(db_path)
+    feeds = LatestFeeds(db_path, size=3)
+    feeds.apply([
+        {'id': 1, 'league': 'АПЛ', 'created_at': '2025-10-08 12:00:00'},
+        {'id': 2, 'league': 'АПЛ', 'created_at': '2025-10-08 10:00:00'},
+        {'id': 3, 'league': 'АПЛ', 'created_at': '2025-10-08 13:00:00'},
+        {'id': 4, 'league': 'АПЛ', 'created_at': '2019-01-01 00:00:00'},
+    ])
+    assert [item['id'] for item in feeds.get_latest()] == [3, 1, 2]
+    assert feeds.last_seen_id == 4
@@ -0,0 +1,24 @@
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from media_cache import is_media_error
+
+
+@pytest.mark.parametrize('error', [
+    BadRequest('Wrong file identifier/http url specified'),
+    BadRequest('Failed to get http url content'),
+    BadRequest('Wrong type of the web page content'),
+])
+def test_media_errors(error):
+    assert is_media_error(error)
+
+
+@pytest.mark.parametrize('error', [
+    TimedOut(),
+    NetworkError('Connection reset by peer'),
+    RetryAfter(5),
+    BadRequest("Can't parse entities: unsupported start tag"),
+    BadRequest('Message caption is too long'),
+])
+def test_transient_errors_keep_image(error):
+    assert not is_media_error(error)
@@ -0,0 +1,35 @@
+import sqlite3
+
+from query_log import QUERY_LOG, LoggedConnection
+
+
+def make_conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'q.db'), factory=LoggedConnection)
+    conn.execute('CREATE TABLE news (id INTEGER PRIMARY KEY, title TEXT)')
+    conn.executemany('INSERT INTO news (title) VALUES (?)', [(f'n{i}',) for i in range(10)])
+    return conn
+
+
+def calls(shape_prefix):
+    return sum(stats.calls for shape, stats in QUERY_LOG.shapes.items() if shape.startswith(shape_prefix))
+
+
+def test_fetchone_recorded_on_connection_close(tmp_path):
+    QUERY_LOG.reset()
+    conn = make_conn(tmp_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM news WHERE title LIKE ?', ('%n%',))
+    assert cursor.fetchone() == (10,)
+    assert calls('SELECT COUNT(*)') == 0
+    conn.close()
+    assert calls('SELECT COUNT(*)') == 1
+
+
+def test_fetchone_recorded_when_cursor_dropped(tmp_path):
+    QUERY_LOG.reset()
+    conn = make_conn(tmp_path)
+    row = conn.execute('SELECT id FROM news WHERE title = ?', ('n3',)).fetchone()
+    assert row == (4,)
+    assert calls('SELECT id FROM news') == 1
+    conn.close()
+    assert calls('SELECT id FROM news') == 1
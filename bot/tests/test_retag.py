@@ -0,0 +1,51 @@
+import sqlite3
+
+import entities
+from database import ensure_schema
+from retag import Retagger
+
+
+def inbox(conn, user_id, kind):
+    return [row[0] for row in conn.execute(
+        'SELECT news_id FROM user_inbox WHERE user_id = ? AND kind = ?', (user_id, kind))]
+
+
+def test_retag_fixes_tags_and_rebuilds_affected_inboxes(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany('INSERT INTO favorites (user_id, type, name) VALUES (?, ?, ?)', [
+        (1, 'club', 'Арсенал'), (2, 'club', 'Челси'), (3, 'player', 'Салах'), (4, 'club', 'Зенит'),
+    ])
+    # Разметка старой версии справочника: клуб перепутан, игрок не найден
+    news_id = conn.execute(
+        "INSERT INTO news (title, link, club_tags, tag_version) VALUES (?, 'https://example.com/1', 'Челси', 0)",
+        ('Салах забил, но Арсенал обыграл Ливерпуль',)
+    ).lastrowid
+    conn.execute("INSERT INTO user_inbox (user_id, kind, news_id) VALUES (2, 'club', ?)", (news_id,))
+    conn.commit()
+
+    stats = Retagger(db_path, workers=1, pause=0).run()
+
+    assert stats['retagged'] == 1
+    assert stats['changed'] == 1
+    # Ленты по Арсеналу, Челси и Салаху; Зенит не затронут
+    assert stats['inboxes'] == 3
+    club_tags, tag_version = conn.execute('SELECT club_tags, tag_version FROM news').fetchone()
+    assert 'Арсенал' in club_tags and 'Челси' not in club_tags
+    assert tag_version == entities.current().version
+    assert conn.execute('SELECT player FROM player_tags').fetchall() == [('Салах',)]
+    assert inbox(conn, 1, 'club') == [news_id]
+    assert inbox(conn, 2, 'club') == []
+    assert inbox(conn, 3, 'player') == [news_id]
+
+
+def test_second_run_is_noop(tmp_path):
+    db_path = str(tmp_path / 'news.db')
+    ensure_schema(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO news (title, link, club_tags) VALUES ('Арсенал обыграл Ливерпуль', 'https://example.com/1', '')")
+    conn.commit()
+
+    assert Retagger(db_path, workers=1, pause=0).run()['retagged'] == 1
+    assert Retagger(db_path, workers=1, pause=0).run()['retagged'] == 0